@@ -19,17 +19,22 @@
 
 
 import sys
+import heapq
 
 import bigml.api
 
 from bigml.anomaly import Anomaly
-from bigml.io import UnicodeWriter
 
 
 import bigmler.utils as u
 import bigmler.checkpoint as c
 
 from bigmler.tst_reader import TstReader as TestReader
+from bigmler.output_writer import output_writer, project_row
+from bigmler.local_cache import local_predictor
+from bigmler.memoize import build_memo, memoized_map, memoized_pairs
+from bigmler.parallel import chunks
+from bigmler.batch_anomaly import BatchAnomaly, batch_scorable
 from bigmler.resourcesapi.common import NORMAL_FORMAT, FULL_FORMAT
 from bigmler.resourcesapi.batch_anomaly_scores import \
     create_batch_anomaly_score
@@ -98,10 +103,7 @@ def write_anomaly_score(anomaly_score_resource, output=sys.stdout,
     if prediction_info != NORMAL_FORMAT:
         if input_data is None:
             input_data = []
-        row = input_data
-        if exclude:
-            for index in exclude:
-                del row[index]
+        row = project_row(input_data, exclude)
     row.append(anomaly_score_resource)
     try:
         output.writerow(row)
@@ -120,22 +122,47 @@ def anomaly_score_to_row(anomaly_score_resource):
 
 
 def local_anomaly_score(anomalies, test_reader, output, args,
-                        exclude=None):
+                        exclude=None, session_file=None):
     """Get local anomaly detector and issue anomaly score prediction
 
     """
     # Only one anomaly detector at present
-    local_anomaly = Anomaly(anomalies[0], api=args.retrieve_api_)
-    #pylint: disable=locally-disabled,broad-except
-    for input_data in test_reader:
-        input_data_dict = test_reader.dict(input_data, filtering=False)
-        try:
-            anomaly_score_info = {'score': local_anomaly.anomaly_score(
-                input_data_dict)}
-        except Exception:
-            anomaly_score_info = {'score': NO_ANOMALY_SCORE}
-        write_anomaly_score(anomaly_score_info['score'], output,
-                            args.prediction_info, input_data, exclude)
+    local_anomaly = local_predictor(Anomaly, anomalies[0], args)
+    memo = build_memo(args)
+    if batch_scorable(local_anomaly):
+        # the chunks of rows go through all the trees of the iforest at once
+        batch_anomaly = BatchAnomaly(local_anomaly)
+
+        def scores_pairs(rows):
+            for chunk in chunks(rows, args.chunk_size):
+                scores = batch_anomaly.scores(
+                    [test_reader.dict(input_data, filtering=False)
+                     for input_data in chunk])
+                yield from zip(chunk, scores)
+
+        scores = memoized_pairs(scores_pairs, test_reader, memo)
+    else:
+        #pylint: disable=locally-disabled,broad-except
+        def anomaly_score_info(input_data):
+            input_data_dict = test_reader.dict(input_data, filtering=False)
+            try:
+                return local_anomaly.anomaly_score(input_data_dict)
+            except Exception:
+                return None
+
+        scores = memoized_map(anomaly_score_info, test_reader, memo)
+    top_scores = getattr(args, "top_scores", 0)
+    if top_scores > 0:
+        # only the highest scores are kept while reading the test file
+        scores = heapq.nlargest(
+            top_scores, ((input_data, score) for input_data, score in scores
+                         if score is not None), key=lambda pair: pair[1])
+    for input_data, score in scores:
+        write_anomaly_score(NO_ANOMALY_SCORE if score is None else score,
+                            output, args.prediction_info, input_data,
+                            exclude)
+    if memo is not None:
+        memo.log(session_file=session_file, console=args.verbosity)
 
 
 def anomaly_score(anomalies, fields, args, session_file=None):
@@ -148,7 +175,7 @@ def anomaly_score(anomalies, fields, args, session_file=None):
     test_reader = TestReader(test_set, test_set_header, fields,
                              None,
                              test_separator=args.test_separator)
-    with UnicodeWriter(output, lineterminator="\n") as output:
+    with output_writer(output, args, lineterminator="\n") as output:
         # columns to exclude if input_data is added to the prediction field
         exclude = use_prediction_headers(
             args.prediction_header, output, test_reader, fields, args)
@@ -158,7 +185,8 @@ def anomaly_score(anomalies, fields, args, session_file=None):
         message = u.dated("Creating local anomaly scores.\n")
         u.log_message(message, log_file=session_file, console=args.verbosity)
         local_anomaly_score(anomalies, test_reader,
-                            output, args, exclude=exclude)
+                            output, args, exclude=exclude,
+                            session_file=session_file)
     test_reader.close()
 
 
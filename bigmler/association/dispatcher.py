@@ -31,6 +31,7 @@ import bigmler.processing.args as a
 import bigmler.processing.associations as pa
 
 from bigmler.defaults import DEFAULTS_FILE
+from bigmler.association_set import association_set
 from bigmler.reports import clear_reports, upload_reports
 from bigmler.command import get_context
 from bigmler.dispatcher import SESSIONS_LOG, clear_log_files, get_test_dataset
@@ -179,8 +180,10 @@ def compute_output(api, args):
         if args.remote and not args.no_batch:
             sys.exit("Batch association sets are currently not supported.")
         else:
-            sys.exit("Local prediction of association sets is currently"
-                     " not supported.")
+            # Local association sets: the association sets are computed
+            # locally using an index of the association rules
+            association_set(associations, fields, args,
+                            session_file=session_file)
     u.print_generated_files(path, log_file=session_file,
                             verbosity=args.verbosity)
     if args.reports:
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Association set auxiliary functions
+
+"""
+
+
+import sys
+import json
+
+from functools import partial
+
+from bigml.association import Association
+
+import bigmler.utils as u
+
+from bigmler.tst_reader import TstReader as TestReader
+from bigmler.output_writer import output_writer, project_row
+from bigmler.local_cache import cached_local, DEFAULT_CACHE_SIZE
+from bigmler.memoize import build_memo, memoized_pairs
+from bigmler.parallel import pool_predict, chunks
+from bigmler.batch_association import BatchAssociation
+from bigmler.resourcesapi.common import NORMAL_FORMAT, FULL_FORMAT
+
+# symbol used in failing association sets
+NO_ASSOCIATION_SET = "-"
+
+
+def use_prediction_headers(prediction_headers, output, test_reader,
+                           fields, args):
+    """Uses header information from the test file in the prediction output
+
+       If --prediction-header is set, adds a headers row to the association
+       set file.
+       If --prediction-fields is used, retrieves the fields to exclude
+       from the test input in the --prediction-info full format, that includes
+       them all by default.
+
+    """
+    exclude = []
+    headers = ["association_set"]
+
+    if (args.prediction_info == FULL_FORMAT or
+            args.prediction_fields is not None):
+        # Try to retrieve headers from the test file
+        if test_reader.has_headers():
+            input_headers = test_reader.raw_headers
+        else:
+            # if no headers are found in the test file we assume it has the
+            # same association input_field structure
+            input_headers = [fields[field]['name'] for field in
+                             fields.fields_columns]
+
+        if args.prediction_fields is not None:
+            prediction_fields = list(map(str.strip,
+                                    args.prediction_fields.split(',')))
+            # Filter input_headers adding only those chosen by the user
+            number_of_headers = len(input_headers)
+            for index in range(0, number_of_headers):
+                if not input_headers[index] in prediction_fields:
+                    exclude.append(index)
+        exclude = sorted(list(set(exclude)), reverse=True)
+        for index in exclude:
+            del input_headers[index]
+        input_headers.extend(headers)
+        headers = input_headers
+    if prediction_headers:
+        output.writerow(headers)
+    return exclude
+
+
+def write_association_set(association_set_resource, output=sys.stdout,
+                          prediction_info=NORMAL_FORMAT, input_data=None,
+                          exclude=None):
+    """Writes the final association set to the required output
+
+       The format of the output depends on the `prediction_info` value.
+       There's a brief format, that writes only the association set,
+       and a full data format that writes first the input data
+       used to predict followed by the association set. The association
+       set is stored as a JSON list.
+
+    """
+
+    row = []
+    # input data is added if prediction format is BRIEF (no confidence) or FULL
+    if prediction_info != NORMAL_FORMAT:
+        if input_data is None:
+            input_data = []
+        row = project_row(input_data, exclude)
+    if association_set_resource is None:
+        row.append(NO_ASSOCIATION_SET)
+    else:
+        row.append(json.dumps(association_set_resource,
+                              separators=(",", ":")))
+    try:
+        output.writerow(row)
+    except AttributeError:
+        try:
+            output.write(row)
+        except AttributeError:
+            raise AttributeError("You should provide a writeable object")
+
+
+def build_batch_association(associations, api=None, cache_dir=None,
+                            max_size=DEFAULT_CACHE_SIZE):
+    """BatchAssociation for the local Association, loaded from the local
+       cache if available
+
+    """
+    # Only one association at present
+    return BatchAssociation(cached_local(Association, associations[0],
+                                         api=api, cache_dir=cache_dir,
+                                         max_size=max_size))
+
+
+def batch_association_sets(batch_association, rows, adapter=None, k=None,
+                           score_by=None):
+    """Association sets for the test rows. The rows whose association set
+       fails get None.
+
+    """
+    association_sets = []
+    for input_data in rows:
+        #pylint: disable=locally-disabled,broad-except
+        try:
+            association_sets.append(batch_association.association_set(
+                adapter(input_data), k=k, score_by=score_by))
+        except Exception:
+            association_sets.append(None)
+    return association_sets
+
+
+def local_association_set(associations, test_reader, output, args,
+                          exclude=None, session_file=None):
+    """Get local association and compute the association sets of the test
+       rows
+
+    """
+    model_builder = partial(build_batch_association, associations,
+                            api=args.retrieve_api_,
+                            cache_dir=getattr(args, "local_cache", None),
+                            max_size=getattr(args, "local_cache_size",
+                                             DEFAULT_CACHE_SIZE))
+    predict_fn = partial(batch_association_sets,
+                         adapter=test_reader.adapter(filtering=False),
+                         k=args.association_set_k, score_by=args.score_by)
+    memo = build_memo(args)
+    if args.jobs > 1:
+        # each process of the pool builds its own rules index
+        predict_pairs = partial(pool_predict, model_builder, predict_fn,
+                                jobs=args.jobs, chunk_size=args.chunk_size)
+    else:
+        batch_association = model_builder()
+
+        def predict_pairs(rows):
+            for chunk in chunks(rows, args.chunk_size):
+                yield from zip(chunk, predict_fn(batch_association, chunk))
+    infos = memoized_pairs(predict_pairs, test_reader, memo)
+    for input_data, info in infos:
+        write_association_set(info, output, args.prediction_info,
+                              input_data, exclude)
+    if memo is not None:
+        memo.log(session_file=session_file, console=args.verbosity)
+
+
+def association_set(associations, fields, args, session_file=None):
+    """Computes an association set for each entry in the `test_set`.
+
+    """
+    test_set = args.test_set
+    test_set_header = args.test_header
+    output = args.predictions
+    test_reader = TestReader(test_set, test_set_header, fields,
+                             None,
+                             test_separator=args.test_separator)
+    with output_writer(output, args, lineterminator="\n") as output:
+        # columns to exclude if input_data is added to the prediction field
+        exclude = use_prediction_headers(
+            args.prediction_header, output, test_reader, fields, args)
+
+        # Local association sets: the association sets are computed
+        # locally using the association rules
+        message = u.dated("Creating local association sets.\n")
+        u.log_message(message, log_file=session_file, console=args.verbosity)
+        local_association_set(associations, test_reader, output, args,
+                              exclude=exclude, session_file=session_file)
+    test_reader.close()
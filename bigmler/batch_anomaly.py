@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Batch scoring of an isolation forest
+
+   The trees in the iforest of a local Anomaly are flattened into arrays
+   (weight, repeats depth, predicates and children of each node) and a
+   chunk of rows is pushed through all the trees at once using NumPy
+   masks. The depths are added in the same order used by the local
+   Anomaly, so the scores are the same.
+
+"""
+
+
+import math
+
+from collections import deque
+
+import numpy as np
+
+from bigml.constants import DECIMALS
+from bigml.predicate_utils.utils import LT, LE, EQ, NE, GE, GT, IN, \
+    PREDICATE_INFO_LENGTH
+from bigml.util import cast
+
+
+NUMERIC = "numeric"
+CATEGORICAL = "categorical"
+# code used for categories that appear in no predicate
+OTHER_CODE = 0
+# maximum number of cast values kept for each field
+MAX_CACHED_VALUES = 10000
+# comparison operators used for numeric predicates
+COMPARISONS = {LT: np.less,
+               LE: np.less_equal,
+               EQ: np.equal,
+               NE: np.not_equal,
+               GE: np.greater_equal,
+               GT: np.greater}
+
+
+def _unpack(node, normalize_repeats):
+    """Weight, repeats depth, predicates and children of a node in the
+       compressed iforest tree structure
+
+    """
+    shift = 1 if normalize_repeats else 0
+    predicates_number = node[1 + shift]
+    start = 2 + shift
+    predicates = [node[start + PREDICATE_INFO_LENGTH * index:
+                       start + PREDICATE_INFO_LENGTH * (index + 1)]
+                  for index in range(predicates_number)]
+    start += PREDICATE_INFO_LENGTH * predicates_number
+    children = node[start + 1: start + 1 + node[start]]
+    return node[0], node[1] if normalize_repeats else 0, predicates, \
+        children
+
+
+def _nodes(local_anomaly):
+    """Generator of the unpacked nodes in the iforest
+
+    """
+    for tree in local_anomaly.iforest:
+        nodes = [tree]
+        while nodes:
+            node = _unpack(nodes.pop(), local_anomaly.normalize_repeats)
+            yield node
+            nodes.extend(node[3])
+
+
+def batch_scorable(local_anomaly):
+    """Checks whether the local Anomaly can be evaluated using a
+       BatchAnomaly. Predicates on text or items fields are left to the
+       local Anomaly.
+
+    """
+    if not local_anomaly.iforest or (local_anomaly.sample_size == 1 and
+                                     local_anomaly.normalization_factor
+                                     is None):
+        return False
+    for _, _, predicates, _ in _nodes(local_anomaly):
+        for operator, field_id, value, term, _ in predicates:
+            optype = local_anomaly.fields.get(field_id, {}).get("optype")
+            if term is not None or operator is None:
+                return False
+            if value is None and operator not in [EQ, NE]:
+                return False
+            if optype == NUMERIC:
+                if operator == IN:
+                    return False
+            elif optype != CATEGORICAL or operator not in [EQ, NE, IN]:
+                return False
+    return True
+
+
+class BatchAnomaly():
+    """Flattened version of the iforest in a local Anomaly that scores
+       lists of input data at once.
+
+    """
+
+    def __init__(self, local_anomaly):
+        self.local_anomaly = local_anomaly
+        self.field_ids = []
+        self.field_index = {}
+        self.categories = {}
+        self.keys = {}
+        self.values_cache = {}
+        self._compile()
+
+    def _field(self, field_id):
+        """Index of the field in the input matrix
+
+        """
+        if field_id not in self.field_index:
+            self.field_index[field_id] = len(self.field_ids)
+            self.field_ids.append(field_id)
+            if self.local_anomaly.fields[field_id]["optype"] == CATEGORICAL:
+                self.categories[field_id] = {}
+        return self.field_index[field_id]
+
+    def _code(self, field_id, category):
+        """Code of a category used in the predicates
+
+        """
+        codes = self.categories[field_id]
+        if category not in codes:
+            codes[category] = len(codes) + 1
+        return codes[category]
+
+    def _compile(self):
+        """Flattens the trees into arrays indexed by the node number and
+           the predicates into arrays indexed by the predicate number
+
+        """
+        weights, repeats, starts, counts, children = [], [], [], [], []
+        operators, fields, values, missings, none_values = \
+            [], [], [], [], []
+        in_values = []
+        self.roots = []
+        for tree in self.local_anomaly.iforest:
+            self.roots.append(len(weights))
+            nodes = deque([(tree, None)])
+            while nodes:
+                tree, parent = nodes.popleft()
+                index = len(weights)
+                if parent is not None:
+                    children[parent].append(index)
+                weight, repeat, predicates, node_children = _unpack(
+                    tree, self.local_anomaly.normalize_repeats)
+                weights.append(weight)
+                repeats.append(repeat)
+                starts.append(len(operators))
+                counts.append(len(predicates))
+                children.append([])
+                for operator, field_id, value, _, missing in predicates:
+                    field = self._field(field_id)
+                    operators.append(operator)
+                    fields.append(field)
+                    missings.append(missing)
+                    none_values.append(value is None)
+                    if operator == IN:
+                        values.append(len(in_values))
+                        in_values.append(
+                            [self._code(field_id, category) for category in
+                             value if category is not None])
+                    elif value is None:
+                        values.append(np.nan)
+                    elif field_id in self.categories:
+                        values.append(self._code(field_id, value))
+                    else:
+                        values.append(value)
+                nodes.extend((child, index) for child in node_children)
+        self.weights = np.array(weights, dtype=float)
+        self.repeats = np.array(repeats, dtype=float)
+        self.starts = np.array(starts)
+        self.counts = np.array(counts)
+        max_children = max(len(node_children) for node_children in children)
+        self.children = np.full((len(children), max(max_children, 1)), -1)
+        for index, node_children in enumerate(children):
+            self.children[index, :len(node_children)] = node_children
+        self.operators = np.array(operators, dtype=int)
+        self.fields = np.array(fields, dtype=int)
+        self.values = np.array(values, dtype=float)
+        self.missings = np.array(missings, dtype=bool)
+        self.none_values = np.array(none_values, dtype=bool)
+        max_code = max([len(codes) for codes in self.categories.values()],
+                       default=0)
+        self.in_values = np.zeros((len(in_values), max_code + 1), dtype=bool)
+        for index, codes in enumerate(in_values):
+            self.in_values[index, codes] = True
+
+    def _key(self, key):
+        """Field ID for a key in the input data and whether the field is
+           used in the anomaly detector
+
+        """
+        if key not in self.keys:
+            anomaly = self.local_anomaly
+            field_id = key if key in anomaly.fields else \
+                anomaly.inverted_fields.get(key, key)
+            self.keys[key] = (field_id, field_id in anomaly.model_fields)
+        return self.keys[key]
+
+    def _value(self, field_id, value):
+        """Value of a used field as stored in the input matrix. The values
+           are cast by the local Anomaly only once.
+
+        """
+        cache = self.values_cache.setdefault(field_id, {})
+        if value not in cache:
+            if len(cache) >= MAX_CACHED_VALUES:
+                cache.clear()
+            norm_input_data = {field_id: value}
+            cast(norm_input_data, self.local_anomaly.fields)
+            norm_value = norm_input_data[field_id]
+            if field_id in self.categories:
+                norm_value = self.categories[field_id].get(norm_value,
+                                                           OTHER_CODE)
+            cache[value] = norm_value
+        return cache[value]
+
+    def _matrix(self, input_data_list):
+        """Normalized input data as a matrix of values and a matrix of
+           missing flags. Categories are replaced by their codes and rows
+           whose values cannot be cast are flagged.
+
+        """
+        anomaly = self.local_anomaly
+        values = np.zeros((len(input_data_list), len(self.field_ids)))
+        missing = np.ones(values.shape, dtype=bool)
+        fallback = np.zeros(len(input_data_list), dtype=bool)
+        for row, input_data in enumerate(input_data_list):
+            #pylint: disable=locally-disabled,broad-except
+            try:
+                for key, value in input_data.items():
+                    if anomaly.normalize(value) is None:
+                        continue
+                    field_id, used = self._key(key)
+                    if not used:
+                        continue
+                    value = self._value(field_id, value)
+                    column = self.field_index.get(field_id)
+                    if column is not None:
+                        values[row, column] = value
+                        missing[row, column] = False
+            except Exception:
+                fallback[row] = True
+        if anomaly.default_numeric_value is not None:
+            for column, field_id in enumerate(self.field_ids):
+                if field_id in self.categories or \
+                        field_id in anomaly.id_fields:
+                    continue
+                default_value = 0 if anomaly.default_numeric_value == \
+                    "zero" else anomaly.fields[field_id]["summary"].get(
+                        anomaly.default_numeric_value)
+                if default_value is not None:
+                    values[missing[:, column], column] = default_value
+                    missing[:, column] = False
+        return values, missing, fallback
+
+    def _apply(self, predicates, rows, values, missing):
+        """Evaluates the `predicates` for the corresponding `rows` of the
+           input matrix
+
+        """
+        fields = self.fields[predicates]
+        row_values = values[rows, fields]
+        row_missing = missing[rows, fields]
+        operators = self.operators[predicates]
+        result = np.zeros(len(predicates), dtype=bool)
+        for operator, comparison in COMPARISONS.items():
+            selected = operators == operator
+            if selected.any():
+                result[selected] = comparison(
+                    row_values[selected], self.values[predicates[selected]])
+        selected = operators == IN
+        if selected.any():
+            result[selected] = self.in_values[
+                self.values[predicates[selected]].astype(int),
+                row_values[selected].astype(int)]
+        none_values = self.none_values[predicates]
+        result[~row_missing & none_values] = operators[
+            ~row_missing & none_values] == NE
+        result[row_missing] = (self.missings[predicates] | \
+            (none_values & (operators == EQ)))[row_missing]
+        return result
+
+    def _matches(self, nodes, rows, values, missing):
+        """Whether all the predicates of each node are true for the
+           corresponding row
+
+        """
+        result = np.ones(len(nodes), dtype=bool)
+        counts = self.counts[nodes]
+        for position in range(counts.max(initial=0)):
+            selected = np.flatnonzero(counts > position)
+            result[selected] &= self._apply(
+                self.starts[nodes[selected]] + position, rows[selected],
+                values, missing)
+        return result
+
+    def _depths(self, values, missing):
+        """Depth reached by each row in each tree, as a rows x trees
+           matrix
+
+        """
+        rows_number, trees_number = values.shape[0], len(self.roots)
+        rows = np.repeat(np.arange(rows_number), trees_number)
+        nodes = np.tile(np.array(self.roots), rows_number)
+        depths = np.zeros(rows.size)
+        # rows that do not match the root's predicates have depth 0
+        active = np.flatnonzero(self._matches(nodes, rows, values, missing))
+        while active.size:
+            active_nodes = nodes[active]
+            depths[active] += self.weights[active_nodes]
+            leaves = self.children[active_nodes, 0] < 0
+            depths[active[leaves]] += self.repeats[active_nodes[leaves]]
+            next_nodes = np.full(active.size, -1)
+            for slot in range(self.children.shape[1]):
+                children = self.children[active_nodes, slot]
+                candidates = np.flatnonzero((next_nodes < 0) & \
+                    (children >= 0))
+                if not candidates.size:
+                    break
+                matches = candidates[self._matches(
+                    children[candidates], rows[active[candidates]], values,
+                    missing)]
+                next_nodes[matches] = children[matches]
+            moved = next_nodes >= 0
+            nodes[active[moved]] = next_nodes[moved]
+            active = active[moved]
+        return depths.reshape(rows_number, trees_number)
+
+    def scores(self, input_data_list):
+        """Anomaly scores for a list of input data dictionaries. They are
+           the ones that the local Anomaly `anomaly_score` method produces,
+           or None for the rows where it fails.
+
+        """
+        anomaly = self.local_anomaly
+        values, missing, fallback = self._matrix(input_data_list)
+        depths = self._depths(values, missing)
+        # adding the trees' depths in order, as the local Anomaly does
+        depth_sums = np.zeros(depths.shape[0])
+        for tree in range(depths.shape[1]):
+            depth_sums += depths[:, tree]
+        scores = []
+        for input_data, depth_sum, row_fallback in zip(
+                input_data_list, depth_sums.tolist(), fallback):
+            if row_fallback:
+                #pylint: disable=locally-disabled,broad-except
+                try:
+                    scores.append(anomaly.anomaly_score(input_data))
+                except Exception:
+                    scores.append(None)
+                continue
+            observed_mean_depth = depth_sum / len(self.roots)
+            scores.append(round(math.pow(2, - observed_mean_depth /
+                                         anomaly.norm), DECIMALS))
+        return scores
+
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Association sets computed with an inverted index of rules
+
+   The rules of the local Association are indexed by the items in their
+   antecedent, so that each input row only examines the rules that share
+   some item with it instead of scanning all of them. The rules found are
+   scored in their original order, so that the association sets are the
+   ones that the local Association `association_set` method builds.
+
+"""
+
+
+import math
+
+from bigml.association import DEFAULT_K, SCORES, NO_ITEMS
+from bigml.util import cast
+
+
+CATEGORICAL = "categorical"
+# search strategies named after a different rule attribute
+SCORE_ATTRIBUTES = {"coverage": "lhs_cover"}
+
+
+class BatchAssociation():
+    """Local Association whose rules are indexed by their antecedent items
+       to compute the association sets of lists of input data
+
+    """
+
+    def __init__(self, local_association):
+        self.local_association = local_association
+        items = local_association.items
+        fields = local_association.fields
+        # rules positions for each item in their antecedent
+        self.rules_index = {}
+        self.lhs_norms = []
+        self.consequents = []
+        for position, rule in enumerate(local_association.rules):
+            for item_index in set(rule.lhs):
+                self.rules_index.setdefault(item_index, []).append(position)
+            self.lhs_norms.append(math.sqrt(len(rule.lhs)))
+            rhs_item = items[rule.rhs[0]]
+            self.consequents.append((
+                tuple(rule.rhs), rhs_item.field_id,
+                fields[rhs_item.field_id]["optype"] in NO_ITEMS))
+        # items grouped by field. Categories are matched by name.
+        self.field_items = {}
+        self.categories = {}
+        for item in items:
+            if item.field_info["optype"] == CATEGORICAL and \
+                    not item.complement:
+                self.categories.setdefault(item.field_id, {}).setdefault(
+                    item.name, []).append(item.index)
+            else:
+                self.field_items.setdefault(item.field_id, []).append(item)
+        self.items_json = {}
+
+    def _items_indexes(self, norm_input_data):
+        """Indexes of the items that match the input data
+
+        """
+        items_indexes = []
+        for field_id, category_items in self.categories.items():
+            value = norm_input_data.get(field_id)
+            if value is not None:
+                items_indexes.extend(category_items.get(value, []))
+            else:
+                # missing values only match the items with no name
+                items_indexes.extend(category_items.get(None, []))
+        for field_id, items in self.field_items.items():
+            value = norm_input_data.get(field_id)
+            items_indexes.extend([item.index for item in items
+                                  if item.matches(value)])
+        return items_indexes
+
+    def _item_json(self, item_index):
+        """Description of the item as used in association sets
+
+        """
+        if item_index not in self.items_json:
+            item_json = self.local_association.items[item_index].to_json()
+            for key in ["description", "bin_start", "bin_end"]:
+                del item_json[key]
+            self.items_json[item_index] = item_json
+        return dict(self.items_json[item_index])
+
+    def association_set(self, input_data, k=DEFAULT_K, score_by=None):
+        """Returns the consequents of the rules whose antecedent best match
+           the items in the input data, as the local Association
+           `association_set` method does
+
+        """
+        association = self.local_association
+        score_by = SCORE_ATTRIBUTES.get(score_by, score_by)
+        if score_by and score_by not in SCORES:
+            raise ValueError("The available values of score_by are: %s" %
+                             ", ".join(SCORES))
+        if score_by is None:
+            score_by = SCORE_ATTRIBUTES.get(association.search_strategy,
+                                            association.search_strategy)
+        norm_input_data = association.filter_input_data(input_data)
+        # numeric values read from CSV files are cast to match the bins
+        cast_input_data = dict(norm_input_data)
+        cast(cast_input_data, association.fields)
+        items_indexes = self._items_indexes(cast_input_data)
+        # number of input items in the antecedent of each candidate rule
+        matches = {}
+        for item_index in items_indexes:
+            for position in self.rules_index.get(item_index, []):
+                matches[position] = matches.get(position, 0) + 1
+        items_norm = math.sqrt(len(items_indexes))
+        input_items = set(items_indexes)
+        predictions = {}
+        for position in sorted(matches):
+            rhs, field_id, no_items = self.consequents[position]
+            # consequents already in the input data are not predicted
+            if no_items and field_id in norm_input_data:
+                continue
+            if not no_items and rhs[0] in input_items:
+                continue
+            rule = association.rules[position]
+            cosine = matches[position] / float(
+                items_norm * self.lhs_norms[position])
+            score = getattr(rule, score_by)
+            if isinstance(score, list):
+                # coverage and support are stored as [ratio, instances]
+                score = score[0]
+            if rhs not in predictions:
+                predictions[rhs] = {"score": 0, "rules": []}
+            predictions[rhs]["score"] += cosine * score
+            predictions[rhs]["rules"].append(rule.rule_id)
+        k = len(predictions) if k is None else k
+        predictions = sorted(list(predictions.items()),
+                             key=lambda x: x[1]["score"], reverse=True)[:k]
+        final_predictions = []
+        for rhs, prediction in predictions:
+            prediction["item"] = self._item_json(rhs[0])
+            final_predictions.append(prediction)
+        return final_predictions
+
+    def association_sets(self, input_data_list, k=DEFAULT_K, score_by=None):
+        """Association sets for a list of input data dictionaries
+
+        """
+        return [self.association_set(input_data, k=k, score_by=score_by)
+                for input_data in input_data_list]
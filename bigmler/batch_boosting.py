@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Batch predictions of boosted ensembles
+
+   The trees of all the iterations in a boosted ensemble are flattened into
+   a single set of node tables, as done for BatchTree, and a chunk of rows
+   is traversed through all of them at once. The outputs of the nodes where
+   the rows stop form a (rows x trees) array of contributions that are
+   weighted and added per class, in the order of the iterations, and turned
+   into probabilities with a vectorized softmax. Regressions add the
+   contributions to the initial offset.
+
+"""
+
+
+import numpy as np
+
+from bigml.constants import LAST_PREDICTION, DECIMALS
+from bigml.ensemble import OPERATING_POINT_KINDS
+from bigml.model import parse_operating_point
+from bigml.multimodel import MultiModel
+from bigml.predict_utils.common import get_node
+from bigml.util import PRECISION
+
+import bigml.predict_utils.boosting as b
+
+from bigmler.batch_tree import BatchTree, splits_predictable
+
+
+PROBABILITY = "probability"
+
+
+def batch_boosting_predictable(local_ensemble, operating_point=None,
+                               missing_strategy=LAST_PREDICTION):
+    """Checks whether the local Ensemble is boosted and can be evaluated
+       using a BatchBoosting. Only the last prediction missing strategy and
+       probability operating points are used.
+
+    """
+    if not local_ensemble.boosting or missing_strategy != LAST_PREDICTION \
+            or local_ensemble.operation_settings:
+        return False
+    return operating_point is None or \
+        operating_point.get("kind") == PROBABILITY
+
+
+def ensemble_models(local_ensemble):
+    """Generates the local Models in the Ensemble, one group of models at a
+       time
+
+    """
+    if local_ensemble.multi_model is not None:
+        yield from local_ensemble.multi_model.models
+        return
+    for models_split in local_ensemble.models_splits:
+        #pylint: disable=locally-disabled,protected-access
+        yield from MultiModel(local_ensemble._get_models(models_split),
+                              api=local_ensemble.api,
+                              fields=local_ensemble.fields).models
+
+
+class BatchBoosting(BatchTree):
+    """Node tables of all the trees in a boosted Ensemble, used to predict
+       lists of input data at once.
+
+    """
+
+    #pylint: disable=locally-disabled,super-init-not-called
+    def __init__(self, local_ensemble, operating_point=None):
+        self.local_ensemble = local_ensemble
+        # the fields of the ensemble are used to build the input matrix
+        self.local_model = local_ensemble
+        self.regression = local_ensemble.regression
+        self.missing_strategy = LAST_PREDICTION
+        self.operating_point = operating_point
+        self.field_ids = []
+        self.field_index = {}
+        self.categories = {}
+        self.keys = {}
+        self.values_cache = {}
+        if self.regression:
+            self.class_names = [None]
+        else:
+            self.class_names = [
+                category for category, _ in local_ensemble.fields[
+                    local_ensemble.objective_id]["summary"]["categories"]]
+        roots, outputs, trees_classes, weights = [], [], [], []
+        self._new_tables()
+        for local_model in ensemble_models(local_ensemble):
+            if not splits_predictable(local_model, b.OFFSETS):
+                raise ValueError("Failed to flatten the model %s." %
+                                 local_model.resource_id)
+            roots.append(len(self.tables["operators"]))
+            outputs.extend([get_node(packed_node)[b.OFFSETS["output"]]
+                            for packed_node in self._flatten(
+                                local_model.tree, b.OFFSETS)])
+            trees_classes.append(self.class_names.index(
+                local_model.boosting.get("objective_class")))
+            weights.append(local_model.boosting.get("weight") or 0)
+        if not roots:
+            raise ValueError("No models to flatten.")
+        self._build_arrays()
+        self.roots = np.array(roots, dtype=np.int64)
+        self.outputs = np.array(outputs, dtype=float)
+        self.trees_classes = np.array(trees_classes)
+        self.weights = np.array(weights, dtype=float)
+        # classes are added in the order of their first tree
+        _, first_trees = np.unique(self.trees_classes, return_index=True)
+        self.boosted_classes = self.trees_classes[np.sort(first_trees)]
+
+    def _scores(self, values, missing):
+        """Sum of the weighted contributions of the trees of each class for
+           every row
+
+        """
+        rows_number = values.shape[0]
+        models = len(self.roots)
+        final_nodes, _ = self._traverse(
+            values, missing, roots=np.tile(self.roots, rows_number),
+            rows=np.repeat(np.arange(rows_number), models))
+        contributions = self.outputs[final_nodes].reshape(
+            rows_number, models) * self.weights
+        scores = np.zeros((rows_number, len(self.class_names)))
+        # added one tree at a time to keep the order of the local Ensemble
+        for tree, tree_class in enumerate(self.trees_classes):
+            scores[:, tree_class] += contributions[:, tree]
+        return scores
+
+    def _regression(self, scores):
+        """Predictions of a boosted regression
+
+        """
+        offset = self.local_ensemble.boosting_offsets
+        return [{"prediction": round(score + offset, DECIMALS),
+                 "unused_fields": []}
+                for score in scores[:, 0].tolist()]
+
+    def _probabilities(self, scores):
+        """Softmax of the class scores plus their initial offsets. Classes
+           with no trees get no probability.
+
+        """
+        offsets = self.local_ensemble.boosting_offsets
+        exponentials = np.zeros(scores.shape)
+        total = np.zeros(scores.shape[0])
+        for class_code in self.boosted_classes:
+            exponentials[:, class_code] = np.exp(
+                scores[:, class_code] + offsets.get(
+                    self.class_names[class_code], 0))
+            total += exponentials[:, class_code]
+        return exponentials / total[:, np.newaxis]
+
+    def _classification(self, probabilities):
+        """Predictions of a boosted classification, as the local Ensemble
+           `predict` method returns them
+
+        """
+        predictions = []
+        for row_probabilities in probabilities.tolist():
+            # ties are broken by the order of the objective field classes
+            ranking = sorted(self.boosted_classes.tolist(),
+                             key=lambda code, row=row_probabilities: (
+                                 - row[code], code))
+            distribution = [{"category": self.class_names[code],
+                             "probability": round(row_probabilities[code],
+                                                  PRECISION)}
+                            for code in ranking]
+            if self.operating_point:
+                predictions.append(self._operating(distribution))
+                continue
+            predictions.append({
+                "prediction": distribution[0]["category"],
+                "probability": distribution[0]["probability"],
+                "probabilities": distribution,
+                "confidence": distribution[0]["probability"],
+                "unused_fields": []})
+        return predictions
+
+    def _operating(self, distribution):
+        """Prediction for the operating point, as the local Ensemble
+           `predict_operating` method returns it
+
+        """
+        local_ensemble = self.local_ensemble
+        _, threshold, positive_class = parse_operating_point(
+            self.operating_point, OPERATING_POINT_KINDS,
+            local_ensemble.class_names, local_ensemble.operation_settings)
+        for category_info in distribution:
+            if category_info["category"] == positive_class:
+                if category_info[PROBABILITY] > threshold:
+                    return {PROBABILITY: category_info[PROBABILITY],
+                            "prediction": positive_class}
+                break
+        # if the threshold is not met, the alternative class with
+        # highest rounded probability is returned
+        for category_info in sorted(
+                distribution, key=lambda x: (
+                    - x[PROBABILITY],
+                    self.class_names.index(x["category"]))):
+            if category_info["category"] != positive_class:
+                return {PROBABILITY: category_info[PROBABILITY],
+                        "prediction": category_info["category"]}
+        return None
+
+    def predict(self, input_data_list):
+        """Full predictions for a list of input data dictionaries, as the
+           local Ensemble `predict` method produces them
+
+        """
+        values, missing, _ = self._matrix(input_data_list)
+        scores = self._scores(values, missing)
+        if self.regression:
+            return self._regression(scores)
+        return self._classification(self._probabilities(scores))
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Batch assignment of centroids
+
+   The centers of a local Cluster with numeric and categorical fields are
+   stored in arrays and a chunk of rows is encoded in a matrix, so that
+   the distances from all the rows to all the centroids are computed at
+   once with NumPy. When several centroids are nearly at the minimum
+   distance, and for the distance to the chosen one, the operations of the
+   local Cluster are repeated, so the results are the same. For a large
+   number of numeric centroids, a k-d tree can be used instead of the
+   distance matrix. Rows that cannot be encoded are left to the local
+   Cluster.
+
+"""
+
+
+import math
+
+import numpy as np
+
+from scipy.spatial import cKDTree
+
+from bigml.util import cast
+
+
+NUMERIC = "numeric"
+CATEGORICAL = "categorical"
+# code used for the categories that appear in no centroid
+OTHER_CODE = 0
+# code used for missing categories
+MISSING_CODE = -1
+# maximum number of cast values kept for each field
+MAX_CACHED_VALUES = 10000
+# relative tolerance used to find the centroids that can be the nearest one
+# after rounding
+TOLERANCE = 1e-9
+
+
+def batch_clusterable(local_cluster):
+    """Checks whether the local Cluster can be evaluated using a
+       BatchCluster. Clusters with text or items fields are left to the
+       local Cluster.
+
+    """
+    centroids = local_cluster.centroids
+    if not centroids:
+        return False
+    field_ids = list(centroids[0].center.keys())
+    for centroid in centroids:
+        # all the centroids must accumulate the distance in the same order
+        if list(centroid.center.keys()) != field_ids:
+            return False
+        for field_id, value in centroid.center.items():
+            optype = local_cluster.fields.get(field_id, {}).get("optype")
+            if isinstance(value, str):
+                if optype != CATEGORICAL:
+                    return False
+            elif isinstance(value, bool) or \
+                    not isinstance(value, (int, float)) or optype != NUMERIC:
+                return False
+    return True
+
+
+class BatchCluster():
+    """Centers of a local Cluster stored in arrays to compute the nearest
+       centroid of lists of input data at once.
+
+    """
+
+    def __init__(self, local_cluster, index_size=0):
+        """`index_size`: minimum number of centroids needed to find the
+                         nearest one using a spatial index. Only used
+                         in clusters with numeric fields. 0 disables it.
+
+        """
+        self.local_cluster = local_cluster
+        centroids = local_cluster.centroids
+        self.field_ids = list(centroids[0].center.keys())
+        self.numeric = [not isinstance(centroids[0].center[field_id], str)
+                        for field_id in self.field_ids]
+        self.scale_values = [local_cluster.scales[field_id] for field_id
+                             in self.field_ids]
+        self.scales = np.array(self.scale_values, dtype=float)
+        self.categories = {}
+        self.centers = np.zeros((len(centroids), len(self.field_ids)))
+        for index, field_id in enumerate(self.field_ids):
+            for row, centroid in enumerate(centroids):
+                value = centroid.center[field_id]
+                self.centers[row, index] = value if self.numeric[index] \
+                    else self._code(field_id, value)
+        self.center_values = self.centers.tolist()
+        self.field_index = {field_id: index for index, field_id in
+                            enumerate(self.field_ids)}
+        # numeric fields that need a value to compute the distance
+        self.required = [
+            field_id for field_id, field in local_cluster.fields.items()
+            if field["optype"] == NUMERIC and
+            field_id not in local_cluster.summary_fields]
+        self.keys = {}
+        self.values_cache = {}
+        self.index = None
+        if 0 < index_size <= len(centroids) and all(self.numeric):
+            self.index = cKDTree(self.centers * self.scales)
+
+    def _code(self, field_id, category):
+        """Code of a category used in the centroids
+
+        """
+        codes = self.categories.setdefault(field_id, {})
+        if category not in codes:
+            codes[category] = len(codes) + 1
+        return codes[category]
+
+    def _key(self, key):
+        """Field ID for a key in the input data and whether the field is
+           used in the cluster
+
+        """
+        if key not in self.keys:
+            cluster = self.local_cluster
+            field_id = key if key in cluster.fields else \
+                cluster.inverted_fields.get(key, key)
+            self.keys[key] = (field_id, field_id in cluster.model_fields)
+        return self.keys[key]
+
+    def _value(self, field_id, value):
+        """Value of a used field as stored in the input matrix. The values
+           are cast by the local Cluster only once.
+
+        """
+        cache = self.values_cache.setdefault(field_id, {})
+        if value not in cache:
+            if len(cache) >= MAX_CACHED_VALUES:
+                cache.clear()
+            norm_input_data = {field_id: value}
+            cast(norm_input_data, self.local_cluster.fields)
+            norm_value = norm_input_data[field_id]
+            if field_id in self.categories:
+                norm_value = self.categories[field_id].get(norm_value,
+                                                           OTHER_CODE)
+            elif field_id in self.field_index and \
+                    (isinstance(norm_value, bool) or
+                     not isinstance(norm_value, (int, float))):
+                norm_value = np.nan
+            cache[value] = norm_value
+        return cache[value]
+
+    def _default(self, field_id):
+        """Value used for a missing numeric field, as set in the cluster's
+           `default_numeric_value`
+
+        """
+        cluster = self.local_cluster
+        if cluster.default_numeric_value == "zero":
+            return 0
+        value = cluster.fields[field_id]["summary"].get(
+            cluster.default_numeric_value)
+        return np.nan if value is None else value
+
+    def _matrix(self, input_data_list):
+        """Input data as a matrix of values in the order of the centroids'
+           fields. Categories are replaced by their codes. Rows that
+           cannot be encoded are flagged to be assigned by the local
+           Cluster.
+
+        """
+        cluster = self.local_cluster
+        values = np.zeros((len(input_data_list), len(self.field_ids)))
+        fallback = np.zeros(len(input_data_list), dtype=bool)
+        for row, input_data in enumerate(input_data_list):
+            found = set()
+            #pylint: disable=locally-disabled,broad-except
+            try:
+                for key, value in input_data.items():
+                    if cluster.normalize(value) is None:
+                        continue
+                    field_id, used = self._key(key)
+                    if not used:
+                        continue
+                    found.add(field_id)
+                    column = self.field_index.get(field_id)
+                    value = self._value(field_id, value)
+                    if column is not None:
+                        values[row, column] = value
+            except Exception:
+                fallback[row] = True
+                continue
+            for field_id in self.required:
+                if field_id not in found:
+                    if cluster.default_numeric_value is None:
+                        fallback[row] = True
+                        break
+                    column = self.field_index.get(field_id)
+                    if column is not None:
+                        values[row, column] = self._default(field_id)
+            for field_id in self.categories:
+                if field_id not in found:
+                    values[row, self.field_index[field_id]] = MISSING_CODE
+        return values, fallback
+
+    def _distances2(self, values):
+        """Squared distances from the rows in `values` to all the centroids
+
+        """
+        distances2 = np.zeros((values.shape[0], self.centers.shape[0]))
+        for index, numeric in enumerate(self.numeric):
+            scale = self.scales[index]
+            if numeric:
+                differences = (values[:, index, np.newaxis] -
+                               self.centers[np.newaxis, :, index]) * scale
+                distances2 += differences * differences
+            else:
+                distances2 += np.where(
+                    values[:, index, np.newaxis] !=
+                    self.centers[np.newaxis, :, index], scale * scale, 0.0)
+        return distances2
+
+    def _distance2(self, row_values, centroid):
+        """Squared distance from a row to a centroid computed with the
+           same floating point operations as the local Cluster
+
+        """
+        distance2 = 0.0
+        for value, center, scale, numeric in zip(
+                row_values, self.center_values[centroid],
+                self.scale_values, self.numeric):
+            if numeric:
+                distance2 += ((value - center) * scale) ** 2
+            elif value != center:
+                distance2 += 1 * scale ** 2
+        return distance2
+
+    def _closest(self, row_values, candidates):
+        """First centroid among the candidates with the minimum distance,
+           as chosen by the local Cluster
+
+        """
+        nearest, nearest_distance2 = None, float('inf')
+        for centroid in candidates:
+            distance2 = self._distance2(row_values, centroid)
+            if distance2 < nearest_distance2:
+                nearest, nearest_distance2 = centroid, distance2
+        return nearest
+
+    def _nearest(self, values):
+        """Index of the nearest centroid to each row, or -1 if it cannot be
+           found. The centroids whose distance is close to the minimum
+           one are compared again using the operations of the local
+           Cluster, so that rounding differences cannot change the result.
+
+        """
+        rows_values = values.tolist()
+        if self.index is None:
+            distances2 = self._distances2(values)
+            finite = np.isfinite(distances2).all(axis=1)
+            nearest = np.argmin(distances2, axis=1)
+            minimum = distances2[np.arange(len(nearest)), nearest]
+            close = distances2 <= (minimum * (1 + TOLERANCE))[:, np.newaxis]
+            for row in np.flatnonzero(close.sum(axis=1) > 1):
+                nearest[row] = self._closest(rows_values[row],
+                                             np.flatnonzero(close[row]))
+            nearest[~finite] = -1
+            return nearest
+        nearest = np.full(values.shape[0], -1)
+        points = values * self.scales
+        finite = np.isfinite(points).all(axis=1)
+        distances, _ = self.index.query(np.where(finite[:, np.newaxis],
+                                                 points, 0))
+        for row in np.flatnonzero(finite):
+            point, distance = points[row], distances[row]
+            margin = TOLERANCE * (distance + np.abs(point).sum() + 1)
+            candidates = sorted(self.index.query_ball_point(
+                point, distance + margin))
+            if candidates:
+                nearest[row] = self._closest(rows_values[row], candidates)
+        return nearest
+
+    def centroids(self, input_data_list):
+        """Nearest centroids for a list of input data dictionaries. The
+           results are the ones that the local Cluster `centroid` method
+           produces, or None for the rows where it fails.
+
+        """
+        values, fallback = self._matrix(input_data_list)
+        nearest = self._nearest(values)
+        centroids = self.local_cluster.centroids
+        results = []
+        for input_data, row_values, index, row_fallback in zip(
+                input_data_list, values.tolist(), nearest, fallback):
+            if row_fallback or index < 0:
+                #pylint: disable=locally-disabled,broad-except
+                try:
+                    results.append(self.local_cluster.centroid(input_data))
+                except Exception:
+                    results.append(None)
+                continue
+            centroid = centroids[index]
+            distance2 = self._distance2(row_values, index)
+            results.append({'centroid_id': centroid.centroid_id,
+                            'centroid_name': centroid.name,
+                            'distance': math.sqrt(distance2)})
+        return results
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Batch inference of deepnets
+
+   The rows in a chunk are preprocessed by the local Deepnet and stacked
+   in a matrix that goes through the layers of the network at once. By
+   default, the layers are computed with the bindings' propagation, so
+   that the predictions are the same as the local Deepnet ones. When using
+   single precision floats, each layer is computed as a single matrix
+   product for the whole chunk, which reduces memory and increases the
+   throughput but can change the last decimals of the outputs.
+
+"""
+
+
+import numpy as np
+
+import bigml.laminar.numpy_ops as net
+import bigml.laminar.preprocess_np as pp
+
+from bigml.deepnet import expand_terms, moments
+from bigml.constants import DECIMALS
+from bigml.util import cast, PRECISION
+
+
+def batch_deepnet_predictable(local_deepnet, operating_point=None):
+    """Checks whether the local Deepnet can be evaluated using a
+       BatchDeepnet. Only deepnets evaluated with the bindings' numpy
+       functions and not using operating points are batched.
+
+    """
+    return local_deepnet.using_laminar and not local_deepnet.regions and \
+        local_deepnet.network is not None and not operating_point and \
+        not local_deepnet.operation_settings
+
+
+def propagate(x_in, layers):
+    """Output of the network layers for the rows in `x_in`, computing each
+       layer as a matrix product. The summation order differs from the
+       bindings' propagation, so it is only used for single precision
+       layers.
+
+    """
+    last_x = identities = x_in
+    if any(layer["residuals"] for layer in layers):
+        first_identities = not any(layer["residuals"] for layer in layers[:2])
+    else:
+        first_identities = False
+    for index, layer in enumerate(layers):
+        x_dot_w = np.dot(last_x, layer["weights"].T)
+        if layer["mean"] is not None and layer["stdev"] is not None:
+            next_in = net.batch_norm(x_dot_w, layer["mean"], layer["stdev"],
+                                     layer["offset"], layer["scale"])
+        else:
+            next_in = net.plus(x_dot_w, layer["offset"])
+        if layer["residuals"]:
+            next_in = net.add_residuals(next_in, identities)
+            last_x = net.ACTIVATORS[layer["activation_function"]](next_in)
+            identities = last_x
+        else:
+            last_x = net.ACTIVATORS[layer["activation_function"]](next_in)
+            if first_identities and index == 0:
+                identities = last_x
+    return last_x
+
+
+class BatchDeepnet():
+    """Local Deepnet whose layers are stored as arrays to predict lists of
+       input data at once.
+
+    """
+
+    def __init__(self, local_deepnet, float32=False):
+        self.local_deepnet = local_deepnet
+        self.ftype = np.float32 if float32 else np.float64
+        self.propagate = propagate if float32 else net.propagate
+        network = local_deepnet.network
+        self.trees = network.get("trees")
+        self.networks = [
+            (net.init_layers(model["layers"]) if not float32 else
+             [net.init_layer(layer, ftype=self.ftype) for layer in
+              model["layers"]], bool(model.get("trees")))
+            for model in (local_deepnet.networks or [network])]
+
+    def _columns(self, input_data):
+        """Values of the input columns of the network before preprocessing,
+           as built by the local Deepnet
+
+        """
+        deepnet = self.local_deepnet
+        norm_input_data, unused_fields = deepnet.filter_input_data(
+            input_data, add_unused_fields=True)
+        cast(norm_input_data, deepnet.fields)
+        unique_terms = deepnet.get_unique_terms(norm_input_data)
+        columns = []
+        for field_id in deepnet.input_fields:
+            if field_id in deepnet.tag_clouds:
+                columns.extend(expand_terms(deepnet.tag_clouds[field_id],
+                                            unique_terms.get(field_id, [])))
+            elif field_id in deepnet.items:
+                columns.extend(expand_terms(deepnet.items[field_id],
+                                            unique_terms.get(field_id, [])))
+            elif field_id in deepnet.categories:
+                category = unique_terms.get(field_id)
+                columns.append(None if category is None else
+                               category[0][0])
+            elif deepnet.missing_numerics and deepnet.fields[field_id][
+                    "summary"].get("missing_count", 0) > 0:
+                if field_id in norm_input_data:
+                    columns.extend([norm_input_data[field_id], 0.0])
+                else:
+                    columns.extend([0.0, 1.0])
+            else:
+                columns.append(norm_input_data.get(field_id))
+        return columns, unused_fields
+
+    def _outputs(self, input_array):
+        """Output of the deepnet for the preprocessed rows, as the local
+           Deepnet `predict_single` or `predict_list` compute it
+
+        """
+        deepnet = self.local_deepnet
+        input_array = np.asarray(input_array, dtype=self.ftype)
+        input_array_trees = None
+        if self.trees is not None:
+            input_array_trees = np.asarray(
+                pp.tree_transform(input_array, self.trees), dtype=self.ftype)
+        single = not deepnet.networks
+        youts = []
+        for layers, use_trees in self.networks:
+            if (self.trees is not None) if single else use_trees:
+                y_out = self.propagate(input_array_trees, layers)
+            else:
+                y_out = self.propagate(input_array, layers)
+            y_out = np.asarray(y_out, dtype=float)
+            if deepnet.regression:
+                y_mean, y_stdev = moments(deepnet.output_exposition)
+                y_out = net.destandardize(y_out, y_mean, y_stdev)[:, 0]
+            youts.append(y_out)
+        if single:
+            return youts[0]
+        return net.sum_and_normalize(youts, deepnet.regression)
+
+    def _prediction(self, y_out):
+        """Prediction dictionary for the output of a row, as the local
+           Deepnet `to_prediction` builds it
+
+        """
+        deepnet = self.local_deepnet
+        if deepnet.regression:
+            return {"prediction": round(float(y_out), DECIMALS)}
+        y_out = y_out.tolist()
+        index, probability = sorted(enumerate(y_out),
+                                    key=lambda x: -x[1])[0]
+        probability = round(probability, PRECISION)
+        return {"prediction": deepnet.class_names[index],
+                "probability": probability,
+                "distribution": [{"category": category,
+                                  "probability": round(y_out[i], PRECISION)}
+                                 for i, category in
+                                 enumerate(deepnet.class_names)]}
+
+    def predict(self, input_data_list):
+        """Full predictions for a list of input data dictionaries, as the
+           local Deepnet `predict` method produces them
+
+        """
+        if not input_data_list:
+            return []
+        rows_columns, unused_fields_list = zip(
+            *[self._columns(input_data) for input_data in input_data_list])
+        # the preprocessing works on lists of values per column
+        columns = [list(values) for values in zip(*rows_columns)]
+        input_array = pp.preprocess(columns, self.local_deepnet.preprocess)
+        predictions = []
+        for y_out, unused_fields in zip(self._outputs(input_array),
+                                        unused_fields_list):
+            prediction = self._prediction(y_out)
+            prediction["unused_fields"] = unused_fields
+            if "probability" in prediction:
+                prediction["confidence"] = prediction["probability"]
+            predictions.append(prediction)
+        return predictions
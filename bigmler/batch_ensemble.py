@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Compact representation of classification ensembles
+
+   The trees of all the models in the ensemble are flattened into a single
+   set of node tables: typed arrays indexed by node number that store the
+   split and the vote of each node, with the field IDs and the categories
+   replaced by integer codes shared by all the trees. The local Models are
+   only needed while their tree is flattened, so that ensembles of
+   thousands of models can be held in memory at once. A chunk of rows is
+   traversed through all the trees in one pass, and the votes of the nodes
+   where each row stops are stored in a VotesMatrix to be combined.
+
+"""
+
+
+import math
+
+from array import array
+
+import numpy as np
+
+from bigml.constants import LAST_PREDICTION
+from bigml.modelfields import ModelFields
+from bigml.multivote import PLURALITY_CODE, CONFIDENCE_CODE, ws_confidence
+from bigml.predict_utils.common import get_node
+
+import bigml.predict_utils.classification as c
+
+from bigmler.batch_tree import BatchTree, batch_predictable
+from bigmler.votes_matrix import VotesMatrix, NOT_ENOUGH_DATA
+
+
+# typecodes of the buffers where the votes of the nodes are built
+VOTE_TYPECODES = {"outputs": "i",
+                  "confidences": "d",
+                  "counts": "q",
+                  "distribution_starts": "q",
+                  "distribution_lengths": "i",
+                  "distribution_codes": "i",
+                  "distribution_instances": "d"}
+VOTE_DTYPES = {"outputs": np.int32,
+               "confidences": np.float64,
+               "counts": np.int64,
+               "distribution_starts": np.int64,
+               "distribution_lengths": np.int32,
+               "distribution_codes": np.int32,
+               "distribution_instances": np.float64}
+# combinations whose winner can be known before all the models vote
+EARLY_EXIT_METHODS = [PLURALITY_CODE, CONFIDENCE_CODE]
+# number of groups of models evaluated when using early exit
+EARLY_EXIT_STEPS = 20
+
+
+def batch_ensemble_predictable(local_model, operating_point=None):
+    """Checks whether the local Model can be part of a BatchEnsemble. Only
+       classification trees that a BatchTree can evaluate are compacted.
+
+    """
+    return not local_model.regression and \
+        batch_predictable(local_model, operating_point=operating_point)
+
+
+class BatchEnsemble(BatchTree):
+    """Node tables of all the trees in a classification ensemble, used to
+       compute the votes of every model for lists of input data at once.
+       Only the last prediction missing strategy is available.
+
+    """
+
+    #pylint: disable=locally-disabled,super-init-not-called
+    def __init__(self, local_models):
+        """`local_models`: iterable of the local Models in the ensemble. Each
+                           one is flattened and discarded before the next
+                           one is built.
+
+        """
+        self.local_model = None
+        self.regression = False
+        self.missing_strategy = LAST_PREDICTION
+        self.field_ids = []
+        self.field_index = {}
+        self.categories = {}
+        self.keys = {}
+        self.values_cache = {}
+        self.resource_ids = []
+        # classes of the objective field, shared by all the votes
+        self.classes = []
+        self.class_codes = {}
+        self.roots = array("q")
+        # votes of the nodes in models built on subsets of categories
+        self.categories_votes = {}
+        self.votes_tables = {name: array(typecode) for name, typecode in
+                             VOTE_TYPECODES.items()}
+        self._new_tables()
+        fields = {}
+        model_fields = {}
+        reference = None
+        for local_model in local_models:
+            if not batch_ensemble_predictable(local_model):
+                raise ValueError("Failed to compact the model %s." %
+                                 local_model.resource_id)
+            if reference is None:
+                reference = local_model
+                for category in local_model.objective_categories:
+                    self._class(category)
+            elif local_model.objective_id != reference.objective_id or \
+                    local_model.default_numeric_value != \
+                    reference.default_numeric_value:
+                raise ValueError("The models in the ensemble must share"
+                                 " their objective field and options.")
+            fields.update(local_model.fields)
+            model_fields.update(local_model.model_fields)
+            # the fields of the model are used to code its splits
+            self.local_model = local_model
+            offsets = c.OFFSETS[str(local_model.weighted)]
+            self.roots.append(len(self.tables["operators"]))
+            for packed_node in self._flatten(local_model.tree, offsets):
+                self._add_vote(get_node(packed_node), offsets)
+            self.resource_ids.append(local_model.resource_id)
+        if reference is None:
+            raise ValueError("No models to compact.")
+        self.local_model = ModelFields(
+            fields, objective_id=reference.objective_id,
+            missing_tokens=reference.missing_tokens,
+            model_fields=model_fields)
+        self.local_model.default_numeric_value = \
+            reference.default_numeric_value
+        self._build_arrays()
+        self.roots = np.frombuffer(self.roots, dtype=np.int64).copy()
+        for name, dtype in VOTE_DTYPES.items():
+            setattr(self, name, np.frombuffer(self.votes_tables[name],
+                                              dtype=dtype).copy())
+        del self.votes_tables
+
+    def _class(self, category):
+        """Code of a class of the objective field
+
+        """
+        if category not in self.class_codes:
+            self.class_codes[category] = len(self.classes)
+            self.classes.append(category)
+        return self.class_codes[category]
+
+    def _add_vote(self, node, offsets):
+        """Appends the vote of a node to the votes tables. The vote is the
+           prediction that the local Model issues for the rows that stop
+           at the node.
+
+        """
+        tables = self.votes_tables
+        distribution = node[offsets["wdistribution"]] if "wdistribution" \
+            in offsets else node[offsets["distribution"]]
+        output = node[offsets["output"]]
+        confidence = node[offsets["confidence"]]
+        count = node[offsets["count"]]
+        if None in [output, confidence, count, distribution]:
+            raise ValueError(NOT_ENOUGH_DATA)
+        tables["outputs"].append(self._class(output))
+        tables["confidences"].append(confidence)
+        tables["counts"].append(int(count))
+        tables["distribution_starts"].append(
+            len(tables["distribution_codes"]))
+        tables["distribution_lengths"].append(len(distribution))
+        for category, instances in distribution:
+            tables["distribution_codes"].append(self._class(category))
+            tables["distribution_instances"].append(instances)
+
+    def _max_weights(self, method):
+        """Maximum weight that the vote of each model can add to a class
+           score in the `method` combination
+
+        """
+        if method == CONFIDENCE_CODE:
+            return np.maximum.reduceat(self.confidences, self.roots)
+        return np.ones(len(self.roots))
+
+    def _final_nodes(self, values, missing, early_exit=None):
+        """Node where each row stops in each tree, or -1 for the trees that
+           were not evaluated. When `early_exit` is set to a combination
+           method, the trees are evaluated in groups and the rows whose
+           winning class cannot change are not evaluated any more.
+
+        """
+        rows_number = values.shape[0]
+        models = len(self.roots)
+        final_nodes = np.full((rows_number, models), -1, dtype=np.int64)
+        active = np.arange(rows_number)
+        # used only with early exit
+        remaining = scores = None
+        if early_exit is None:
+            group = models
+        else:
+            group = int(math.ceil(models / float(EARLY_EXIT_STEPS)))
+            max_weights = self._max_weights(early_exit)
+            # maximum weight that the models after each one can add
+            remaining = np.concatenate(
+                [np.cumsum(max_weights[::-1])[::-1][1:], [0]])
+            scores = np.zeros((rows_number, max(len(self.classes), 2)))
+        for first in range(0, models, group):
+            trees = np.arange(first, min(first + group, models))
+            nodes, _ = self._traverse(
+                values, missing, roots=np.tile(self.roots[trees], active.size),
+                rows=np.repeat(active, trees.size))
+            nodes = nodes.reshape(active.size, trees.size)
+            final_nodes[active[:, np.newaxis], trees] = nodes
+            if early_exit is None:
+                break
+            weights = np.ones(nodes.shape) if early_exit == PLURALITY_CODE \
+                else self.confidences[nodes]
+            np.add.at(scores, (np.repeat(active, trees.size),
+                               self.outputs[nodes].ravel()), weights.ravel())
+            leading = np.partition(scores[active], -2, axis=1)[:, -2:]
+            active = active[leading[:, 1] - leading[:, 0] <=
+                            remaining[trees[-1]]]
+            if not active.size:
+                break
+        return final_nodes
+
+    def votes(self, input_data_list, path=None, early_exit=None):
+        """VotesMatrix that stores the votes of the models for a list of
+           input data dictionaries, and the number of models evaluated
+           for each row. `path` is the directory used to memory-map its
+           arrays, if any. `early_exit` can be set to the plurality or
+           confidence weighted method codes to skip the models that cannot
+           change the winner of that combination.
+
+        """
+        if early_exit is not None and early_exit not in EARLY_EXIT_METHODS:
+            raise ValueError("Early exit is only available for plurality"
+                             " and confidence weighted combinations.")
+        values, missing, _ = self._matrix(input_data_list)
+        rows_number = len(input_data_list)
+        models = len(self.roots)
+        final_nodes = self._final_nodes(values, missing,
+                                        early_exit=early_exit)
+        evaluated = final_nodes >= 0
+        # the distribution items of every vote, as consecutive entries
+        lengths = np.where(evaluated, self.distribution_lengths[final_nodes],
+                           0).ravel()
+        votes_index = np.repeat(np.arange(final_nodes.size), lengths)
+        positions = np.arange(votes_index.size) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths)
+        entries = self.distribution_starts[final_nodes.ravel()][
+            votes_index] + positions
+        votes_matrix = VotesMatrix(rows_number, models, self.classes,
+                                   path=path)
+        # the models that were not evaluated issue no vote
+        votes_matrix.add_coded_votes(
+            np.where(evaluated, self.outputs[final_nodes], -1),
+            np.where(evaluated, self.confidences[final_nodes], 0),
+            np.where(evaluated, self.counts[final_nodes], 0),
+            (votes_index // models, votes_index % models,
+             self.distribution_codes[entries],
+             self.distribution_instances[entries], positions))
+        return votes_matrix, evaluated.sum(axis=1)
+
+    def _categories_votes(self, other_label):
+        """Category with the most instances in the distribution of each node,
+           leaving aside the `other_label` one, and its Wilson score
+           confidence. Nodes with no category have a -1 code.
+
+        """
+        if other_label not in self.categories_votes:
+            nodes = len(self.distribution_starts)
+            codes = np.full(nodes, -1, dtype=np.int32)
+            confidences = np.full(nodes, np.nan)
+            for node_id in range(nodes):
+                start = self.distribution_starts[node_id]
+                end = start + self.distribution_lengths[node_id]
+                distribution_codes = self.distribution_codes[
+                    start: end].tolist()
+                distribution = [
+                    [self.classes[code], instances] for code, instances in
+                    zip(distribution_codes,
+                        self.distribution_instances[start: end].tolist())]
+                category_instances = 0
+                for code, (category, instances) in zip(distribution_codes,
+                                                       distribution):
+                    if category != other_label and \
+                            instances > category_instances:
+                        codes[node_id] = code
+                        category_instances = instances
+                if codes[node_id] >= 0:
+                    confidences[node_id] = ws_confidence(
+                        self.classes[codes[node_id]], distribution)
+            self.categories_votes[other_label] = codes, confidences
+        return self.categories_votes[other_label]
+
+    def combine_categories(self, input_data_list, other_label):
+        """Combines the predictions of models built on subsets of the
+           categories of the objective field, where the rest of categories
+           are replaced by `other_label`. Each model votes for the category
+           with the most instances in its distribution and the winner is
+           the vote with the highest Wilson score confidence. Returns the
+           [prediction, confidence] for each row.
+
+        """
+        codes, confidences = self._categories_votes(other_label)
+        values, missing, _ = self._matrix(input_data_list)
+        final_nodes = self._final_nodes(values, missing)
+        voted = codes[final_nodes] >= 0
+        scores = np.where(voted, confidences[final_nodes], -np.inf)
+        # the first model with the highest confidence wins
+        winners = scores.argmax(axis=1)
+        rows = np.arange(final_nodes.shape[0])
+        winner_nodes = final_nodes[rows, winners]
+        return [[self.classes[code], confidence] if row_voted else
+                [None, None] for code, confidence, row_voted in zip(
+                    codes[winner_nodes].tolist(),
+                    confidences[winner_nodes].tolist(),
+                    voted.any(axis=1).tolist())]
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Batch forecasts of time series
+
+   The point forecasts of the ETS submodels are computed for all the steps
+   in the horizon at once, using the closed form of the recurrences in the
+   local TimeSeries submodels on arrays of steps instead of iterating
+   over them.
+
+"""
+
+
+import numpy as np
+
+from bigml.constants import DECIMALS
+from bigml.timeseries import filter_submodels, DEFAULT_SUBMODEL
+
+
+TRIVIAL_MODELS = ["naive", "mean"]
+
+
+def seasonal_contributions(final_state, steps):
+    """Seasonal contribution for each step, as chosen by the local
+       TimeSeries in the list of contributions per season
+
+    """
+    s_list = final_state.get("s", 0)
+    if not isinstance(s_list, list):
+        return np.zeros(len(steps))
+    period = len(s_list)
+    return np.array(s_list, dtype=float)[period - 1 - steps % period]
+
+
+def damped_factors(phi, steps):
+    """Damping factors phi + phi^2 + ... + phi^(h + 1) for each step h
+
+    """
+    return np.cumsum(np.power(float(phi), steps + 1))
+
+
+def point_forecasts(submodel, horizon):
+    """Point forecasts of the submodel for the steps in the horizon, as the
+       local TimeSeries computes them
+
+    """
+    name = submodel["name"]
+    steps = np.arange(horizon)
+    if name in TRIVIAL_MODELS:
+        values = np.array(submodel["value"], dtype=float)
+        return values[steps % len(values)]
+    if name == "drift":
+        return submodel["value"] + submodel["slope"] * (steps + 1.0)
+    _, trend, seasonality = name.split(",")
+    final_state = submodel.get("final_state", {})
+    level = final_state.get("l", 0)
+    slope = final_state.get("b", 0)
+    if trend == "N":
+        points = np.full(horizon, level, dtype=float)
+    elif trend == "A":
+        points = level + slope * (steps + 1.0)
+    elif trend == "Ad":
+        points = level + damped_factors(submodel.get("phi", 0), steps) * \
+            slope
+    elif trend == "M":
+        points = level * np.power(float(slope), steps + 1)
+    else:
+        points = level * np.power(
+            float(slope), damped_factors(submodel.get("phi", 0), steps))
+    if seasonality == "A":
+        points = points + seasonal_contributions(final_state, steps)
+    elif seasonality == "M":
+        points = points * seasonal_contributions(final_state, steps)
+    return points
+
+
+def compute_forecasts(submodels, horizon):
+    """Forecasts of each of the submodels for the horizon
+
+    """
+    return [{"model": submodel["name"],
+             "point_forecast": [round(value, DECIMALS) for value in
+                                point_forecasts(submodel,
+                                                horizon).tolist()]}
+            for submodel in submodels]
+
+
+def forecast(local_time_series, input_data=None):
+    """Forecasts for the objective fields in the input data, as the local
+       TimeSeries `forecast` method returns them
+
+    """
+    if not input_data:
+        return local_time_series.forecast()
+    norm_input_data = local_time_series.filter_objectives(input_data)
+    forecasts = {}
+    for field_id, field_input in norm_input_data.items():
+        filter_info = field_input.get("ets_models", {}) or DEFAULT_SUBMODEL
+        forecasts[field_id] = compute_forecasts(
+            filter_submodels(local_time_series.ets_models[field_id],
+                             filter_info), field_input["horizon"])
+    return forecasts
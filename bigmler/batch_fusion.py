@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Batch predictions of fusions
+
+   The local Fusion builds its component models again for every
+   prediction. Here, the components are built once and shared by all the
+   fusions in the run, so that a model used by several nested fusions is
+   loaded only once. The components are also stored in the local cache
+   directory, if used, to be loaded by the next runs. Each component
+   evaluates a whole chunk of rows, using the batch scorers of logistic and
+   linear regressions, and its outputs for the chunk are reused by every
+   fusion that contains it. The outputs are then weighted and combined as
+   the local Fusion does.
+
+"""
+
+
+from bigml.api import get_resource_type
+from bigml.constants import DECIMALS
+from bigml.fusion import Fusion, rearrange_prediction
+from bigml.model import LAST_PREDICTION
+from bigml.multivotelist import MultiVoteList
+from bigml.supervised import SupervisedModel
+from bigml.util import cast, check_no_missing_numerics
+
+from bigmler.batch_regression import batch_regression, \
+    batch_regression_predictable
+from bigmler.local_cache import cached_local, DEFAULT_CACHE_SIZE
+
+
+# component types that use the missing strategy
+MISSING_STRATEGY_TYPES = ["model", "ensemble", "fusion"]
+
+
+def batch_fusion_predictable(local_fusion, operating_point=None):
+    """Checks whether the local model is a Fusion that can be evaluated
+       using a BatchFusion. Operating points are left to the local Fusion.
+
+    """
+    if not isinstance(local_fusion, Fusion) or operating_point:
+        return False
+    settings = getattr(local_fusion, "operation_settings", None) or {}
+    return not settings.get("operating_point")
+
+
+def _failed(output):
+    """Whether the output of a component is an exception
+
+    """
+    return isinstance(output, Exception)
+
+
+class Component():
+    """Component model of a fusion and the batch scorer used to evaluate it,
+       if any
+
+    """
+
+    def __init__(self, model_id, api=None, components=None, cache_dir=None,
+                 max_size=DEFAULT_CACHE_SIZE):
+        """`cache_dir`: directory of the local cache, if used
+           `max_size`: maximum size of the local cache in MB
+
+        """
+        self.model_type = get_resource_type(model_id)
+        self.batch_model = None
+        if self.model_type == "fusion":
+            self.model = BatchFusion(
+                cached_local(Fusion, model_id, api=api, cache_dir=cache_dir,
+                             max_size=max_size),
+                components=components, cache_dir=cache_dir,
+                max_size=max_size)
+            self.resource_id = self.model.local_fusion.resource_id
+            self.class_names = self.model.local_fusion.class_names
+        else:
+            self.model = cached_local(SupervisedModel, model_id, api=api,
+                                      cache_dir=cache_dir, max_size=max_size)
+            self.resource_id = self.model.resource_id
+            self.class_names = getattr(self.model, "class_names", None)
+            if batch_regression_predictable(self.model):
+                self.batch_model = batch_regression(self.model)
+
+    def _row_outputs(self, input_data, missing_strategy):
+        """Probability and confidence of the component for a row, as
+           the local Fusion obtains them, or the exceptions raised
+
+        """
+        kwargs = {}
+        if self.model_type in MISSING_STRATEGY_TYPES:
+            kwargs.update({"missing_strategy": missing_strategy})
+        #pylint: disable=locally-disabled,broad-except
+        try:
+            probability = self.model.predict_probability(
+                input_data, compact=True, **kwargs)
+        except Exception as exc:
+            probability = exc
+        try:
+            confidence = self.model.predict_confidence(
+                input_data, compact=False, **kwargs)
+        except Exception as exc:
+            confidence = exc
+        return probability, confidence
+
+    def _batch_outputs(self, rows):
+        """Probabilities and confidences of a logistic or linear regression
+           computed by its batch scorer
+
+        """
+        outputs = []
+        for prediction in self.batch_model.predict(rows):
+            if self.model.regression:
+                # linear regressions have no confidence
+                outputs.append(([prediction["prediction"]],
+                                AttributeError("No confidence")))
+                continue
+            distribution = sorted(prediction["distribution"],
+                                  key=lambda x: x["category"])
+            outputs.append((
+                [category["probability"] for category in distribution],
+                [{"category": category["category"],
+                  "confidence": category["probability"]}
+                 for category in distribution]))
+        return outputs
+
+    def outputs(self, rows, missing_strategy=LAST_PREDICTION, results=None):
+        """List of (probability, confidence) outputs for the rows. Nested
+           fusions reuse the outputs in `results`.
+
+        """
+        if self.model_type == "fusion":
+            return self.model.outputs(rows, missing_strategy=missing_strategy,
+                                      results=results)
+        if self.batch_model is not None:
+            #pylint: disable=locally-disabled,broad-except
+            try:
+                return self._batch_outputs(rows)
+            except Exception:
+                # rows rejected by the local model are evaluated one by one
+                # to find the ones that fail
+                pass
+        return [self._row_outputs(input_data, missing_strategy)
+                for input_data in rows]
+
+
+class BatchFusion():
+    """Local Fusion whose components are built once to predict lists of
+       input data at once
+
+    """
+
+    def __init__(self, local_fusion, components=None, cache_dir=None,
+                 max_size=DEFAULT_CACHE_SIZE):
+        """`components`: dictionary of the Component objects already built
+                         in this run, keyed by model ID
+           `cache_dir`: directory of the local cache where the components
+                        are stored, if used
+           `max_size`: maximum size of the local cache in MB
+
+        """
+        self.local_fusion = local_fusion
+        if components is None:
+            components = {}
+        self.components = components
+        self.models = []
+        for models_split in local_fusion.models_splits:
+            # the local Fusion passes the missing strategy to the models
+            # in a split according to the type of its last model
+            uses_missing = get_resource_type(models_split[-1]) in \
+                MISSING_STRATEGY_TYPES
+            for model_id in models_split:
+                if model_id not in components:
+                    components[model_id] = Component(
+                        model_id, api=local_fusion.api,
+                        components=components, cache_dir=cache_dir,
+                        max_size=max_size)
+                self.models.append((model_id, uses_missing))
+
+    def _components_outputs(self, rows, missing_strategy, results):
+        """Outputs of the components of the fusion for the rows. The
+           `results` dictionary keeps the outputs of the components already
+           evaluated for these rows.
+
+        """
+        outputs = []
+        for model_id, uses_missing in self.models:
+            strategy = missing_strategy if uses_missing else LAST_PREDICTION
+            key = (model_id, strategy)
+            if key not in results:
+                results[key] = self.components[model_id].outputs(
+                    rows, missing_strategy=strategy, results=results)
+            outputs.append((self.components[model_id], results[key]))
+        return outputs
+
+    def _probability(self, components_outputs, row):
+        """Compact probabilities of the row, as the local Fusion
+           `predict_probability` method computes them
+
+        """
+        fusion = self.local_fusion
+        votes = MultiVoteList([])
+        weights = []
+        for component, outputs in components_outputs:
+            prediction = outputs[row][0]
+            if _failed(prediction):
+                if isinstance(prediction, ValueError):
+                    continue
+                raise prediction
+            if fusion.regression:
+                prediction = prediction[0]
+            else:
+                prediction = list(prediction)
+            weights.append(fusion.weights[fusion.model_ids.index(
+                component.resource_id)])
+            prediction = fusion.weigh(prediction, component.resource_id)
+            if not fusion.regression and \
+                    fusion.class_names != component.class_names:
+                try:
+                    prediction = rearrange_prediction(
+                        component.class_names, fusion.class_names,
+                        prediction)
+                except AttributeError:
+                    pass
+            votes.append(prediction)
+        if fusion.regression:
+            prediction = 0
+            total_weight = sum(weights)
+            for pred in votes.predictions:
+                prediction += pred
+            if total_weight > 0:
+                prediction /= float(total_weight)
+            return [prediction]
+        return votes.combine_to_distribution(normalize=True)
+
+    def _confidence(self, components_outputs, row):
+        """Confidences of the row, as the local Fusion `predict_confidence`
+           method computes them
+
+        """
+        fusion = self.local_fusion
+        predictions = []
+        weights = []
+        for component, outputs in components_outputs:
+            prediction = outputs[row][1]
+            if _failed(prediction):
+                continue
+            predictions.append(prediction)
+            weights.append(fusion.weights[fusion.model_ids.index(
+                component.resource_id)])
+        if fusion.regression:
+            prediction = 0
+            confidence = 0
+            total_weight = sum(weights)
+            for index, pred in enumerate(predictions):
+                prediction += pred.get("prediction") * weights[index]
+                confidence += pred.get("confidence")
+            if total_weight > 0:
+                prediction /= float(total_weight)
+                confidence /= float(len(predictions))
+            return {"prediction": prediction, "confidence": confidence}
+        output = []
+        count = float(len(predictions))
+        for class_name in fusion.class_names:
+            confidence = 0
+            for prediction in predictions:
+                for category_info in prediction:
+                    if category_info["category"] == class_name:
+                        confidence += category_info.get("confidence")
+                        break
+            output.append(round(confidence / count, DECIMALS))
+        return [{"category": class_name, "confidence": confidence}
+                for class_name, confidence in zip(fusion.class_names,
+                                                  output)]
+
+    def outputs(self, rows, missing_strategy=LAST_PREDICTION, results=None):
+        """List of (probability, confidence) outputs of the fusion for rows
+           that have already been filtered and cast, as the compact
+           `predict_probability` and the `predict_confidence` methods of
+           the local Fusion return them, or the exceptions they raise
+
+        """
+        fusion = self.local_fusion
+        if results is None:
+            results = {}
+        components_outputs = self._components_outputs(
+            rows, missing_strategy, results)
+        outputs = []
+        for row, input_data in enumerate(rows):
+            pair = []
+            for method in [self._probability, self._confidence]:
+                #pylint: disable=locally-disabled,broad-except
+                try:
+                    if not fusion.missing_numerics:
+                        check_no_missing_numerics(input_data,
+                                                  fusion.model_fields)
+                    pair.append(method(components_outputs, row))
+                except Exception as exc:
+                    pair.append(exc)
+            outputs.append(tuple(pair))
+        return outputs
+
+    def predict(self, input_data_list, missing_strategy=LAST_PREDICTION):
+        """Full predictions for a list of input data dictionaries, as the
+           local Fusion `predict` method produces them
+
+        """
+        fusion = self.local_fusion
+        rows, unused_fields_list = [], []
+        for input_data in input_data_list:
+            norm_input_data, unused_fields = fusion.filter_input_data(
+                input_data, add_unused_fields=True)
+            if not fusion.missing_numerics:
+                check_no_missing_numerics(norm_input_data,
+                                          fusion.model_fields)
+            cast(norm_input_data, fusion.fields)
+            rows.append(norm_input_data)
+            unused_fields_list.append(unused_fields)
+        predictions = []
+        for (probability, confidence), unused_fields in zip(
+                self.outputs(rows, missing_strategy=missing_strategy),
+                unused_fields_list):
+            if _failed(probability):
+                raise probability
+            if _failed(confidence):
+                raise confidence
+            if fusion.regression:
+                result = {"prediction": probability[0],
+                          "confidence": confidence["confidence"]}
+            else:
+                result = [{"category": class_name,
+                           "probability": class_probability}
+                          for class_name, class_probability in
+                          zip(fusion.class_names, probability)]
+                #pylint: disable=locally-disabled,broad-except
+                try:
+                    for index, value in enumerate(result):
+                        value.update(
+                            {"confidence": confidence[index]["confidence"]})
+                except Exception:
+                    pass
+                result = sorted(result,
+                                key=lambda x: - x["probability"])[0]
+                result["prediction"] = result["category"]
+                del result["category"]
+            if unused_fields:
+                result.update({"unused_fields": unused_fields})
+            predictions.append(dict((key, value) for key, value in
+                                    result.items() if value is not None))
+        return predictions
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Batch inference of deepnets with image fields
+
+   The input rows are prepared apart from the network evaluation: the
+   images are decoded into pixel arrays as the local Deepnet would do it,
+   so that this work can be done by a pool of threads ahead of the
+   predictor. The prepared rows whose images have the same shape are then
+   stacked and evaluated in a single forward pass of the network.
+
+"""
+
+
+from bigml.constants import DECIMALS
+from bigml.util import cast
+
+try:
+    from sensenet.load import to_image_pixels
+except ImportError:
+    to_image_pixels = None
+
+
+IMAGE = "image"
+# number of decoded rows evaluated in each forward pass
+IMAGE_BATCH_SIZE = 64
+
+
+def batch_image_predictable(local_deepnet, operating_point=None):
+    """Checks whether the local Deepnet has image inputs and can be evaluated
+       using a BatchImageDeepnet. Only deepnets evaluated by the sensenet
+       library that don't predict regions or use operating points are
+       batched.
+
+    """
+    return to_image_pixels is not None and \
+        local_deepnet.deepnet is not None and not local_deepnet.regions and \
+        not operating_point and not local_deepnet.operation_settings and \
+        any(local_deepnet.fields[field_id]["optype"] == IMAGE
+            for field_id in local_deepnet.input_fields)
+
+
+class BatchImageDeepnet():
+    """Local Deepnet whose image inputs are decoded separately to predict
+       lists of prepared rows at once.
+
+    """
+
+    def __init__(self, local_deepnet):
+        self.local_deepnet = local_deepnet
+        # positions of the image values in the network input columns, as
+        # built by the local Deepnet `fill_array` method
+        self.image_columns = []
+        column = 0
+        for field_id in local_deepnet.input_fields:
+            if field_id in local_deepnet.tag_clouds:
+                column += len(local_deepnet.tag_clouds[field_id])
+            elif field_id in local_deepnet.items:
+                column += len(local_deepnet.items[field_id])
+            elif field_id in local_deepnet.categories:
+                column += 1
+            elif local_deepnet.fields[field_id]["optype"] == IMAGE:
+                self.image_columns.append(column)
+                column += 1
+            elif local_deepnet.missing_numerics and local_deepnet.fields[
+                    field_id]["summary"].get("missing_count", 0) > 0:
+                column += 2
+            else:
+                column += 1
+
+    def prepare(self, input_data):
+        """Network input columns for the input data, with the images decoded
+           into pixel arrays, and the unused fields
+
+        """
+        deepnet = self.local_deepnet
+        norm_input_data, unused_fields = deepnet.filter_input_data(
+            input_data, add_unused_fields=True)
+        cast(norm_input_data, deepnet.fields)
+        columns = deepnet.fill_array(norm_input_data,
+                                     deepnet.get_unique_terms(norm_input_data))
+        for column in self.image_columns:
+            columns[column] = to_image_pixels(columns[column], None)
+        return columns, unused_fields
+
+    def _prediction(self, y_out, unused_fields):
+        """Full prediction for the network output of a row, as the local
+           Deepnet `predict` method builds it
+
+        """
+        prediction = self.local_deepnet.to_prediction(list(y_out))
+        if not isinstance(prediction, dict):
+            prediction = {"prediction": round(prediction, DECIMALS)}
+        prediction.update({"unused_fields": unused_fields})
+        if "probability" in prediction:
+            prediction["confidence"] = prediction.get("probability")
+        return prediction
+
+    def predict(self, prepared_rows):
+        """Full predictions for a list of rows returned by `prepare`. The
+           rows whose images have the same shape are evaluated at once.
+
+        """
+        groups = {}
+        for index, (columns, _) in enumerate(prepared_rows):
+            shapes = tuple(columns[column].shape for column in
+                           self.image_columns)
+            groups.setdefault(shapes, []).append(index)
+        predictions = [None] * len(prepared_rows)
+        for indices in groups.values():
+            y_outs = self.local_deepnet.deepnet(
+                [prepared_rows[index][0] for index in indices])
+            for index, y_out in zip(indices, y_outs):
+                predictions[index] = self._prediction(
+                    y_out, prepared_rows[index][1])
+        return predictions
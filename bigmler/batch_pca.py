@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Batch projections of PCAs
+
+   The expanded inputs of a chunk of rows are stored in a matrix that is
+   standardized column-wise and multiplied by the matrix of the selected
+   eigenvectors in one call. The rows with missing values are normalized
+   using the mask of their non-missing columns, as the local PCA does.
+   The terms found in each field value are cached, so that repeated texts
+   and categories are parsed only once.
+
+"""
+
+
+import numpy as np
+
+from bigml.util import cast
+
+
+NUMERIC = "numeric"
+CATEGORICAL = "categorical"
+EXPANSION_ATTRIBUTES = {"categorical": "categories", "text": "tag_clouds",
+                        "items": "items"}
+# maximum number of parsed values kept for each field
+MAX_CACHED_VALUES = 10000
+
+
+def selected_components(local_pca, max_components=None,
+                        variance_threshold=None):
+    """Eigenvectors used in the projections, selected as the local PCA
+       `projection` method does
+
+    """
+    components = local_pca.eigenvectors[:]
+    if max_components is not None:
+        components = components[0: max_components]
+    if variance_threshold is not None:
+        for index, cumulative in enumerate(local_pca.cumulative_variance):
+            if cumulative > variance_threshold:
+                components = components[0: index + 1]
+    return components
+
+
+class BatchPCA():
+    """Local PCA whose eigenvectors and standardization parameters are
+       stored as arrays to project lists of input data at once.
+
+    """
+
+    def __init__(self, local_pca, max_components=None,
+                 variance_threshold=None):
+        self.local_pca = local_pca
+        self.components = np.array(selected_components(
+            local_pca, max_components=max_components,
+            variance_threshold=variance_threshold), dtype=float)
+        # the missing factors use the squared eigenvectors
+        self.squared_components = self.components ** 2
+        self.value_columns = {}
+        self.term_columns = {}
+        self.missing_columns = {}
+        self.field_columns = {}
+        means, stdevs = [], []
+        offset = 0
+        for field_id in local_pca.input_fields:
+            field = local_pca.fields[field_id]
+            optype = field["optype"]
+            if optype == NUMERIC:
+                self.value_columns[field_id] = offset
+                length = 1
+            else:
+                terms = getattr(local_pca,
+                                EXPANSION_ATTRIBUTES[optype])[field_id]
+                columns = {}
+                for index, term in enumerate(terms):
+                    # the local PCA uses the first occurrence of a term
+                    columns.setdefault(term, offset + index)
+                self.term_columns[field_id] = columns
+                length = len(terms)
+                if optype == CATEGORICAL and \
+                        field["summary"].get("missing_count", 0) > 0:
+                    self.missing_columns[field_id] = offset + length
+                    length += 1
+            self.field_columns[field_id] = (offset, offset + length)
+            if local_pca.standardized:
+                #pylint: disable=locally-disabled,protected-access
+                for index in range(length):
+                    mean, stdev = local_pca._get_mean_stdev(
+                        field, field_id, None if optype == NUMERIC
+                        else index)
+                    means.append(mean)
+                    stdevs.append(stdev)
+            offset += length
+        self.width = offset
+        self.means = np.array(means, dtype=float)
+        # columns with zero deviation are only centered
+        self.stdevs = np.array([stdev if stdev > 0 else 1 for stdev in
+                                stdevs], dtype=float)
+        self.terms_cache = {}
+
+    def _terms(self, field_id, value):
+        """Columns and frequencies for the terms in a field value. The
+           value is parsed by the local PCA only once.
+
+        """
+        cache = self.terms_cache.setdefault(field_id, {})
+        if value not in cache:
+            if len(cache) >= MAX_CACHED_VALUES:
+                cache.clear()
+            columns = self.term_columns[field_id]
+            entries = []
+            # the local PCA stops at the first unknown term
+            for term, frequency in self.local_pca.get_unique_terms(
+                    {field_id: value}).get(field_id, []):
+                if term not in columns:
+                    break
+                entries.append((columns[term], frequency))
+            cache[value] = entries
+        return cache[value]
+
+    def _design(self, input_data_list):
+        """Standardized input matrix for the list of input data, the mask
+           of its non-missing columns and the rows that have missing
+           non-categorical values
+
+        """
+        local_pca = self.local_pca
+        rows = len(input_data_list)
+        inputs = np.zeros((rows, self.width), dtype=float)
+        mask = np.ones((rows, self.width), dtype=float)
+        missings = np.zeros(rows, dtype=bool)
+        numeric_missings = []
+        for row, input_data in enumerate(input_data_list):
+            norm_input_data = local_pca.filter_input_data(
+                input_data, add_unused_fields=False)
+            cast(norm_input_data, local_pca.fields)
+            for field_id in local_pca.input_fields:
+                if field_id in self.value_columns:
+                    column = self.value_columns[field_id]
+                    if field_id in norm_input_data:
+                        inputs[row, column] = norm_input_data[field_id]
+                    else:
+                        mask[row, column] = 0
+                        missings[row] = True
+                        numeric_missings.append((row, column))
+                elif field_id in norm_input_data:
+                    for column, frequency in self._terms(
+                            field_id, norm_input_data[field_id]):
+                        inputs[row, column] = frequency
+                elif field_id in self.missing_columns:
+                    inputs[row, self.missing_columns[field_id]] = 1
+                elif field_id not in local_pca.categories:
+                    start, end = self.field_columns[field_id]
+                    mask[row, start: end] = 0
+                    missings[row] = True
+        if local_pca.standardized:
+            inputs -= self.means
+            inputs /= self.stdevs
+            # missing numeric values are not standardized
+            for row, column in numeric_missings:
+                inputs[row, column] = 0
+        return inputs, mask, missings
+
+    def projections(self, input_data_list):
+        """Projections for a list of input data dictionaries, as the local
+           PCA `projection` method computes them
+
+        """
+        if not input_data_list:
+            return []
+        inputs, mask, missings = self._design(input_data_list)
+        result = inputs.dot(self.components.T)
+        if missings.any():
+            # the rows with missing values are divided by the norm of the
+            # eigenvectors restricted to their non-missing columns
+            factors = mask[missings].dot(self.squared_components.T)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                result[missings] = np.where(
+                    factors > 0, result[missings] / factors,
+                    result[missings])
+        return result.tolist()
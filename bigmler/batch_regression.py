@@ -0,0 +1,526 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Batch scoring of logistic and linear regressions
+
+   The expanded inputs of a chunk of rows (numeric values, one-hot encoded
+   categories, text and items term counts and missing indicators) are
+   stored in a sparse design matrix that is multiplied by the matrix of
+   coefficients in one call, and the logistic function is applied to the
+   whole result. The terms found in each field value are cached, so that
+   repeated texts and categories are parsed only once. The rows that the
+   local model rejects are predicted by the local model, and so are the
+   rows whose results are closer to a rounding boundary than
+   ROUNDING_TOLERANCE * (n + 1) * (M + 1), where n is the number of terms
+   added to compute them and M the sum of their absolute values. The error
+   of a floating point sum of products is bounded by n * eps / 2 * M, so
+   the results of the two summation orders can only differ by less than
+   that margin and are otherwise rounded the same way.
+
+"""
+
+
+import numpy as np
+
+from scipy.sparse import csr_matrix
+
+from bigml.constants import DECIMALS
+from bigml.linear import LinearRegression
+from bigml.logistic import LogisticRegression, balance_input
+from bigml.util import cast, check_no_missing_numerics, \
+    check_no_training_missings, flatten, PRECISION
+
+
+NUMERIC = "numeric"
+CATEGORICAL = "categorical"
+EXPANSION_ATTRIBUTES = {"categorical": "categories", "text": "tag_clouds",
+                        "items": "items"}
+DUMMY = "dummy"
+CONTRAST = "contrast"
+OTHER = "other"
+# maximum number of parsed values kept for each field
+MAX_CACHED_VALUES = 10000
+# results closer to a rounding boundary than this tolerance times the
+# number of terms and the sum of their absolute values are computed by the
+# local model. It is several times the unit roundoff of float64 numbers.
+ROUNDING_TOLERANCE = 1e-15
+
+
+def batch_regression_predictable(local_model, operating_point=None):
+    """Checks whether the local model is a logistic or linear regression
+       that can be evaluated using a BatchRegression. Operating points and
+       fields whose expansion is unknown are left to the local model.
+
+    """
+    local_model = getattr(local_model, "local_model", local_model)
+    if operating_point or \
+            not isinstance(local_model, (LogisticRegression,
+                                         LinearRegression)):
+        return False
+    if isinstance(local_model, LogisticRegression):
+        settings = local_model.operation_settings or {}
+        if settings.get("operating_point") or settings.get("operating_kind"):
+            return False
+    for field_id in local_model.input_fields:
+        optype = local_model.fields.get(field_id, {}).get("optype")
+        if optype == NUMERIC or field_id == local_model.objective_id:
+            continue
+        if optype not in EXPANSION_ATTRIBUTES or field_id not in \
+                getattr(local_model, EXPANSION_ATTRIBUTES[optype]):
+            return False
+        if isinstance(local_model, LinearRegression) and \
+                optype == CATEGORICAL and \
+                field_id not in local_model.field_codings:
+            return False
+    return True
+
+
+def batch_regression(local_model):
+    """Creates the BatchRegression for a logistic or linear regression
+
+    """
+    local_model = getattr(local_model, "local_model", local_model)
+    if isinstance(local_model, LogisticRegression):
+        return BatchLogisticRegression(local_model)
+    return BatchLinearRegression(local_model)
+
+
+def near_rounding_boundary(values, magnitudes, counts, decimals):
+    """Flags the values whose distance to a rounding boundary is not larger
+       than ROUNDING_TOLERANCE times the `counts` of terms added to compute
+       them and the `magnitudes`, that are the sums of the absolute values
+       of these terms. The local model could round them differently.
+
+    """
+    scale = 10 ** decimals
+    with np.errstate(invalid="ignore", over="ignore"):
+        boundaries = (np.floor(values * scale) + 0.5) / scale
+        margins = ROUNDING_TOLERANCE * (counts + 1) * (magnitudes + 1)
+        return ~np.isfinite(values) | (np.abs(values - boundaries) <= margins)
+
+
+class BatchRegression():
+    """Coefficients of a local regression stored in a matrix to predict
+       lists of input data at once. The columns of the design matrix are
+       allocated when compiling the model.
+
+    """
+
+    def __init__(self, local_model):
+        self.local_model = local_model
+        self.value_columns = {}
+        self.missing_columns = {}
+        self.term_columns = {}
+        self.coefficients = []
+        self.magnitudes = []
+        # fields whose values are parsed into terms by the local model
+        self.term_fields = set(local_model.term_forms) | \
+            set(local_model.item_analysis) | set(local_model.categories)
+        self.terms_cache = {}
+        self._compile()
+        self.coefficients = np.array(self.coefficients, dtype=float)
+        self.magnitudes = np.abs(np.array(self.magnitudes, dtype=float))
+
+    def _compile(self):
+        """Allocates the columns of the design matrix and their
+           coefficients
+
+        """
+        raise NotImplementedError
+
+    def _column(self, coefficients, magnitudes=None):
+        """Adds a column to the design matrix and returns its index. The
+           `magnitudes` bound the terms added to compute the coefficients.
+
+        """
+        self.coefficients.append(coefficients)
+        self.magnitudes.append(coefficients if magnitudes is None else
+                               magnitudes)
+        return len(self.coefficients) - 1
+
+    def _term_entries(self, field_id, terms):
+        """Design matrix entries for the terms found in a field
+
+        """
+        raise NotImplementedError
+
+    def _terms(self, field_id, value):
+        """Design matrix entries for the terms in a field value. The value
+           is parsed by the local model only once.
+
+        """
+        cache = self.terms_cache.setdefault(field_id, {})
+        if value not in cache:
+            if len(cache) >= MAX_CACHED_VALUES:
+                cache.clear()
+            terms = self.local_model.get_unique_terms(
+                {field_id: value})[field_id]
+            cache[value] = (self._term_entries(field_id, terms), bool(terms))
+        return cache[value]
+
+    def _check(self, norm_input_data):
+        """Raises the exception that the local model would raise for the
+           input data
+
+        """
+        raise NotImplementedError
+
+    def _entries(self, norm_input_data, unique_terms):
+        """Design matrix entries for a row as (column, value) pairs
+
+        """
+        raise NotImplementedError
+
+    def _design(self, input_data_list):
+        """Design matrix for the input data. The rows that cannot be
+           encoded are flagged to be predicted by the local model.
+
+        """
+        model = self.local_model
+        indices, data, indptr = [], [], [0]
+        unused_fields_list = []
+        fallback = np.zeros(len(input_data_list), dtype=bool)
+        for row, input_data in enumerate(input_data_list):
+            unused_fields = []
+            #pylint: disable=locally-disabled,broad-except
+            try:
+                norm_input_data, unused_fields = model.filter_input_data(
+                    input_data, add_unused_fields=True)
+                cast(norm_input_data, model.fields)
+                self._check(norm_input_data)
+                unique_terms = {}
+                for field_id in list(norm_input_data.keys()):
+                    if field_id in self.term_fields:
+                        unique_terms[field_id] = self._terms(
+                            field_id, norm_input_data.pop(field_id))
+                entries = self._entries(norm_input_data, unique_terms)
+            except Exception:
+                fallback[row] = True
+                entries = []
+            for column, value in entries:
+                indices.append(column)
+                data.append(value)
+            indptr.append(len(indices))
+            unused_fields_list.append(unused_fields)
+        design = csr_matrix(
+            (np.array(data, dtype=float), np.array(indices, dtype=int),
+             np.array(indptr, dtype=int)),
+            shape=(len(input_data_list), self.coefficients.shape[0]))
+        return design, fallback, unused_fields_list
+
+    def _prediction(self, outputs):
+        """Prediction dictionary for the outputs of a row
+
+        """
+        raise NotImplementedError
+
+    def _outputs(self, design):
+        """Outputs of the model for the rows in the design matrix and the
+           rows whose outputs may be rounded differently by the local model
+
+        """
+        raise NotImplementedError
+
+    def predict(self, input_data_list):
+        """Full predictions for a list of input data dictionaries, as the
+           local model `predict` method produces them. The confidence
+           bounds of linear regressions are not computed.
+
+        """
+        if not input_data_list:
+            return []
+        design, fallback, unused_fields_list = self._design(input_data_list)
+        outputs, risky = self._outputs(design)
+        fallback |= risky
+        predictions = []
+        for input_data, row_outputs, unused_fields, row_fallback in zip(
+                input_data_list, outputs.tolist(), unused_fields_list,
+                fallback):
+            if row_fallback:
+                predictions.append(self.local_model.predict(input_data,
+                                                            full=True))
+                continue
+            prediction = self._prediction(row_outputs)
+            prediction["unused_fields"] = unused_fields
+            predictions.append(prediction)
+        return predictions
+
+
+class BatchLogisticRegression(BatchRegression):
+    """Local LogisticRegression whose coefficients for all the classes are
+       stored in a matrix
+
+    """
+
+    def _compile(self):
+        model = self.local_model
+        self.classes = list(model.coefficients.keys())
+        objective_categories = model.categories[model.objective_id]
+        self.orders = [objective_categories.index(category) if category in
+                       objective_categories else len(objective_categories)
+                       for category in self.classes]
+        for position, field_id in enumerate(model.input_fields):
+            coefficients = [model.coefficients[category][position]
+                            for category in self.classes]
+            if field_id in model.tag_clouds or field_id in model.items:
+                terms = model.tag_clouds.get(field_id, model.items.get(
+                    field_id))
+                self._add_terms(field_id, terms, coefficients)
+                self.missing_columns[field_id] = self._column(
+                    [coefficient[len(terms)] for coefficient in
+                     coefficients])
+            elif field_id in model.categories and \
+                    field_id != model.objective_id:
+                categories = model.categories[field_id]
+                codings = model.field_codings.get(field_id)
+                if codings is None or list(codings.keys())[0] == DUMMY:
+                    self._add_terms(field_id, categories, coefficients)
+                    self.missing_columns[field_id] = self._column(
+                        [coefficient[len(categories)] for coefficient in
+                         coefficients])
+                else:
+                    contributions = list(codings.values())[0]
+                    columns = self.term_columns.setdefault(field_id, {})
+                    for index, category in enumerate(categories):
+                        if category not in columns:
+                            columns[category] = self._column(
+                                *self._projected(coefficients,
+                                                 contributions, index))
+                    self.missing_columns[field_id] = self._column(
+                        *self._projected(coefficients, contributions, -1))
+            else:
+                self.value_columns[field_id] = self._column(
+                    [coefficient[0] for coefficient in coefficients])
+                if field_id in model.numeric_fields:
+                    self.missing_columns[field_id] = self._column(
+                        [coefficient[1] for coefficient in coefficients])
+        # the bias term is the last in the coefficients list
+        self.bias_column = self._column(
+            [model.coefficients[category][-1][0] for category in
+             self.classes])
+
+    @staticmethod
+    def _projected(coefficients, contributions, index):
+        """Coefficients of a category encoded using the `contributions` of
+           a field coding and the bounds of the terms added to compute them
+
+        """
+        projected, magnitudes = [], []
+        for coefficient in coefficients:
+            terms = [coefficient[coeff_index] * contribution[index]
+                     for coeff_index, contribution in
+                     enumerate(contributions)]
+            projected.append(sum(terms))
+            magnitudes.append(sum(abs(term) for term in terms))
+        return projected, magnitudes
+
+    def _add_terms(self, field_id, terms, coefficients):
+        """Adds the columns for the first occurrence of each term
+
+        """
+        columns = self.term_columns.setdefault(field_id, {})
+        for index, term in enumerate(terms):
+            if term not in columns:
+                columns[term] = self._column(
+                    [coefficient[index] for coefficient in coefficients])
+
+    def _term_entries(self, field_id, terms):
+        columns = self.term_columns.get(field_id)
+        if columns is None:
+            raise ValueError("Unexpected terms field")
+        return [(columns[term], occurrences) for term, occurrences in terms
+                if term in columns]
+
+    def _check(self, norm_input_data):
+        model = self.local_model
+        if not model.missing_numerics and model.default_numeric_value is None:
+            check_no_missing_numerics(norm_input_data, model.model_fields,
+                                      model.weight_field)
+        if model.balance_fields:
+            balance_input(norm_input_data, model.fields)
+
+    def _entries(self, norm_input_data, unique_terms):
+        model = self.local_model
+        entries = []
+        for field_id, value in norm_input_data.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError("Non numeric value")
+            entries.append((self.value_columns[field_id], value))
+        for field_id, (terms_entries, _) in unique_terms.items():
+            if field_id in model.input_fields:
+                entries.extend(terms_entries)
+        for field_id in model.input_fields:
+            if field_id in model.numeric_fields:
+                missing = field_id not in norm_input_data
+            elif field_id in model.tag_clouds or field_id in model.items:
+                missing = not unique_terms.get(field_id, (None, False))[1]
+            else:
+                missing = field_id in model.categories and \
+                    field_id != model.objective_id and \
+                    field_id not in unique_terms
+            if missing:
+                entries.append((self.missing_columns[field_id], 1))
+        entries.append((self.bias_column, 1))
+        return entries
+
+    def _outputs(self, design):
+        model = self.local_model
+        logits = design.dot(self.coefficients)
+        magnitudes = abs(design).dot(self.magnitudes)
+        if model.lr_normalize:
+            # the bias indicator is not part of the norm unless used
+            norm2 = np.asarray(design.multiply(design).sum(axis=1)).ravel() \
+                - 1 + (1 if model.bias else 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                norms = np.sqrt(norm2)[:, np.newaxis]
+                logits = logits / norms
+                magnitudes = magnitudes / norms
+        with np.errstate(over="ignore", invalid="ignore"):
+            probabilities = 1 / (1 + np.exp(-logits))
+        counts = np.diff(design.indptr)[:, np.newaxis]
+        risky = near_rounding_boundary(probabilities, magnitudes, counts,
+                                       5).any(axis=1)
+        return probabilities, risky
+
+    def _prediction(self, outputs):
+        """Prediction dictionary for the probabilities of a row, as the
+           local LogisticRegression `predict` builds it
+
+        """
+        # truncate probability to 5 digits, as in the backend
+        probabilities = [round(probability, 5) for probability in outputs]
+        total = 0
+        for probability in probabilities:
+            total += probability
+        probabilities = [round(probability / total, PRECISION)
+                         for probability in probabilities]
+        predictions = sorted(zip(self.classes, probabilities, self.orders),
+                             key=lambda x: (x[1], - x[2]), reverse=True)
+        return {"prediction": predictions[0][0],
+                "probability": predictions[0][1],
+                "distribution": [{"category": category,
+                                  "probability": probability}
+                                 for category, probability, _ in
+                                 predictions],
+                "confidence": predictions[0][1]}
+
+
+class BatchLinearRegression(BatchRegression):
+    """Local LinearRegression whose coefficients are stored in a vector of
+       the design matrix columns
+
+    """
+
+    def _compile(self):
+        model = self.local_model
+        flat_coefficients = flatten(model.coefficients)
+        offset = 0
+        for field_id in model.coeff_ids:
+            field = model.fields[field_id]
+            optype = field["optype"]
+            missing_slot = field["summary"]["missing_count"] > 0
+            if optype == NUMERIC:
+                self.value_columns[field_id] = self._column(
+                    flat_coefficients[offset])
+                offset += 1
+                if missing_slot:
+                    self.missing_columns[field_id] = self._column(
+                        flat_coefficients[offset])
+                    offset += 1
+                continue
+            terms = getattr(model, EXPANSION_ATTRIBUTES[optype])[field_id]
+            length = len(terms)
+            if optype == CATEGORICAL:
+                missing_slot = missing_slot or \
+                    model.field_codings[field_id].get(DUMMY) is None
+            if missing_slot:
+                length += 1
+            # the coefficients of the projected inputs are combined into
+            # one coefficient per category
+            projections = None
+            if optype == CATEGORICAL:
+                projections = model.field_codings[field_id].get(
+                    CONTRAST, model.field_codings[field_id].get(OTHER))
+            if projections is not None:
+                size = len(projections)
+                products = [[flat_coefficients[offset + index] *
+                             projection[raw] for index, projection in
+                             enumerate(projections)]
+                            for raw in range(length)]
+                coefficients = [sum(terms) for terms in products]
+                magnitudes = [sum(abs(term) for term in terms)
+                              for terms in products]
+            else:
+                size = length
+                coefficients = flat_coefficients[offset: offset + length]
+                magnitudes = coefficients
+            offset += size
+            columns = self.term_columns.setdefault(field_id, {})
+            for index, term in enumerate(terms):
+                if term not in columns:
+                    columns[term] = self._column(coefficients[index],
+                                                 magnitudes[index])
+            if missing_slot:
+                self.missing_columns[field_id] = self._column(
+                    coefficients[-1], magnitudes[-1])
+        self.bias_column = self._column(flat_coefficients[offset])
+
+    def _term_entries(self, field_id, terms):
+        columns = self.term_columns.get(field_id, {})
+        entries = []
+        # the local model stops at the first unknown term
+        for term, frequency in terms:
+            if term not in columns:
+                break
+            entries.append((columns[term], frequency))
+        return entries
+
+    def _check(self, norm_input_data):
+        model = self.local_model
+        check_no_training_missings(norm_input_data, model.model_fields,
+                                   model.weight_field,
+                                   model.objective_id)
+
+    def _entries(self, norm_input_data, unique_terms):
+        model = self.local_model
+        entries = []
+        for field_id in model.coeff_ids:
+            if field_id in self.value_columns:
+                value = norm_input_data.get(field_id)
+                if field_id not in norm_input_data:
+                    entries.append((self.missing_columns[field_id], 1))
+                elif isinstance(value, bool) or \
+                        not isinstance(value, (int, float)):
+                    raise ValueError("Non numeric value")
+                else:
+                    entries.append((self.value_columns[field_id], value))
+            elif field_id in unique_terms:
+                entries.extend(unique_terms[field_id][0])
+            elif field_id in self.missing_columns:
+                entries.append((self.missing_columns[field_id], 1))
+        entries.append((self.bias_column, 1))
+        return entries
+
+    def _outputs(self, design):
+        predictions = design.dot(self.coefficients)
+        magnitudes = abs(design).dot(self.magnitudes)
+        return predictions, near_rounding_boundary(
+            predictions, magnitudes, np.diff(design.indptr), DECIMALS)
+
+    def _prediction(self, outputs):
+        """Prediction dictionary for the output of a row
+
+        """
+        return {"prediction": round(outputs, DECIMALS)}
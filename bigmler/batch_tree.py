@@ -0,0 +1,409 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Batch evaluation of a decision tree
+
+   The tree of a local Model is flattened into arrays (split field,
+   operator, value and children of each node) and a chunk of rows is
+   traversed at once using NumPy masks. The final prediction only depends
+   on the node where the row stops, so it is computed by the local Model
+   for the first row that reaches each node and reused for the rest.
+
+"""
+
+
+from array import array
+
+import numpy as np
+
+from bigml.constants import LAST_PREDICTION, PROPORTIONAL
+from bigml.predict_utils.common import get_node, get_predicate
+from bigml.predicate_utils.utils import LT, LE, EQ, NE, GE, GT, IN
+from bigml.util import cast
+
+import bigml.predict_utils.classification as c
+import bigml.predict_utils.regression as r
+
+
+NUMERIC = "numeric"
+CATEGORICAL = "categorical"
+# code used for categories that appear in no split
+OTHER_CODE = 0
+# maximum number of cast values kept for each field
+MAX_CACHED_VALUES = 10000
+# comparison operators used for numeric and categorical splits
+COMPARISONS = {LT: np.less,
+               LE: np.less_equal,
+               EQ: np.equal,
+               NE: np.not_equal,
+               GE: np.greater_equal,
+               GT: np.greater}
+# typecodes of the buffers where the node tables are built
+NODE_TYPECODES = {"operators": "b",
+                  "fields": "i",
+                  "values": "d",
+                  "missings": "B",
+                  "none_values": "B",
+                  "first_children": "q",
+                  "children_numbers": "i"}
+NODE_DTYPES = {"operators": np.int8,
+               "fields": np.int32,
+               "values": np.float64,
+               "missings": np.uint8,
+               "none_values": np.uint8,
+               "first_children": np.int64,
+               "children_numbers": np.int32}
+
+
+def _children(node, offsets):
+    """Children of a node in the packed tree structure
+
+    """
+    return [] if node[offsets["children#"]] == 0 else \
+        node[offsets["children"]]
+
+
+def splits_predictable(local_model, offsets):
+    """Checks whether all the splits in the tree of the local Model can be
+       evaluated using the flattened arrays: every node splits by a single
+       numeric or categorical field.
+
+    """
+    nodes = [local_model.tree]
+    while nodes:
+        children = _children(get_node(nodes.pop()), offsets)
+        if len({get_predicate(child)[1] for child in children}) > 1:
+            return False
+        for child in children:
+            operator, field, value, term, _ = get_predicate(child)
+            if term is not None or local_model.fields[field]["optype"] \
+                    not in [NUMERIC, CATEGORICAL]:
+                return False
+            if value is None and operator not in [EQ, NE]:
+                return False
+            nodes.append(child)
+    return True
+
+
+def batch_predictable(local_model, operating_point=None):
+    """Checks whether the local Model can be evaluated using a BatchTree.
+       Boosted trees, operating points and text or items splits are left
+       to the local Model.
+
+    """
+    if local_model.boosting or operating_point or \
+            local_model.operation_settings:
+        return False
+    return splits_predictable(local_model, (
+        r.OFFSETS if local_model.regression else \
+        c.OFFSETS)[str(local_model.weighted)])
+
+
+class BatchTree():
+    """Flattened version of the tree in a local Model that predicts
+       lists of input data at once.
+
+    """
+
+    def __init__(self, local_model, missing_strategy=LAST_PREDICTION):
+        self.local_model = local_model
+        self.regression = local_model.regression
+        self.missing_strategy = missing_strategy
+        self.offsets = (r.OFFSETS if self.regression else \
+            c.OFFSETS)[str(local_model.weighted)]
+        self.field_ids = []
+        self.field_index = {}
+        self.categories = {}
+        self.node_predictions = {}
+        self.keys = {}
+        self.values_cache = {}
+        self._new_tables()
+        self._flatten(local_model.tree, self.offsets)
+        self._build_arrays()
+
+    def _field(self, field_id):
+        """Index of the field in the input matrix
+
+        """
+        if field_id not in self.field_index:
+            self.field_index[field_id] = len(self.field_ids)
+            self.field_ids.append(field_id)
+            if self.local_model.fields[field_id]["optype"] == CATEGORICAL:
+                self.categories[field_id] = {}
+        return self.field_index[field_id]
+
+    def _code(self, field_id, category):
+        """Code of a category used in the splits
+
+        """
+        codes = self.categories[field_id]
+        if category not in codes:
+            codes[category] = len(codes) + 1
+        return codes[category]
+
+    def _new_tables(self):
+        """Empty typed buffers where the nodes are stored while flattening
+
+        """
+        self.tables = {name: array(typecode) for name, typecode in
+                       NODE_TYPECODES.items()}
+        self.in_values_list = []
+
+    def _flatten(self, tree, offsets):
+        """Appends the nodes of a packed tree to the node tables. Nodes are
+           numbered breadth-first, so that the children of a node get
+           consecutive numbers and only the first one needs to be stored.
+           Returns the packed nodes in number order, root first.
+
+        """
+        tables = self.tables
+        # the root node has no predicate
+        packed_nodes = [tree]
+        root = len(tables["operators"])
+        self._append_node(-1, -1, np.nan, False, False)
+        # children are appended to the list of nodes while iterating it
+        for position, packed_node in enumerate(packed_nodes):
+            children = _children(get_node(packed_node), offsets)
+            tables["first_children"][root + position] = \
+                len(tables["operators"])
+            tables["children_numbers"][root + position] = len(children)
+            for child in children:
+                operator, field_id, value, _, missing = get_predicate(child)
+                field = self._field(field_id)
+                if operator == IN:
+                    node_value = len(self.in_values_list)
+                    self.in_values_list.append(
+                        [self._code(field_id, category) for category in
+                         value if category is not None])
+                elif value is None:
+                    node_value = np.nan
+                elif field_id in self.categories:
+                    node_value = self._code(field_id, value)
+                else:
+                    node_value = value
+                self._append_node(operator, field, node_value, missing,
+                                  value is None)
+                packed_nodes.append(child)
+        return packed_nodes
+
+    def _append_node(self, operator, field, value, missing, none_value):
+        """Appends a node with no children to the node tables
+
+        """
+        tables = self.tables
+        tables["operators"].append(operator)
+        tables["fields"].append(field)
+        tables["values"].append(value)
+        tables["missings"].append(missing)
+        tables["none_values"].append(none_value)
+        tables["first_children"].append(-1)
+        tables["children_numbers"].append(0)
+
+    def _build_arrays(self):
+        """Turns the node tables into the arrays used in the traversal,
+           indexed by the node number
+
+        """
+        for name, dtype in NODE_DTYPES.items():
+            setattr(self, name, np.frombuffer(self.tables[name],
+                                              dtype=dtype).copy())
+        self.missings = self.missings.astype(bool)
+        self.none_values = self.none_values.astype(bool)
+        del self.tables
+        self.max_children = max(int(self.children_numbers.max()), 1)
+        # split field of each node and whether missing values follow
+        # a unique branch
+        inner = self.children_numbers > 0
+        self.split_fields = np.full(len(self.operators), -1)
+        self.split_fields[inner] = self.fields[self.first_children[inner]]
+        branches = np.concatenate(
+            [[0], np.cumsum(self.missings | self.none_values)])
+        self.missing_branch = inner & (
+            branches[np.where(inner, self.first_children +
+                              self.children_numbers, 0)] >
+            branches[np.where(inner, self.first_children, 0)])
+        max_code = max([len(codes) for codes in self.categories.values()],
+                       default=0)
+        self.in_values = np.zeros((len(self.in_values_list), max_code + 1),
+                                  dtype=bool)
+        for index, codes in enumerate(self.in_values_list):
+            self.in_values[index, codes] = True
+        del self.in_values_list
+
+    def _key(self, key):
+        """Field ID for a key in the input data and whether the field is
+           used in the model
+
+        """
+        if key not in self.keys:
+            model = self.local_model
+            field_id = key if key in model.fields else \
+                model.inverted_fields.get(key, key)
+            self.keys[key] = (field_id, field_id in model.model_fields and \
+                (model.objective_id is None or field_id != model.objective_id))
+        return self.keys[key]
+
+    def _value(self, field_id, value):
+        """Value of a used field as stored in the input matrix. The values
+           are normalized and cast by the local Model only once.
+
+        """
+        cache = self.values_cache.setdefault(field_id, {})
+        if value not in cache:
+            if len(cache) >= MAX_CACHED_VALUES:
+                cache.clear()
+            norm_input_data = {field_id: value}
+            cast(norm_input_data, self.local_model.fields)
+            norm_value = norm_input_data[field_id]
+            if field_id in self.categories:
+                norm_value = self.categories[field_id].get(norm_value,
+                                                           OTHER_CODE)
+            cache[value] = norm_value
+        return cache[value]
+
+    def _matrix(self, input_data_list):
+        """Normalized input data as a matrix of values and a matrix of
+           missing flags. Categories are replaced by their codes.
+
+        """
+        model = self.local_model
+        values = np.zeros((len(input_data_list), len(self.field_ids)))
+        missing = np.ones(values.shape, dtype=bool)
+        unused_fields_list = []
+        for row, input_data in enumerate(input_data_list):
+            unused_fields = []
+            for key, value in input_data.items():
+                if model.normalize(value) is None:
+                    continue
+                field_id, used = self._key(key)
+                if not used:
+                    unused_fields.append(field_id)
+                    continue
+                value = self._value(field_id, value)
+                column = self.field_index.get(field_id)
+                if column is not None:
+                    values[row, column] = value
+                    missing[row, column] = False
+            unused_fields_list.append(unused_fields)
+        if getattr(model, "default_numeric_value", None) is not None:
+            for column, field_id in enumerate(self.field_ids):
+                if field_id not in self.categories:
+                    values[missing[:, column], column] = \
+                        model.fields[field_id]["summary"].get( \
+                            model.default_numeric_value, 0)
+                    missing[:, column] = False
+        return values, missing, unused_fields_list
+
+    def _apply(self, nodes, rows, values, missing):
+        """Evaluates the predicates of `nodes` for the corresponding
+           `rows` of the input matrix
+
+        """
+        fields = self.fields[nodes]
+        row_values = values[rows, fields]
+        row_missing = missing[rows, fields]
+        operators = self.operators[nodes]
+        result = np.zeros(len(nodes), dtype=bool)
+        for operator, comparison in COMPARISONS.items():
+            selected = operators == operator
+            if selected.any():
+                result[selected] = comparison(row_values[selected],
+                                              self.values[nodes[selected]])
+        selected = operators == IN
+        if selected.any():
+            result[selected] = self.in_values[
+                self.values[nodes[selected]].astype(int),
+                row_values[selected].astype(int)]
+        none_values = self.none_values[nodes]
+        result[~row_missing & none_values & (operators == NE)] = True
+        result[row_missing] = (self.missings[nodes] | \
+            (none_values & (operators == EQ)))[row_missing]
+        return result
+
+    def _traverse(self, values, missing, roots=None, rows=None):
+        """Node where each row stops. Rows that need the proportional
+           strategy to merge several branches are flagged to be
+           predicted by the local Model. By default, every row of the
+           input matrix starts at node 0, but traversals can start at any
+           `roots` for the corresponding `rows` of the input matrix.
+
+        """
+        if rows is None:
+            rows = np.arange(values.shape[0])
+        final_nodes = np.zeros(len(rows), dtype=np.int64) if roots is None \
+            else np.array(roots, dtype=np.int64)
+        fallback = np.zeros(len(rows), dtype=bool)
+        active = np.arange(len(rows))
+        proportional = self.missing_strategy == PROPORTIONAL
+        while active.size:
+            nodes = final_nodes[active]
+            if proportional:
+                split_fields = self.split_fields[nodes]
+                inner = split_fields >= 0
+                ambiguous = np.zeros(active.size, dtype=bool)
+                ambiguous[inner] = ~self.missing_branch[nodes[inner]] & \
+                    missing[rows[active[inner]], split_fields[inner]]
+                fallback[active[ambiguous]] = True
+                active, nodes = active[~ambiguous], nodes[~ambiguous]
+            children_numbers = self.children_numbers[nodes]
+            first_children = self.first_children[nodes]
+            next_nodes = np.full(active.size, -1)
+            for slot in range(self.max_children):
+                candidates = np.flatnonzero((next_nodes < 0) & \
+                    (children_numbers > slot))
+                if not candidates.size:
+                    break
+                children = first_children[candidates] + slot
+                matches = self._apply(children, rows[active[candidates]],
+                                      values, missing)
+                next_nodes[candidates[matches]] = children[matches]
+            moved = next_nodes >= 0
+            if proportional:
+                # the proportional strategy has no prediction for rows
+                # that stop in an inner node
+                stopped = ~moved & (children_numbers > 0)
+                fallback[active[stopped]] = True
+            final_nodes[active[moved]] = next_nodes[moved]
+            active = active[moved]
+        return final_nodes, fallback
+
+    def predict(self, input_data_list, full=True):
+        """Predictions for a list of input data dictionaries. They are
+           the same that the local Model would produce with the
+           `full` argument set to True.
+
+        """
+        values, missing, unused_fields_list = self._matrix(input_data_list)
+        final_nodes, fallback = self._traverse(values, missing)
+        predictions = []
+        for input_data, node, row_fallback, unused_fields in zip(
+                input_data_list, final_nodes, fallback, unused_fields_list):
+            if row_fallback:
+                predictions.append(self.local_model.predict(
+                    input_data, missing_strategy=self.missing_strategy,
+                    full=full))
+                continue
+            if node not in self.node_predictions:
+                prediction = self.local_model.predict(
+                    input_data, missing_strategy=self.missing_strategy,
+                    full=True)
+                prediction.pop("unused_fields", None)
+                self.node_predictions[node] = prediction
+            prediction = dict(self.node_predictions[node])
+            if unused_fields:
+                prediction["unused_fields"] = unused_fields
+            predictions.append(prediction if full else \
+                prediction["prediction"])
+        return predictions
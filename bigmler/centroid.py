@@ -24,12 +24,16 @@ import sys
 import bigml.api
 
 from bigml.cluster import Cluster
-from bigml.io import UnicodeWriter
 
 import bigmler.utils as u
 import bigmler.checkpoint as c
 
 from bigmler.tst_reader import TstReader as TestReader
+from bigmler.output_writer import output_writer, project_row
+from bigmler.local_cache import local_predictor
+from bigmler.memoize import build_memo, memoized_map, memoized_pairs
+from bigmler.parallel import chunks
+from bigmler.batch_cluster import BatchCluster, batch_clusterable
 from bigmler.resourcesapi.common import NORMAL_FORMAT, FULL_FORMAT
 from bigmler.resourcesapi.batch_centroids import create_batch_centroid
 
@@ -97,10 +101,7 @@ def write_centroid(centroid_resource, output=sys.stdout,
     if prediction_info != NORMAL_FORMAT:
         if input_data is None:
             input_data = []
-        row = input_data
-        if exclude:
-            for index in exclude:
-                del row[index]
+        row = project_row(input_data, exclude)
     row.append(centroid_resource)
     try:
         output.writerow(row)
@@ -119,21 +120,41 @@ def centroid_to_row(centroid_resource):
 
 
 def local_centroid(clusters, test_reader, output, args,
-                   exclude=None):
+                   exclude=None, session_file=None):
     """Get local cluster and issue centroid prediction
 
     """
     # Only one cluster at present
-    local_cluster = Cluster(clusters[0], api=args.retrieve_api_)
-    for input_data in test_reader:
-        input_data_dict = test_reader.dict(input_data, filtering=False)
-        try:
-            centroid_info = local_cluster.centroid(
-                input_data_dict)
-        except Exception:
-            centroid_info = {'centroid_name': NO_CENTROID}
-        write_centroid(centroid_info['centroid_name'], output,
+    local_cluster = local_predictor(Cluster, clusters[0], args)
+    memo = build_memo(args)
+    if batch_clusterable(local_cluster):
+        # the distances to the centroids are computed for chunks of rows
+        batch_cluster = BatchCluster(
+            local_cluster, index_size=getattr(args, "centroid_index", 0))
+
+        def centroids_pairs(rows):
+            for chunk in chunks(rows, args.chunk_size):
+                infos = batch_cluster.centroids(
+                    [test_reader.dict(input_data, filtering=False)
+                     for input_data in chunk])
+                yield from zip(chunk, infos)
+
+        infos = memoized_pairs(centroids_pairs, test_reader, memo)
+    else:
+        def centroid_info(input_data):
+            input_data_dict = test_reader.dict(input_data, filtering=False)
+            try:
+                return local_cluster.centroid(input_data_dict)
+            except Exception:
+                return None
+
+        infos = memoized_map(centroid_info, test_reader, memo)
+    for input_data, info in infos:
+        write_centroid(NO_CENTROID if info is None else
+                       info['centroid_name'], output,
                        args.prediction_info, input_data, exclude)
+    if memo is not None:
+        memo.log(session_file=session_file, console=args.verbosity)
 
 
 def centroid(clusters, fields, args, session_file=None):
@@ -146,7 +167,7 @@ def centroid(clusters, fields, args, session_file=None):
     test_reader = TestReader(test_set, test_set_header, fields,
                              None,
                              test_separator=args.test_separator)
-    with UnicodeWriter(output, lineterminator="\n") as output:
+    with output_writer(output, args, lineterminator="\n") as output:
         # columns to exclude if input_data is added to the prediction field
         exclude = use_prediction_headers(
             args.prediction_header, output, test_reader, fields, args)
@@ -155,7 +176,8 @@ def centroid(clusters, fields, args, session_file=None):
         # centroids distances
         message = u.dated("Creating local centroids.\n")
         u.log_message(message, log_file=session_file, console=args.verbosity)
-        local_centroid(clusters, test_reader, output, args, exclude=exclude)
+        local_centroid(clusters, test_reader, output, args, exclude=exclude,
+                       session_file=session_file)
     test_reader.close()
 
 def remote_centroid(cluster, test_dataset, batch_centroid_args, args,
@@ -20,6 +20,7 @@
 
 
 import os
+import json
 
 import bigml.api
 
@@ -104,13 +105,66 @@ def are_models_created(path, number_of_models):
         return False, model_ids
 
 
-def are_predictions_created(predictions_file, number_of_tests):
+JOURNAL_EXTENSION = ".journal"
+
+
+def journal_file_name(file_name):
+    """Name of the journal that stores the rows committed to a file
+
+    """
+    return "%s%s" % (file_name, JOURNAL_EXTENSION)
+
+
+def read_journal(file_name):
+    """Returns the number of lines and the byte offset committed to the file
+       according to its journal. Files with no journal or whose size is
+       smaller than the committed offset return (0, 0).
+
+    """
+    try:
+        with open(journal_file_name(file_name)) as journal_file:
+            journal = json.load(journal_file)
+        lines, offset = journal["lines"], journal["offset"]
+        if os.path.getsize(file_name) >= offset:
+            return lines, offset
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        pass
+    return 0, 0
+
+
+def write_journal(file_name, lines, offset):
+    """Stores the number of lines and the byte offset committed to the file
+
+    """
+    journal = journal_file_name(file_name)
+    tmp_journal = "%s.tmp" % journal
+    with open(tmp_journal, "w") as journal_file:
+        json.dump({"lines": lines, "offset": offset}, journal_file)
+    os.replace(tmp_journal, journal)
+
+
+def remove_journal(file_name):
+    """Removes the journal of the file, if any
+
+    """
+    try:
+        os.remove(journal_file_name(file_name))
+    except OSError:
+        pass
+
+
+def are_predictions_created(predictions_file, number_of_tests,
+                            resumable=False):
     """Checks existence and reads the predictions from the predictions file in
-       the path directory
+       the path directory. Incomplete files are removed unless they are
+       `resumable` and a journal records the rows already committed.
 
     """
     predictions = file_number_of_lines(predictions_file)
     if predictions != number_of_tests:
+        committed_lines, _ = read_journal(predictions_file)
+        if resumable and committed_lines > 0:
+            return False, committed_lines
         os.remove(predictions_file)
         return False, None
     return True, None
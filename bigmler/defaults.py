@@ -109,6 +109,7 @@ FLAGS = {
         {'flag': 'test_source', 'type': 'string'},
         {'flag': 'test_dataset', 'type': 'string'},
         {'flag': 'no_batch', 'type': 'boolean'},
+        {'flag': 'max_parallel_predictions', 'type': 'int'},
         {'flag': 'dataset_attributes', 'type': 'string'},
         {'flag': 'output', 'type': 'string'},
         {'flag': 'new_fields', 'type': 'string'},
@@ -145,6 +146,9 @@ FLAGS = {
         {'flag': 'anomaly_score_tag', 'type': 'string'},
         {'flag': 'project_tag', 'type': 'string'},
         {'flag': 'fast', 'type': 'boolean'},
+        {'flag': 'streaming', 'type': 'boolean'},
+        {'flag': 'memmap_votes', 'type': 'boolean'},
+        {'flag': 'early_exit', 'type': 'boolean'},
         {'flag': 'project', 'type': 'string'},
         {'flag': 'project_id', 'type': 'string'},
         {'flag': 'no_csv', 'type': 'boolean'},
@@ -167,7 +171,15 @@ FLAGS = {
         {'flag': 'step_out_of_bag', 'type': 'boolean'},
         {'flag': 'org_project', 'type': 'string'},
         {'flag': 'split_field', 'type': 'string'},
-        {'flag': 'float_field', 'type': 'string'}],
+        {'flag': 'float_field', 'type': 'string'},
+        {'flag': 'jobs', 'type': 'int'},
+        {'flag': 'chunk_size', 'type': 'int'},
+        {'flag': 'local_cache', 'type': 'string'},
+        {'flag': 'local_cache_size', 'type': 'int'},
+        {'flag': 'memoize', 'type': 'boolean'},
+        {'flag': 'memoize_size', 'type': 'int'},
+        {'flag': 'output_batch_size', 'type': 'int'},
+        {'flag': 'background_output', 'type': 'boolean'}],
     'BigMLer analyze': [
         {'flag': 'k-fold', 'type': 'int'},
         {'flag': 'cv', 'type': 'boolean'},
@@ -191,6 +203,7 @@ FLAGS = {
         {'flag': 'no_cluster', 'type': 'boolean'},
         {'flag': 'cluster_attributes', 'type': 'string'},
         {'flag': 'centroid_attributes', 'type': 'string'},
+        {'flag': 'centroid_index', 'type': 'int'},
         {'flag': 'batch_centroid_attributes', 'type': 'string'},
         {'flag': 'cluster_datasets', 'type': 'string'},
         {'flag': 'cluster_models', 'type': 'string'},
@@ -207,6 +220,7 @@ FLAGS = {
         {'flag': 'score', 'type': 'boolean'},
         {'flag': 'anomalies-dataset', 'type': 'string'},
         {'flag': 'top_n', 'type': 'int'},
+        {'flag': 'top_scores', 'type': 'int'},
         {'flag': 'id_fields', 'type': 'string'},
         {'flag': 'forest_size', 'type': 'int'}],
     'BigMLer sample': [
@@ -244,6 +258,8 @@ FLAGS = {
         {'flag': 'association_file', 'type': 'string'},
         {'flag': 'associations', 'type': 'string'},
         {'flag': 'association_k', 'type': 'int'},
+        {'flag': 'association_set_k', 'type': 'int'},
+        {'flag': 'score_by', 'type': 'string'},
         {'flag': 'no_association', 'type': 'boolean'},
         {'flag': 'association_attributes', 'type': 'string'}],
     'BigMLer logistic regression': [
@@ -332,6 +348,7 @@ FLAGS = {
         {'flag': 'image_augmentations', 'type': 'string'},
         {'flag': 'include_extracted_features', 'type': 'string'},
         {'flag': 'no_balance_fields', 'type': 'boolean'},
+        {'flag': 'deepnet_float32', 'type': 'boolean'},
         {'flag': 'deepnet_attributes', 'type': 'string'}],
     'BigMLer execute': [
         {'flag': 'script', 'type': 'string'},
@@ -363,6 +380,7 @@ FLAGS = {
         {'flag': 'no_pca', 'type': 'boolean'},
         {'flag': 'max_components', 'type': 'int'},
         {'flag': 'variance_threshold', 'type': 'float'},
+        {'flag': 'projections_format', 'type': 'string'},
         {'flag': 'pca_attributes', 'type': 'string'}],
     'BigMLer Fusion': [
         {'flag': 'fusion_models', 'type': 'string'},
@@ -24,12 +24,17 @@ import sys
 import bigml.api
 
 from bigml.deepnet import Deepnet
-from bigml.io import UnicodeWriter
 
 import bigmler.utils as u
 import bigmler.checkpoint as c
 
 from bigmler.tst_reader import TstReader as TestReader
+from bigmler.output_writer import output_writer
+from bigmler.local_cache import local_predictor
+from bigmler.parallel import chunks, thread_map
+from bigmler.batch_deepnet import BatchDeepnet, batch_deepnet_predictable
+from bigmler.batch_image import BatchImageDeepnet, batch_image_predictable, \
+    IMAGE_BATCH_SIZE
 from bigmler.resourcesapi.batch_predictions import create_batch_prediction
 from bigmler.prediction import use_prediction_headers
 from bigmler.lrprediction import write_prediction
@@ -44,12 +49,52 @@ def local_prediction(deepnets, test_reader, output, args,
     if args.operating_point_:
         kwargs.update({"operating_point": args.operating_point_})
     # Only one deepnet at present
-    local_deepnet = Deepnet(deepnets[0],
-                            api=args.retrieve_api_)
-    for input_data in test_reader:
-        input_data_dict = test_reader.dict(input_data, filtering=False)
-        prediction_info = local_deepnet.predict(
-            input_data_dict, **kwargs)
+    local_deepnet = local_predictor(Deepnet, deepnets[0], args)
+    if batch_deepnet_predictable(local_deepnet,
+                                 operating_point=args.operating_point_):
+        # the layers are computed for chunks of rows at once
+        batch_deepnet = BatchDeepnet(
+            local_deepnet, float32=getattr(args, "deepnet_float32", False))
+
+        def predictions_pairs(rows):
+            for chunk in chunks(rows, args.chunk_size):
+                yield from zip(chunk, batch_deepnet.predict(
+                    [test_reader.dict(input_data, filtering=False)
+                     for input_data in chunk]))
+    elif batch_image_predictable(local_deepnet,
+                                 operating_point=args.operating_point_):
+        # the images are decoded by a pool of --jobs threads ahead of the
+        # network, that evaluates them in batches
+        batch_deepnet = BatchImageDeepnet(local_deepnet)
+        batch_size = min(args.chunk_size, IMAGE_BATCH_SIZE)
+
+        def prepare(input_data):
+            return batch_deepnet.prepare(
+                test_reader.dict(input_data, filtering=False))
+
+        def predictions_pairs(rows):
+            if args.jobs > 1:
+                # the next batch is decoded while the current one is
+                # evaluated
+                prepared = thread_map(prepare, rows, args.jobs,
+                                      max_pending=max(2 * batch_size,
+                                                      args.jobs))
+            else:
+                prepared = ((input_data, prepare(input_data))
+                            for input_data in rows)
+            for chunk in chunks(prepared, batch_size):
+                chunk_rows, prepared_rows = zip(*chunk)
+                yield from zip(chunk_rows,
+                               batch_deepnet.predict(prepared_rows))
+    else:
+        def predictions_pairs(rows):
+            for input_data in rows:
+                input_data_dict = test_reader.dict(input_data,
+                                                   filtering=False)
+                yield input_data, local_deepnet.predict(input_data_dict,
+                                                        **kwargs)
+
+    for input_data, prediction_info in predictions_pairs(test_reader):
         write_prediction(prediction_info, output,
                          args.prediction_info, input_data, exclude,
                          quality=quality)
@@ -71,7 +116,7 @@ def dn_prediction(deepnets, fields, args, session_file=None):
         else None
     objective_field = fields.objective_field if fields.objective_field is not \
         None else args.objective_field
-    with UnicodeWriter(output, lineterminator="\n") as output:
+    with output_writer(output, args, lineterminator="\n") as output:
         # columns to exclude if input_data is added to the prediction field
         exclude = use_prediction_headers(
             args.prediction_header, output, test_reader, fields, args,
@@ -21,7 +21,8 @@ import os
 
 
 class FolderReader():
-    """Adapter to read files in a folder
+    """Adapter to read files in a folder. The folder entries are streamed,
+       so that the first files can be used before the folder is read.
 
     """
     def __init__(self, folder, filter_fn=None, header=None):
@@ -29,14 +30,16 @@ class FolderReader():
 
         """
         self.folder = folder
-        self.filter_fn = lambda x: True if filter_fn is None else filter_fn
+        self.filter_fn = (lambda x: True) if filter_fn is None else filter_fn
         self.header = header
-        self.reader = [] if header is None else [[header]]
 
     def open_reader(self):
         """exploring the folder
 
         """
-        self.reader.extend([[filename] for filename in
-            os.listdir(self.folder) if self.filter_fn(filename)])
-        yield from self.reader
+        if self.header is not None:
+            yield [self.header]
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.is_file() and self.filter_fn(entry.name):
+                    yield [entry.name]
@@ -19,8 +19,11 @@
 
 
 
+import re
 import sys
 
+from functools import partial
+
 import bigml.api
 
 from bigml.timeseries import TimeSeries
@@ -29,8 +32,17 @@ from bigml.io import UnicodeWriter
 import bigmler.utils as u
 import bigmler.checkpoint as c
 
+from bigmler.local_cache import local_predictor, cached_local, \
+    DEFAULT_CACHE_SIZE
+from bigmler.parallel import pool_predict
+from bigmler.batch_forecast import forecast as batch_forecast
 from bigmler.resourcesapi.forecasts import create_forecast
 
+# number of time series loaded and forecast as a unit by each process
+TIME_SERIES_CHUNK_SIZE = 10
+# keys of the forecast input data that are field IDs
+FIELD_ID_RE = re.compile(r"^[0-9a-f]{6}(-\d+)?$")
+
 
 def write_forecasts(forecast_dict, output):
     """Writes the final forecast to the required output
@@ -42,16 +54,14 @@ def write_forecasts(forecast_dict, output):
 
     for objective_id, forecast_value in list(forecast_dict.items()):
         headers = [f["model"] for f in forecast_value]
-        points = []
         if not forecast_value:
             sys.exit("No forecasts available")
-        for index in range(len(forecast_value[0]["point_forecast"])):
-            points.append([f["point_forecast"][index] for f in forecast_value])
+        # one column per submodel and one row per step in the horizon
+        points = zip(*[f["point_forecast"] for f in forecast_value])
         output_file = "%s_%s.csv" % (output, objective_id)
         with UnicodeWriter(output_file, lineterminator="\n") as out_handler:
             out_handler.writerow(headers)
-            for row in points:
-                out_handler.writerow(row)
+            out_handler.writerows(points)
 
 
 def forecast(time_series, args, session_file=None):
@@ -59,23 +69,114 @@ def forecast(time_series, args, session_file=None):
 
     """
 
-    local_time_series = TimeSeries(time_series,
-                                   api=args.retrieve_api_)
+    local_time_series = local_predictor(TimeSeries, time_series, args)
 
     output = args.predictions
     # Local forecasts: Forecasts are computed locally
     message = u.dated("Creating local forecasts.\n")
     u.log_message(message, log_file=session_file, console=args.verbosity)
-    input_data = []
-    if args.test_set is not None:
-        input_data = [u.read_json(args.test_set)]
-    elif args.horizon is not None:
-        input_data = [{local_time_series.objective_id: { \
-            "horizon": args.horizon}}]
-    write_forecasts(local_time_series.forecast(*input_data),
+    test_input = None if args.test_set is None else \
+        u.read_json(args.test_set)
+    input_data = forecast_input(local_time_series, test_input, args.horizon)
+    write_forecasts(batch_forecast(local_time_series, input_data),
                     output)
 
 
+def forecast_input(local_time_series, test_input=None, horizon=None):
+    """Input data for the forecast, read from the test file or built
+       using the horizon for the objective field of the time series
+
+    """
+    if test_input is not None:
+        return test_input
+    if horizon is not None:
+        return {local_time_series.objective_id: {"horizon": horizon}}
+    return None
+
+
+def build_time_series_loader(api=None, cache_dir=None,
+                             max_size=DEFAULT_CACHE_SIZE):
+    """Function that builds the local TimeSeries for an ID, loading it
+       from the local cache if available
+
+    """
+    return partial(cached_local, TimeSeries, api=api, cache_dir=cache_dir,
+                   max_size=max_size)
+
+
+def local_forecasts(time_series_loader, time_series_ids, test_input=None,
+                    horizon=None):
+    """Forecasts for each of the time series. The time series that fail
+       get the message of the error instead.
+
+    """
+    forecasts = []
+    for time_series_id in time_series_ids:
+        #pylint: disable=locally-disabled,broad-except
+        try:
+            local_time_series = time_series_loader(time_series_id)
+            forecasts.append(batch_forecast(
+                local_time_series, forecast_input(local_time_series,
+                                                  test_input, horizon)))
+        except Exception as exc:
+            forecasts.append(str(exc) or exc.__class__.__name__)
+    return forecasts
+
+
+def bulk_forecast(time_series_set, args, session_file=None):
+    """Computes the forecasts of a list of time series. The time series
+       are loaded and forecast by a pool of --jobs processes and the
+       forecasts of each one are stored in their own files as they are
+       available.
+
+    """
+    time_series_ids = [bigml.api.get_time_series_id(time_series) for
+                       time_series in time_series_set]
+    message = u.dated("Creating local forecasts for %s time series.\n" %
+                      len(time_series_ids))
+    u.log_message(message, log_file=session_file, console=args.verbosity)
+    test_input = None if args.test_set is None else \
+        u.read_json(args.test_set)
+    if test_input and len(time_series_ids) > 1:
+        field_ids = [key for key in test_input if FIELD_ID_RE.match(key)]
+        if field_ids:
+            sys.exit("The field IDs can differ from one time series to"
+                     " another. Please, use field names in the --test-set"
+                     " input to forecast several time series. Found: %s" %
+                     ", ".join(field_ids))
+    loader_builder = partial(build_time_series_loader,
+                             api=args.retrieve_api_,
+                             cache_dir=getattr(args, "local_cache", None),
+                             max_size=getattr(args, "local_cache_size",
+                                              DEFAULT_CACHE_SIZE))
+    predict_fn = partial(local_forecasts, test_input=test_input,
+                         horizon=args.horizon)
+    if args.jobs > 1:
+        forecasts = pool_predict(loader_builder, predict_fn, time_series_ids,
+                                 jobs=args.jobs,
+                                 chunk_size=TIME_SERIES_CHUNK_SIZE)
+    else:
+        time_series_loader = loader_builder()
+        forecasts = ((time_series_id, predict_fn(time_series_loader,
+                                                 [time_series_id])[0])
+                     for time_series_id in time_series_ids)
+    for time_series_id, forecast_dict in forecasts:
+        if isinstance(forecast_dict, str):
+            message = u.dated("Failed to forecast %s: %s\n" %
+                              (time_series_id, forecast_dict))
+            u.log_message(message, log_file=session_file,
+                          console=args.verbosity)
+            continue
+        if not forecast_dict or not all(forecast_dict.values()):
+            message = u.dated("No forecasts available for %s.\n" %
+                              time_series_id)
+            u.log_message(message, log_file=session_file,
+                          console=args.verbosity)
+            continue
+        write_forecasts(forecast_dict, "%s_%s" % (
+            args.predictions, time_series_id.replace("/", "_")))
+
+
 def remote_forecast(time_series,
                     forecast_args, args,
                     api, resume, session_file=None,
@@ -93,8 +194,7 @@ def remote_forecast(time_series,
             c.is_forecast_created, path, debug=args.debug,
             message=message, log_file=session_file, console=args.verbosity)
     if not resume:
-        local_time_series = TimeSeries(time_series,
-                                       api=args.retrieve_api_)
+        local_time_series = local_predictor(TimeSeries, time_series, args)
         output = args.predictions
         input_data = {}
         if args.test_set is not None:
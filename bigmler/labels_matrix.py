@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Columnar storage of the votes of the models of a multi-label field
+
+   Each label of a multi-labeled objective field is predicted by one or
+   several models. Their votes are stored in arrays with one row per input
+   data and one column per model, and the models of each label are combined
+   for all the rows and labels at once, following the same rules as the
+   plurality combination in `MultiVote.combine`. The result is a matrix of
+   rows x labels that tells whether each label is predicted and its
+   confidence. The labels of a row are only joined when it is written.
+
+"""
+
+
+import ast
+
+import numpy as np
+
+from bigml.util import PRECISION
+
+
+class LabelsMatrix():
+    """Votes of the models of a multi-labeled field for a list of input data
+
+    """
+
+    def __init__(self, rows, models):
+        """`rows`: number of input data rows
+           `models`: number of models voting
+
+        """
+        self.rows = rows
+        self.models = models
+        self.categories = []
+        self.category_codes = {}
+        self.columns = 0
+        self.classes = np.full((rows, models), -1, dtype=np.int32)
+        self.confidences = np.full((rows, models), np.nan, dtype=np.float64)
+        # order of each model in its slot, used to break ties
+        self.orders = np.zeros(models, dtype=np.int64)
+
+    def _code(self, category):
+        """Code of the category. New categories are added when found.
+
+        """
+        if category not in self.category_codes:
+            self.category_codes[category] = len(self.categories)
+            self.categories.append(category)
+        return self.category_codes[category]
+
+    def add_votes(self, votes):
+        """Adds the predictions in a list of MultiVote objects, one per row,
+           as new model columns.
+
+        """
+        first_column = self.columns
+        for row, multivote in enumerate(votes):
+            for index, prediction in enumerate(multivote.predictions):
+                column = first_column + index
+                self.classes[row, column] = self._code(
+                    prediction["prediction"])
+                confidence = prediction.get("confidence")
+                self.confidences[row, column] = np.nan if confidence is \
+                    None else confidence
+                self.orders[column] = prediction.get("order", index)
+                self.columns = max(self.columns, column + 1)
+
+    def _winners(self, classes, orders):
+        """Class voted by most models for each row and label. Ties are broken
+           by the order of the first vote for the class and then by the
+           class name.
+
+        """
+        categories = len(self.categories)
+        labels = np.arange(classes.shape[1])
+        counts = np.zeros(classes.shape[:2] + (categories,), dtype=np.int64)
+        first_orders = np.zeros(counts.shape, dtype=np.int64)
+        for code in range(categories):
+            category_votes = classes == code
+            counts[:, :, code] = category_votes.sum(axis=2)
+            first_orders[:, :, code] = orders[labels,
+                                              category_votes.argmax(axis=2)]
+        categories_rank = np.argsort(np.argsort(
+            np.array(self.categories, dtype=object)))
+        seen = counts > 0
+        candidates = seen & (counts == counts.max(axis=2)[:, :, np.newaxis])
+        first_orders = np.where(candidates, first_orders,
+                                np.iinfo(np.int64).max)
+        candidates &= first_orders == first_orders.min(
+            axis=2)[:, :, np.newaxis]
+        return np.where(candidates, categories_rank, -1).argmax(axis=2)
+
+    def combine(self, labels_columns, models_per_label=1):
+        """Returns two (rows x labels) arrays: whether each label is
+           predicted and the confidence of the prediction. `labels_columns`
+           is the list of columns of the models of each label, one label
+           after the other.
+
+        """
+        labels_columns = np.asarray(labels_columns)
+        shape = (self.rows, len(labels_columns) // models_per_label,
+                 models_per_label)
+        classes = self.classes[:, labels_columns].reshape(shape)
+        confidences = self.confidences[:, labels_columns].reshape(shape)
+        if models_per_label == 1:
+            winners = classes[:, :, 0]
+            confidence = confidences[:, :, 0]
+        else:
+            winners = self._winners(
+                classes, self.orders[labels_columns].reshape(shape[1:]))
+            matches = classes == winners[:, :, np.newaxis]
+            confidence = np.zeros(shape[:2])
+            # added in the order of the votes, as MultiVote does
+            for position in range(models_per_label):
+                confidence += np.where(matches[:, :, position],
+                                       confidences[:, :, position], 0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                confidence /= matches.sum(axis=2)
+        # the predicted classes are evaluated only once per category
+        truth = np.array([bool(ast.literal_eval(category))
+                          for category in self.categories], dtype=bool)
+        return truth[winners], confidence
+
+    def predictions(self, labels, labels_columns, models_per_label=1,
+                    label_separator=None):
+        """Yields the [labels, confidences] prediction of each row, as
+           joined strings of the predicted labels and their confidences
+
+        """
+        if label_separator is None:
+            label_separator = ","
+        predicted, confidence = self.combine(
+            labels_columns, models_per_label=models_per_label)
+        for row in range(self.rows):
+            indices = np.flatnonzero(predicted[row]).tolist()
+            confidences = confidence[row, indices].tolist()
+            if models_per_label > 1:
+                confidences = [round(row_confidence, PRECISION) for
+                               row_confidence in confidences]
+            yield [label_separator.join([labels[index] for index in indices]),
+                   label_separator.join([str(row_confidence) for
+                                         row_confidence in confidences])]
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Persistent cache of local predictors
+
+   The local predictors (Model, Ensemble, Cluster, Anomaly, etc.) built
+   from the resources' JSON are pickled in a cache directory, so that
+   later bigmler runs can load them instead of building them again.
+   The cache key contains the ID of the resources, their `updated`
+   timestamp, the URL of the API connection and the versions of the bigml
+   bindings and BigMLer. The API connections in the predictors, that store
+   the user's credentials, are never pickled: the connection used in the
+   run is attached to the predictor when it is loaded. When the size of
+   the cache exceeds the limit, the least recently used files are
+   removed.
+
+"""
+
+
+import os
+import json
+import pickle
+import hashlib
+
+from bigml.basemodel import retrieve_resource
+from bigml.bigmlconnection import BigMLConnection
+from bigml.version import __version__ as BIGML_VERSION
+
+from bigmler import __version__ as BIGMLER_VERSION
+
+
+CACHE_EXTENSION = ".pkl"
+# default maximum size of the cache in MB
+DEFAULT_CACHE_SIZE = 1024
+MB = 1024 * 1024
+# persistent ID that replaces the API connections in the pickled predictors
+API_ID = "api"
+
+
+def resource_stamp(resource, api=None):
+    """Pair of values that identify the version of the resource used to
+       build a local predictor. `resource` can be the resource dict, its ID
+       or the path to a file that contains its JSON.
+
+    """
+    if isinstance(resource, dict):
+        resource_id = resource.get("resource")
+        updated = resource.get("object", resource).get("updated")
+        if resource_id is None or updated is None:
+            # no way to know whether the contents will change
+            return None
+        return [resource_id, updated]
+    if not isinstance(resource, str):
+        return None
+    path = resource
+    if not os.path.isfile(path):
+        if api is None or api.storage is None:
+            return None
+        path = os.path.join(api.storage, resource.replace("/", "_"))
+        if not os.path.isfile(path):
+            # downloading the resource stores it for the predictor to use
+            #pylint: disable=locally-disabled,broad-except
+            try:
+                return resource_stamp(retrieve_resource(api, resource), api)
+            except Exception:
+                return None
+    # stored files are written anew whenever the resource is downloaded,
+    # so their modification time changes when the resource is updated
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_mtime_ns, stat.st_size]
+
+
+def cache_key(builder, resources, api=None, **kwargs):
+    """Name of the cache file for the local predictor built by `builder`
+       from `resources`. Returns None if the resources cannot be identified.
+
+    """
+    if not isinstance(resources, list):
+        resources = [resources]
+    stamps = [resource_stamp(resource, api=api) for resource in resources]
+    if not stamps or None in stamps:
+        return None
+    # only the URL of the connection is used, never its credentials
+    key = json.dumps([BIGML_VERSION, BIGMLER_VERSION,
+                      "%s.%s" % (builder.__module__, builder.__qualname__),
+                      getattr(api, "url", None), stamps,
+                      sorted((name, repr(value)) for name, value
+                             in kwargs.items())])
+    return "%s_%s%s" % (builder.__name__.lower(),
+                        hashlib.sha256(key.encode("utf-8")).hexdigest(),
+                        CACHE_EXTENSION)
+
+
+class PredictorPickler(pickle.Pickler):
+    """Pickler that leaves out the API connections found in the local
+       predictor and any of its components
+
+    """
+
+    def persistent_id(self, obj):
+        """API connections are replaced by a persistent ID
+
+        """
+        if isinstance(obj, BigMLConnection):
+            return API_ID
+        return None
+
+
+class PredictorUnpickler(pickle.Unpickler):
+    """Unpickler that attaches the API connection of the current run to
+       the local predictor and its components
+
+    """
+
+    def __init__(self, file, api=None):
+        super().__init__(file)
+        self.api = api
+
+    def persistent_load(self, pid):
+        """The persistent ID of API connections is replaced by `api`
+
+        """
+        if pid == API_ID:
+            return self.api
+        raise pickle.UnpicklingError("Unknown persistent ID: %s" % pid)
+
+
+def evict(cache_dir, max_size=DEFAULT_CACHE_SIZE):
+    """Removes the least recently used files in the cache until its size
+       is under `max_size` MB
+
+    """
+    cached_files = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(CACHE_EXTENSION) and entry.is_file():
+            stat = entry.stat()
+            cached_files.append((stat.st_mtime, stat.st_size, entry.path))
+    total_size = sum(size for _, size, _ in cached_files)
+    for _, size, path in sorted(cached_files):
+        if total_size <= max_size * MB:
+            break
+        try:
+            os.remove(path)
+            total_size -= size
+        except OSError:
+            pass
+
+
+def cached_local(builder, resources, api=None, cache_dir=None,
+                 max_size=DEFAULT_CACHE_SIZE, **kwargs):
+    """Returns the local predictor built by `builder(resources, api=api,
+       **kwargs)`, loading it from the cache in `cache_dir` when available.
+       No cache is used if `cache_dir` is not set.
+
+    """
+    if cache_dir is None:
+        return builder(resources, api=api, **kwargs)
+    key = cache_key(builder, resources, api=api, **kwargs)
+    if key is None:
+        return builder(resources, api=api, **kwargs)
+    cache_file = os.path.join(cache_dir, key)
+    try:
+        with open(cache_file, "rb") as cache_handler:
+            predictor = PredictorUnpickler(cache_handler, api=api).load()
+        # the modification time is used as last access time for eviction
+        os.utime(cache_file)
+        return predictor
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError,
+            ImportError):
+        pass
+    predictor = builder(resources, api=api, **kwargs)
+    # writing to a temporary file so that concurrent runs never read
+    # a partial file
+    tmp_file = "%s.%s.tmp" % (cache_file, os.getpid())
+    #pylint: disable=locally-disabled,broad-except
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_file, "wb") as cache_handler:
+            PredictorPickler(cache_handler,
+                             protocol=pickle.HIGHEST_PROTOCOL).dump(
+                                 predictor)
+        os.replace(tmp_file, cache_file)
+        evict(cache_dir, max_size=max_size)
+    except Exception:
+        # predictors that cannot be pickled are just not cached
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    return predictor
+
+
+def local_predictor(builder, resources, args, **kwargs):
+    """Local predictor built by `builder` using the retrieve API connection
+       and the cache settings in the command arguments
+
+    """
+    return cached_local(builder, resources, api=args.retrieve_api_,
+                        cache_dir=getattr(args, "local_cache", None),
+                        max_size=getattr(args, "local_cache_size",
+                                         DEFAULT_CACHE_SIZE),
+                        **kwargs)
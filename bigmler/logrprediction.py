@@ -24,13 +24,17 @@ import sys
 import bigml.api
 
 from bigml.supervised import SupervisedModel
-from bigml.io import UnicodeWriter
 
 import bigmler.utils as u
 import bigmler.checkpoint as c
 
 from bigmler.processing.args import has_value
 from bigmler.tst_reader import TstReader as TestReader
+from bigmler.output_writer import output_writer, project_row
+from bigmler.local_cache import local_predictor
+from bigmler.parallel import chunks
+from bigmler.batch_regression import batch_regression, \
+    batch_regression_predictable
 from bigmler.resourcesapi.common import NORMAL_FORMAT, FULL_FORMAT
 from bigmler.resourcesapi.batch_predictions import create_batch_prediction
 from bigmler.prediction import use_prediction_headers
@@ -54,10 +58,7 @@ def write_prediction(prediction_dict, output=sys.stdout,
     if prediction_info != NORMAL_FORMAT:
         if input_data is None:
             input_data = []
-        row = input_data
-        if exclude:
-            for index in exclude:
-                del row[index]
+        row = project_row(input_data, exclude)
     row.append(prediction_dict.get('prediction'))
     if 'probability' in prediction_dict and \
             prediction_info in [NORMAL_FORMAT, FULL_FORMAT]:
@@ -77,15 +78,29 @@ def local_prediction(models, test_reader, output, args,
 
     """
     # Only one model at present
-    local_model = SupervisedModel(models[0],
-                                  api=args.retrieve_api_)
+    local_model = local_predictor(SupervisedModel, models[0], args)
     kwargs = {"full": True}
     if has_value(args, "operating_point_"):
         kwargs.update({"operating_point": args.operating_point_})
-    for input_data in test_reader:
-        input_data_dict = test_reader.dict(input_data, filtering=False)
-        prediction_info = local_model.predict(
-            input_data_dict, **kwargs)
+    if batch_regression_predictable(
+            local_model, operating_point=kwargs.get("operating_point")):
+        # the design matrix is built for chunks of rows at once
+        batch_model = batch_regression(local_model)
+
+        def predictions_pairs(rows):
+            for chunk in chunks(rows, args.chunk_size):
+                yield from zip(chunk, batch_model.predict(
+                    [test_reader.dict(input_data, filtering=False)
+                     for input_data in chunk]))
+    else:
+        def predictions_pairs(rows):
+            for input_data in rows:
+                input_data_dict = test_reader.dict(input_data,
+                                                   filtering=False)
+                yield input_data, local_model.predict(input_data_dict,
+                                                      **kwargs)
+
+    for input_data, prediction_info in predictions_pairs(test_reader):
         write_prediction(prediction_info, output,
                          args.prediction_info, input_data, exclude)
 
@@ -101,7 +116,7 @@ def prediction(models, fields, args, session_file=None):
     test_reader = TestReader(test_set, test_set_header, fields,
                              None,
                              test_separator=args.test_separator)
-    with UnicodeWriter(output, lineterminator="\n") as output:
+    with output_writer(output, args, lineterminator="\n") as output:
         # columns to exclude if input_data is added to the prediction field
         exclude = use_prediction_headers(
             args.prediction_header, output, test_reader, fields, args,
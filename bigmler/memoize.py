@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Memoization of the predictions for duplicated test rows
+
+   Local predictions depend only on the values in the test row, so rows
+   that repeat the values of a previous one can reuse its prediction. The
+   last predictions are kept in a least recently used cache keyed by the
+   tuple of row values and only the rows not found there are scored.
+
+"""
+
+
+from collections import OrderedDict, deque
+
+import bigmler.utils as u
+
+
+DEFAULT_MEMO_SIZE = 100000
+# placeholder for the predictions that have not been computed yet
+PENDING = object()
+
+
+class PredictionMemo():
+    """Least recently used cache of predictions that keeps track of the
+       number of hits
+
+    """
+
+    def __init__(self, max_entries=DEFAULT_MEMO_SIZE):
+        self.max_entries = max_entries
+        self.predictions = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        """Returns a (found, prediction) pair for the key
+
+        """
+        if key in self.predictions:
+            self.predictions.move_to_end(key)
+            return True, self.predictions[key]
+        return False, None
+
+    def store(self, key, prediction):
+        """Adds the prediction to the cache, removing the least recently
+           used one if full
+
+        """
+        if self.max_entries < 1:
+            return
+        self.predictions[key] = prediction
+        if len(self.predictions) > self.max_entries:
+            self.predictions.popitem(last=False)
+
+    def hit_rate(self):
+        """Ratio of rows that reused a previous prediction
+
+        """
+        total = self.hits + self.misses
+        return float(self.hits) / total if total else 0.0
+
+    def log(self, session_file=None, console=False):
+        """Reports the hit rate in the session log
+
+        """
+        message = u.dated("Memoized predictions: %s hits out of %s rows"
+                          " (%.2f%% hit rate).\n" % (
+                              self.hits, self.hits + self.misses,
+                              100 * self.hit_rate()))
+        u.log_message(message, log_file=session_file, console=console)
+
+    def predictions_pairs(self, predict_pairs, rows, key_fn=tuple):
+        """Generator of (row, prediction) pairs in the order of `rows`.
+           `predict_pairs` receives an iterable with the rows whose
+           prediction is not memoized and returns the (row, prediction)
+           pairs in the same order.
+
+        """
+        # rows read so far as (row, key, prediction, found) tuples
+        scheduled = deque()
+        # keys of the rows sent to `predict_pairs` that are waiting for
+        # their prediction, with the number of rows that need it
+        waiting = {}
+        waiting_keys = deque()
+
+        def misses():
+            for row in rows:
+                key = key_fn(row)
+                if key in waiting:
+                    self.hits += 1
+                    waiting[key][0] += 1
+                    scheduled.append((row, key, None, False))
+                    continue
+                found, prediction = self.lookup(key)
+                if found:
+                    self.hits += 1
+                    scheduled.append((row, key, prediction, True))
+                    continue
+                self.misses += 1
+                waiting[key] = [1, PENDING]
+                waiting_keys.append(key)
+                scheduled.append((row, key, None, False))
+                yield row
+
+        def resolved():
+            while scheduled:
+                row, key, prediction, found = scheduled[0]
+                if not found:
+                    count, prediction = waiting[key]
+                    if prediction is PENDING:
+                        return
+                    if count == 1:
+                        del waiting[key]
+                    else:
+                        waiting[key][0] -= 1
+                scheduled.popleft()
+                yield row, prediction
+
+        for _, prediction in predict_pairs(misses()):
+            key = waiting_keys.popleft()
+            waiting[key][1] = prediction
+            self.store(key, prediction)
+            yield from resolved()
+        yield from resolved()
+
+
+def memoized_pairs(predict_pairs, rows, memo=None, key_fn=tuple):
+    """Generator of (row, prediction) pairs. If a `memo` is given, only the
+       rows not seen before are predicted by `predict_pairs`.
+
+    """
+    if memo is None:
+        return predict_pairs(rows)
+    return memo.predictions_pairs(predict_pairs, rows, key_fn=key_fn)
+
+
+def memoized_map(function, rows, memo=None, key_fn=tuple):
+    """Generator of (row, function(row)) pairs, reusing the result for
+       rows seen before if a `memo` is given
+
+    """
+    return memoized_pairs(lambda rows: ((row, function(row)) for row in rows),
+                          rows, memo=memo, key_fn=key_fn)
+
+
+def build_memo(args):
+    """Creates the predictions memo if the --memoize flag is set
+
+    """
+    if not getattr(args, "memoize", False):
+        return None
+    return PredictionMemo(max_entries=args.memoize_size)
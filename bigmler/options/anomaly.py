@@ -145,6 +145,16 @@ def get_anomaly_options(defaults=None):
             'type': int,
             'help': ("Number of selected top anomalies.")},
 
+        # Number of highest local anomaly scores to be kept in the output
+        '--top-scores': {
+            'action': 'store',
+            'dest': 'top_scores',
+            'default': defaults.get('top_scores', 0),
+            'type': int,
+            'help': ("Number of highest local anomaly scores to be written"
+                     " to the output file, sorted by descending score. All"
+                     " the scores are written if 0.")},
+
         # Comma separated list of summary fields
         '--id-fields': {
             'action': 'store',
@@ -80,6 +80,26 @@ def get_association_options(defaults=None):
             'help': ("The strategy for prioritizing the rules"
                      " in the search.")},
 
+        # Maximum number of items in each local association set
+        '--association-set-k': {
+            'action': 'store',
+            'type': int,
+            'dest': 'association_set_k',
+            'default': defaults.get('association_set_k', 100),
+            'help': ("Maximum number of items in each association set"
+                     " computed for the test data.")},
+
+        # Metric used to score the rules in the association sets
+        '--score-by': {
+            'action': 'store',
+            'dest': 'score_by',
+            'choices': ["confidence", "coverage", "leverage",
+                        "lift", "support"],
+            'default': defaults.get('score_by', None),
+            'help': ("The metric used to score the rules in the"
+                     " association sets. The search strategy of the"
+                     " association is used by default.")},
+
         # Does not create an association just a dataset.
         '--no-association': {
             'action': 'store_true',
@@ -125,6 +125,18 @@ def get_cluster_options(defaults=None):
             'help': ("Path to a json file describing centroid"
                      " attributes.")},
 
+        # Minimum number of centroids to use a spatial index when computing
+        # local centroids.
+        '--centroid-index': {
+            'action': 'store',
+            'type': int,
+            'dest': 'centroid_index',
+            'default': defaults.get('centroid_index', 0),
+            'help': ("Minimum number of centroids to find the nearest one"
+                     " using a spatial index in local centroids. Only"
+                     " used for clusters with numeric fields. 0 disables"
+                     " it.")},
+
         # Comma separated list of models to be generated from the cluster.
         '--cluster-models': {
             'action': 'store',
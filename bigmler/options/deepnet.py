@@ -256,6 +256,14 @@ def get_deepnet_options(defaults=None):
             'default': defaults.get('balance_fields', True),
             'help': "Do not balance fields."},
 
+        # Uses single precision floats in local deepnet predictions
+        '--deepnet-float32': {
+            'action': 'store_true',
+            'dest': 'deepnet_float32',
+            'default': defaults.get('deepnet_float32', False),
+            'help': ("Uses single precision floats to compute local"
+                     " deepnet predictions.")},
+
         # Does not create a deepnet just a dataset.
         '--no-deepnet': {
             'action': 'store_true',
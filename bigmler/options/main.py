@@ -341,6 +341,16 @@ def get_main_options(defaults=None, constants=None):
             'default': defaults.get('no_batch', False),
             'help': "Create remote predictions individually."},
 
+        # Number of individual remote predictions that are requested
+        # concurrently.
+        '--max-parallel-predictions': {
+            'action': 'store',
+            'dest': 'max_parallel_predictions',
+            'type': int,
+            'default': defaults.get('max_parallel_predictions', 1),
+            'help': ("Max number of individual remote predictions to be"
+                     " created in parallel.")},
+
         # Evaluations flag: excluding one dataset from the datasets list to
         # test
         '--dataset-off': {
@@ -731,6 +741,36 @@ def get_main_options(defaults=None, constants=None):
             'help': ("Enables fast ensemble's predictions with partial"
                      " results files.")},
 
+        # Computes the local predictions of ensembles in chunks of test rows
+        # so that memory use does not grow with the size of the test file.
+        '--streaming': {
+            'action': 'store_true',
+            'dest': 'streaming',
+            'default': defaults.get('streaming', False),
+            'help': ("Computes the local predictions by chunks of"
+                     " --chunk-size test rows.")},
+
+        # Stores the votes of the models in an ensemble in memory-mapped
+        # files while combining them.
+        '--memmap-votes': {
+            'action': 'store_true',
+            'dest': 'memmap_votes',
+            'default': defaults.get('memmap_votes', False),
+            'help': ("Stores the ensemble's votes in memory-mapped files"
+                     " in the output directory.")},
+
+        # Stops evaluating the models of an ensemble for a row when the
+        # rest of models cannot change the plurality or confidence weighted
+        # winner.
+        '--early-exit': {
+            'action': 'store_true',
+            'dest': 'early_exit',
+            'default': defaults.get('early_exit', False),
+            'help': ("Stops evaluating the models of a classification"
+                     " ensemble when the remaining ones cannot change the"
+                     " winning class in plurality or confidence weighted"
+                     " combinations.")},
+
         # Does not create a csv as output of a batch prediction.
         '--no-csv': {
             'action': 'store_true',
@@ -133,6 +133,15 @@ def get_pca_options(defaults=None):
             'default': defaults.get('projection_fields', None),
             'help': "Fields added to the projections file."},
 
+        # Format of the local projections file: csv or a binary array
+        '--projections-format': {
+            'action': 'store',
+            'dest': 'projections_format',
+            'choices': ["csv", "npy", "float32-raw"],
+            'default': defaults.get('projections_format', "csv"),
+            'help': ("Format of the local projections file: csv, npy"
+                     " or float32-raw.")},
+
         # Create a PCA, not just a dataset.
         '--no-no-pca': {
             'action': 'store_false',
@@ -107,6 +107,72 @@ def get_test_options(defaults=None):
             'action': 'store_true',
             'dest': 'test_header',
             'default': defaults.get('test_header', True),
-            'help': "The test set file has a header."}}
+            'help': "The test set file has a header."},
+
+        # Number of processes used to compute local predictions.
+        '--jobs': {
+            'action': 'store',
+            'dest': 'jobs',
+            'type': int,
+            'default': defaults.get('jobs', 1),
+            'help': ("Number of processes used to compute local"
+                     " predictions.")},
+
+        # Number of test rows sent to each process in one chunk.
+        '--chunk-size': {
+            'action': 'store',
+            'dest': 'chunk_size',
+            'type': int,
+            'default': defaults.get('chunk_size', 1000),
+            'help': ("Number of test rows to be scored as a unit in local"
+                     " predictions.")},
+
+        # Directory where the local predictors are cached between runs.
+        '--local-cache': {
+            'action': 'store',
+            'dest': 'local_cache',
+            'default': defaults.get('local_cache', None),
+            'help': ("Directory used to cache the local predictors built"
+                     " from the resources' JSON.")},
+
+        # Maximum size of the local predictors cache in MB.
+        '--local-cache-size': {
+            'action': 'store',
+            'dest': 'local_cache_size',
+            'type': int,
+            'default': defaults.get('local_cache_size', 1024),
+            'help': "Maximum size in MB of the local predictors cache."},
+
+        # Reuses the prediction of previous rows with the same values.
+        '--memoize': {
+            'action': 'store_true',
+            'dest': 'memoize',
+            'default': defaults.get('memoize', False),
+            'help': ("Reuses the local prediction of previous test rows"
+                     " with the same values.")},
+
+        # Maximum number of memoized predictions.
+        '--memoize-size': {
+            'action': 'store',
+            'dest': 'memoize_size',
+            'type': int,
+            'default': defaults.get('memoize_size', 100000),
+            'help': "Maximum number of memoized local predictions."},
+
+        # Number of output rows written at once.
+        '--output-batch-size': {
+            'action': 'store',
+            'dest': 'output_batch_size',
+            'type': int,
+            'default': defaults.get('output_batch_size', 1000),
+            'help': "Number of rows written at once in the output file."},
+
+        # Writes the output file in a separate thread.
+        '--background-output': {
+            'action': 'store_true',
+            'dest': 'background_output',
+            'default': defaults.get('background_output', False),
+            'help': ("Formats and writes the output rows in a separate"
+                     " thread.")}}
 
     return options
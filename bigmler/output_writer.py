@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Buffered output of predictions
+
+   The rows written by the `write_*` functions are accumulated and sent to
+   the CSV writer in batches through a large file buffer. Optionally, the
+   batches are formatted and written by a background thread, so that the
+   scoring loop does not wait for the disk.
+   When a journal is used, the number of lines and the byte offset of the
+   file are committed every few seconds, so that an interrupted file can be
+   resumed from the last committed row. The journal is removed when the
+   file is complete.
+   Numeric outputs can also be written as binary arrays that downstream
+   jobs can memory-map instead of parsing the CSV text.
+
+"""
+
+
+import os
+import io
+import csv
+import time
+import threading
+import queue
+
+from functools import lru_cache
+
+import numpy as np
+
+from bigml.io import UnicodeWriter
+
+from bigmler.checkpoint import read_journal, write_journal, remove_journal
+
+
+# rows sent to the CSV writer at once
+DEFAULT_BATCH_SIZE = 1000
+# size of the file buffer in bytes
+WRITE_BUFFER_SIZE = 1024 * 1024
+# number of batches waiting to be written by the background thread
+PENDING_BATCHES = 8
+# minimum number of seconds between commits to the journal
+JOURNAL_INTERVAL = 5
+# binary formats of the numeric outputs and the type of their values
+ARRAY_FORMATS = {"npy": "<f8", "float32-raw": "<f4"}
+ARRAY_EXTENSIONS = {"npy": ".npy", "float32-raw": ".f32"}
+# length of the .npy header, that is rewritten with the final shape
+NPY_HEADER_SIZE = 128
+
+
+@lru_cache(maxsize=32)
+def kept_columns(length, exclude):
+    """Indexes of the columns that remain in a row of `length` columns
+       after removing the ones in `exclude`
+
+    """
+    excluded = set(index if index >= 0 else length + index
+                   for index in exclude)
+    return [index for index in range(length) if index not in excluded]
+
+
+def project_row(input_data, exclude=None):
+    """Returns a copy of the input data row without the excluded columns.
+       The original row is not modified.
+
+    """
+    if input_data is None:
+        return []
+    if not exclude:
+        return list(input_data)
+    return [input_data[index] for index in
+            kept_columns(len(input_data), tuple(exclude))]
+
+
+class OutputWriter(UnicodeWriter):
+    """CSV writer that accumulates rows and writes them in batches,
+       optionally using a background thread
+
+    """
+    def __init__(self, filename, dialect=csv.excel, encoding="utf-8",
+                 batch_size=DEFAULT_BATCH_SIZE, background=False,
+                 journal=False, resume=False, **kwargs):
+        """`batch_size`: number of rows written at once
+           `background`: whether rows are formatted and written by a
+                         separate thread
+           `journal`: whether the committed lines are stored in a journal
+           `resume`: whether the lines committed in a previous run are kept
+                     and the new ones appended
+
+        """
+        super().__init__(filename, dialect=dialect, encoding=encoding,
+                         **kwargs)
+        self.batch_size = max(batch_size, 1)
+        self.background = background
+        self.journal = journal
+        self.resume = resume
+        self.lines = 0
+        self.resumed_lines = 0
+        self.committed_time = 0
+        self.binary_handler = None
+        self.rows = []
+        self.batches = None
+        self.thread = None
+        self.error = None
+
+    def open_writer(self):
+        """Opening the file with a large buffer and starting the writing
+           thread if needed. When resuming, the lines after the last
+           committed one are discarded.
+
+        """
+        mode = 'wb'
+        if self.journal:
+            lines, offset = read_journal(self.filename) if self.resume \
+                else (0, 0)
+            if lines > 0:
+                os.truncate(self.filename, offset)
+                mode = 'ab'
+                self.lines = self.resumed_lines = lines
+            else:
+                remove_journal(self.filename)
+            self.committed_time = time.monotonic()
+        # the binary file gives the byte offsets stored in the journal
+        self.binary_handler = open(self.filename, mode,
+                                   buffering=WRITE_BUFFER_SIZE)
+        self.file_handler = io.TextIOWrapper(self.binary_handler,
+                                             encoding=self.encoding,
+                                             newline='')
+        self.writer = csv.writer(self.file_handler, dialect=self.dialect,
+                                 **self.kwargs)
+        if self.background:
+            self.batches = queue.Queue(maxsize=PENDING_BATCHES)
+            self.thread = threading.Thread(target=self._write_batches,
+                                           daemon=True)
+            self.thread.start()
+        return self
+
+    def _write_batches(self):
+        """Writes the batches in the queue until a None is found
+
+        """
+        while True:
+            rows = self.batches.get()
+            if rows is None:
+                return
+            if self.error is None:
+                #pylint: disable=locally-disabled,broad-except
+                try:
+                    self._write(rows)
+                except Exception as exc:
+                    self.error = exc
+
+    def _write(self, rows):
+        """Writes the rows and commits them to the journal if used and
+           enough time has passed since the last commit
+
+        """
+        self.writer.writerows(rows)
+        self.lines += len(rows)
+        if self.journal and \
+                time.monotonic() - self.committed_time >= JOURNAL_INTERVAL:
+            self._commit()
+
+    def _commit(self):
+        """Stores the lines written so far and their byte offset in the
+           journal
+
+        """
+        self.file_handler.flush()
+        write_journal(self.filename, self.lines, self.binary_handler.tell())
+        self.committed_time = time.monotonic()
+
+    def _check_error(self):
+        """Raises the error found in the background thread, if any
+
+        """
+        if self.error is not None:
+            raise self.error
+
+    def flush_rows(self):
+        """Sends the accumulated rows to be written
+
+        """
+        if not self.rows:
+            return
+        rows, self.rows = self.rows, []
+        if self.thread is not None:
+            self._check_error()
+            self.batches.put(rows)
+        else:
+            self._write(rows)
+
+    def close_writer(self, complete=True):
+        """Writes the pending rows and closes the file. The journal is
+           removed when the file is `complete` or committed otherwise.
+
+        """
+        try:
+            self.flush_rows()
+            if self.thread is not None:
+                self.batches.put(None)
+                self.thread.join()
+                self.thread = None
+                self._check_error()
+            if self.journal and not complete:
+                self._commit()
+        finally:
+            self.file_handler.close()
+        if self.journal and complete:
+            remove_journal(self.filename)
+
+    def __exit__(self, ftype, value, traceback):
+        """Closing the file. Files closed because of an exception keep
+           their journal to be resumed.
+
+        """
+        self.close_writer(complete=ftype is None)
+
+    def writerow(self, row):
+        """Adds the row to the current batch
+
+        """
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush_rows()
+
+    def writerows(self, rows):
+        """Adds the rows to the current batch
+
+        """
+        for row in rows:
+            self.writerow(row)
+
+
+def output_writer(filename, args, **kwargs):
+    """OutputWriter configured by the --output-batch-size and
+       --background-output flags
+
+    """
+    return OutputWriter(
+        filename,
+        batch_size=getattr(args, "output_batch_size", DEFAULT_BATCH_SIZE),
+        background=getattr(args, "background_output", False), **kwargs)
+
+
+class ArrayWriter():
+    """Writer of rows of numbers as a binary array. The `npy` format stores
+       float64 values in a .npy file whose header is written again with
+       the final number of rows when closing. The `float32-raw` format
+       stores the values only, as float32 in C order.
+
+    """
+    def __init__(self, filename, columns, array_format="npy",
+                 batch_size=DEFAULT_BATCH_SIZE):
+        self.filename = filename
+        self.columns = columns
+        self.array_format = array_format
+        self.dtype = np.dtype(ARRAY_FORMATS[array_format])
+        self.batch_size = max(batch_size, 1)
+        self.lines = 0
+        self.rows = []
+        self.file_handler = None
+
+    def __enter__(self):
+        self.file_handler = open(self.filename, "wb",
+                                 buffering=WRITE_BUFFER_SIZE)
+        if self.array_format == "npy":
+            self._write_header()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.flush_rows()
+            if self.array_format == "npy":
+                self.file_handler.seek(0)
+                self._write_header()
+        finally:
+            self.file_handler.close()
+
+    def _write_header(self):
+        """Writes the .npy header for the rows written so far, padded to
+           a fixed size so that it can be replaced in place
+
+        """
+        header = repr({"descr": self.dtype.str, "fortran_order": False,
+                       "shape": (self.lines, self.columns)})
+        magic = np.lib.format.magic(1, 0)
+        length = NPY_HEADER_SIZE - len(magic) - 2
+        header = header.ljust(length - 1) + "\n"
+        self.file_handler.write(magic)
+        self.file_handler.write(length.to_bytes(2, "little"))
+        self.file_handler.write(header.encode("latin1"))
+
+    def flush_rows(self):
+        """Writes the accumulated rows to the file
+
+        """
+        if not self.rows:
+            return
+        rows, self.rows = self.rows, []
+        self.file_handler.write(
+            np.asarray(rows, dtype=self.dtype).reshape(
+                (-1, self.columns)).tobytes())
+        self.lines += len(rows)
+
+    def writerow(self, row):
+        """Adds the row to the current batch
+
+        """
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush_rows()
+
+    def writerows(self, rows):
+        """Adds the rows to the current batch
+
+        """
+        for row in rows:
+            self.writerow(row)
+
+
+def array_filename(filename, array_format):
+    """Path of the binary array file that replaces the `filename` CSV
+
+    """
+    return "%s%s" % (os.path.splitext(filename)[0],
+                     ARRAY_EXTENSIONS[array_format])
+
+
+def array_writer(filename, args, columns, array_format):
+    """ArrayWriter configured by the --output-batch-size flag
+
+    """
+    return ArrayWriter(
+        array_filename(filename, array_format), columns,
+        array_format=array_format,
+        batch_size=getattr(args, "output_batch_size", DEFAULT_BATCH_SIZE))
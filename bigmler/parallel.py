@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Parallel scoring functions
+
+   The rows in the test file are split in chunks that are scored by a pool
+   of processes. Each process builds its own local predictor only once and
+   the results are returned in the original order of the rows.
+   Remote predictions are requested by a pool of threads that keeps a
+   bounded number of calls in flight.
+
+"""
+
+
+import multiprocessing
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+
+DEFAULT_CHUNK_SIZE = 1000
+# number of chunks per process that can be waiting to be scored
+PENDING_FACTOR = 2
+
+# local predictor and scoring function in each worker process
+_LOCAL_MODEL = None
+_PREDICT_FN = None
+
+
+def chunks(iterable, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Generator of lists of at most `chunk_size` consecutive elements
+
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _init_worker(model_builder, predict_fn):
+    """Builds the local predictor used in the worker process
+
+    """
+    #pylint: disable=locally-disabled,global-statement
+    global _LOCAL_MODEL, _PREDICT_FN
+    _LOCAL_MODEL = model_builder()
+    _PREDICT_FN = predict_fn
+
+
+def _predict_chunk(chunk):
+    """Scores the rows in the chunk using the worker's local predictor
+
+    """
+    return _PREDICT_FN(_LOCAL_MODEL, chunk)
+
+
+def pool_predict(model_builder, predict_fn, rows, jobs,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+    """Generator of (input_data, prediction) pairs computed in a pool of
+       `jobs` processes.
+
+       `model_builder`: picklable callable that returns the local predictor
+       `predict_fn`: picklable callable that receives the local predictor and
+                     a list of input data rows and returns the list of their
+                     predictions
+       `rows`: iterable of input data rows
+       The number of chunks read ahead is bounded, so memory does not grow
+       with the size of the test file.
+
+    """
+    if chunk_size is None or chunk_size < 1:
+        chunk_size = DEFAULT_CHUNK_SIZE
+    max_pending = jobs * PENDING_FACTOR
+    pending = deque()
+    with multiprocessing.Pool(jobs, initializer=_init_worker,
+                              initargs=(model_builder, predict_fn)) as pool:
+        for chunk in chunks(rows, chunk_size):
+            pending.append((chunk, pool.apply_async(_predict_chunk,
+                                                    (chunk,))))
+            if len(pending) >= max_pending:
+                chunk, result = pending.popleft()
+                yield from zip(chunk, result.get())
+        while pending:
+            chunk, result = pending.popleft()
+            yield from zip(chunk, result.get())
+
+
+def thread_map(function, items, max_workers, max_pending=None):
+    """Generator of (item, function(item)) pairs computed in a pool of
+       `max_workers` threads. Pairs are yielded in the order of the items
+       and only a bounded number of calls is pending at a time, by
+       default `PENDING_FACTOR` per thread.
+
+    """
+    if max_pending is None:
+        max_pending = max_workers * PENDING_FACTOR
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for item in items:
+            pending.append((item, executor.submit(function, item)))
+            if len(pending) >= max_pending:
+                item, result = pending.popleft()
+                yield item, result.result()
+        while pending:
+            item, result = pending.popleft()
+            yield item, result.result()
@@ -19,25 +19,36 @@
 
 
 import sys
-import ast
+import csv
+import json
 import gc
+import time
 
 from functools import partial
 
 import bigml.api
 
-from bigml.model import Model, to_prediction
+from bigml.model import Model, to_prediction, cast_prediction
 from bigml.multimodel import MultiModel, read_votes
 from bigml.ensemble import Ensemble
 from bigml.util import localize, console_log, get_predictions_file_name
 from bigml.io import UnicodeWriter
-from bigml.multivote import (PLURALITY_CODE, THRESHOLD_CODE, MultiVote,
-                             ws_confidence)
+from bigml.constants import LAST_PREDICTION
+from bigml.multivote import PLURALITY_CODE, THRESHOLD_CODE, ws_confidence
 
 import bigmler.utils as u
 import bigmler.checkpoint as c
 
 from bigmler.tst_reader import TstReader as TestReader
+from bigmler.output_writer import output_writer, project_row
+from bigmler.parallel import pool_predict, chunks, thread_map
+from bigmler.batch_tree import BatchTree, batch_predictable
+from bigmler.batch_ensemble import BatchEnsemble, EARLY_EXIT_METHODS
+from bigmler.batch_boosting import BatchBoosting, batch_boosting_predictable
+from bigmler.votes_matrix import VotesMatrix, COMBINATION_METHODS
+from bigmler.labels_matrix import LabelsMatrix
+from bigmler.local_cache import cached_local, DEFAULT_CACHE_SIZE
+from bigmler.memoize import build_memo, memoized_pairs
 from bigmler.resourcesapi.common import FIELDS_QS, ALL_FIELDS_QS, \
     BRIEF_FORMAT, NORMAL_FORMAT, FULL_FORMAT
 from bigmler.resourcesapi.batch_predictions import create_batch_prediction
@@ -139,10 +150,7 @@ def write_prediction(prediction, output=sys.stdout,
     if prediction_info != NORMAL_FORMAT:
         if input_data is None:
             input_data = []
-        row = input_data
-        if exclude:
-            for index in exclude:
-                del row[index]
+        row = project_row(input_data, exclude)
     row.append(prediction)
     if prediction_info in [NORMAL_FORMAT, FULL_FORMAT]:
         row.append(confidence)
@@ -204,11 +212,44 @@ def combine_votes(votes_files, to_prediction_method, to_file, method=0,
                          prediction_info, input_data, exclude)
 
 
+def create_remote_prediction(api, resource_id, input_data, to_dict=None,
+                             prediction_args=None, wait=False):
+    """Creates a remote prediction for a test row. If `wait` is set, the
+       prediction is created asynchronously and then polled until finished.
+
+    """
+    input_data_dict = to_dict(input_data)
+    if wait:
+        prediction = api.create_prediction(resource_id, input_data_dict,
+                                           wait_time=0, args=prediction_args)
+        return u.check_resource(prediction, api.get_prediction)
+    return api.create_prediction(resource_id, input_data_dict,
+                                 args=prediction_args)
+
+
+def remote_predictions(api, resource_id, rows, to_dict, prediction_args,
+                       max_parallel_predictions=1, wait=False):
+    """Generator of (input_data, prediction) pairs for the test rows, in
+       the same order. Up to `max_parallel_predictions` predictions are
+       requested at a time.
+
+    """
+    create = partial(create_remote_prediction, api, resource_id,
+                     to_dict=to_dict, prediction_args=prediction_args,
+                     wait=wait)
+    if max_parallel_predictions is not None and \
+            max_parallel_predictions > 1:
+        return thread_map(create, rows, max_parallel_predictions)
+    return ((input_data, create(input_data)) for input_data in rows)
+
+
 def remote_predict_models(models, test_reader, prediction_file, api, args,
                           resume=False, output_path=None,
                           session_file=None, log=None, exclude=None,
-                          output=None):
-    """Retrieve predictions remotely, combine them and save predictions to file
+                          output=None, output_rows=0):
+    """Retrieve predictions remotely, combine them and save predictions to file.
+       When resuming, the models' predictions files and the output of a
+       single model continue after their last committed row.
 
     """
     predictions_files = []
@@ -231,27 +272,36 @@ def remote_predict_models(models, test_reader, prediction_file, api, args,
         predictions_file = get_predictions_file_name(model,
                                                      output_path)
         predictions_files.append(predictions_file)
-        if (not resume or
+        # the output of a single model is written with its predictions
+        # file, so both are resumed together
+        if (not resume or single_model or
                 not c.checkpoint(c.are_predictions_created, predictions_file,
                                  test_reader.number_of_tests(),
-                                 debug=args.debug)[0]):
+                                 resumable=True, debug=args.debug)[0]):
             if not message_logged:
                 message = u.dated("Creating remote predictions.\n")
                 u.log_message(message, log_file=session_file,
                               console=args.verbosity)
             message_logged = True
-            with UnicodeWriter(predictions_file) as predictions_file:
-                for input_data in raw_input_data_list:
-                    input_data_dict = test_reader.dict(input_data)
-                    prediction = api.create_prediction(model, input_data_dict,
-                                                       args=prediction_args)
+            with output_writer(predictions_file, args, journal=True,
+                               resume=resume) as predictions_file:
+                model_rows = predictions_file.resumed_lines
+                first_row = min(model_rows, output_rows) if single_model \
+                    else model_rows
+                predictions = remote_predictions(
+                    api, model, raw_input_data_list[first_row:],
+                    test_reader.dict, prediction_args,
+                    args.max_parallel_predictions)
+                for row, (input_data, prediction) in enumerate(
+                        predictions, first_row):
                     u.check_resource_error(prediction,
                                            "Failed to create prediction: ")
                     u.log_message("%s\n" % prediction['resource'],
                                   log_file=log)
                     prediction_row = prediction_to_row(prediction)
-                    predictions_file.writerow(prediction_row)
-                    if single_model:
+                    if row >= model_rows:
+                        predictions_file.writerow(prediction_row)
+                    if single_model and row >= output_rows:
                         write_prediction(prediction_row[0:2], output,
                                          args.prediction_info,
                                          input_data, exclude)
@@ -281,21 +331,18 @@ def remote_predict_ensemble(ensemble_id, test_reader, prediction_file, api,
 
     if (not resume or not c.checkpoint(
             c.are_predictions_created, prediction_file,
-            test_reader.number_of_tests(), debug=args.debug)[0]):
+            test_reader.number_of_tests(), resumable=True,
+            debug=args.debug)[0]):
         message = u.dated("Creating remote predictions.")
         u.log_message(message, log_file=session_file,
                       console=args.verbosity)
 
         output = output or UnicodeWriter(
             prediction_file).open_writer()
-        for input_data in test_reader:
-            input_data_dict = test_reader.dict(input_data)
-            prediction = api.create_prediction(ensemble_id,
-                                               input_data_dict,
-                                               wait_time=0,
-                                               args=prediction_args)
-            prediction = u.check_resource(prediction,
-                                          api.get_prediction)
+        predictions = remote_predictions(
+            api, ensemble_id, test_reader, test_reader.dict,
+            prediction_args, args.max_parallel_predictions, wait=True)
+        for input_data, prediction in predictions:
             u.check_resource_error(prediction,
                                    "Failed to create prediction: ")
             u.log_message("%s\n" % prediction['resource'], log_file=log)
@@ -305,35 +352,129 @@ def remote_predict_ensemble(ensemble_id, test_reader, prediction_file, api,
                              args.prediction_info, input_data, exclude)
 
 
+def build_local_model(models, max_models=MAX_MODELS, api=None,
+                      missing_strategy=LAST_PREDICTION, operating_point=None):
+    """Builds the local Model or Ensemble used in local predictions. Single
+       models and boosted ensembles are evaluated in batches when possible.
+
+    """
+    if len(models) == 1:
+        local_model = Model(models[0], api=api)
+        if batch_predictable(local_model, operating_point=operating_point):
+            return BatchTree(local_model, missing_strategy=missing_strategy)
+        return local_model
+    local_ensemble = Ensemble(models, max_models=max_models, api=api)
+    if batch_boosting_predictable(local_ensemble,
+                                  operating_point=operating_point,
+                                  missing_strategy=missing_strategy):
+        try:
+            return BatchBoosting(local_ensemble,
+                                 operating_point=operating_point)
+        except ValueError:
+            # text or items splits are left to the local Ensemble
+            pass
+    return local_ensemble
+
+
+def local_model_predict(local_model, rows, headers=None, kwargs=None,
+                        median=False):
+    """Predicts the input data rows with the local Model, BatchTree,
+       Ensemble or BatchBoosting
+
+    """
+    input_data_list = [dict(list(zip(headers, input_data)))
+                       for input_data in rows]
+    if isinstance(local_model, BatchTree):
+        predictions = local_model.predict(input_data_list)
+    else:
+        predictions = [local_model.predict(input_data_dict, **kwargs)
+                       for input_data_dict in input_data_list]
+    if median and not isinstance(local_model, (Ensemble, BatchBoosting)) \
+            and local_model.regression:
+        # only single models' predictions can be based on the median value
+        # predict
+        for prediction in predictions:
+            prediction["prediction"] = prediction["median"]
+    return predictions
+
+
 def local_predict(models, test_reader, output, args, options=None,
-                  exclude=None):
+                  exclude=None, session_file=None):
     """Get local predictions and combine them to get a final prediction
 
     """
     single_model = len(models) == 1
     kwargs = {"full": True,
               "missing_strategy": args.missing_strategy}
-    if single_model:
-        local_model = Model(models[0], api=args.retrieve_api_)
-    else:
-        local_model = Ensemble(models, max_models=args.max_batch_models,
-                               api=args.retrieve_api_)
+    if not single_model:
         kwargs.update({"method": args.method, "options": options,
                        "median": args.median})
     if args.operating_point_:
         kwargs.update({"operating_point": args.operating_point_})
-
-    for input_data in test_reader:
-        input_data_dict = dict(list(zip(test_reader.raw_headers, input_data)))
-        prediction = local_model.predict(
-            input_data_dict, **kwargs)
-        if single_model and args.median and local_model.regression:
-            # only single models' predictions can be based on the median value
-            # predict
-            prediction["prediction"] = prediction["median"]
+    model_builder = partial(cached_local, build_local_model, models,
+                            api=args.retrieve_api_,
+                            cache_dir=args.local_cache,
+                            max_size=args.local_cache_size,
+                            max_models=args.max_batch_models,
+                            missing_strategy=args.missing_strategy,
+                            operating_point=args.operating_point_)
+    predict_fn = partial(local_model_predict,
+                         headers=test_reader.raw_headers, kwargs=kwargs,
+                         median=args.median)
+
+    start = time.time()
+    if args.jobs > 1:
+        # the test file is scored in chunks by a pool of processes that
+        # build their own copy of the local model
+        predict_pairs = partial(pool_predict, model_builder, predict_fn,
+                                jobs=args.jobs, chunk_size=args.chunk_size)
+    else:
+        local_model = model_builder()
+
+        def predict_pairs(rows):
+            return (prediction_pair
+                    for chunk in chunks(rows, args.chunk_size)
+                    for prediction_pair in zip(
+                        chunk, predict_fn(local_model, chunk)))
+    # rows that repeat a previous one reuse its prediction
+    memo = build_memo(args)
+    predictions = memoized_pairs(predict_pairs, test_reader, memo)
+
+    rows = 0
+    for input_data, prediction in predictions:
         write_prediction(prediction,
                          output,
                          args.prediction_info, input_data, exclude)
+        rows += 1
+    elapsed = time.time() - start
+    message = u.dated("%s local predictions computed in %.2fs (%.0f rows/s).\n"
+                      % (rows, elapsed, rows / elapsed if elapsed else 0))
+    u.log_message(message, log_file=session_file, console=args.verbosity)
+    if memo is not None:
+        memo.log(session_file=session_file, console=args.verbosity)
+
+
+def store_models(complete_models, output_path):
+    """Stores the full model structures in the output directory and returns
+       the paths to the files, so that local models can be built again from
+       them with no further API calls.
+
+    """
+    model_files = []
+    for model in complete_models:
+        model_file = u.storage_file_name(output_path, model['resource'])
+        with open(model_file, "w") as model_handler:
+            json.dump(model, model_handler)
+        model_files.append(model_file)
+    return model_files
+
+
+def objective_categories(local_model):
+    """Categories of the objective field of a classification model
+
+    """
+    summary = local_model.fields[local_model.objective_id].get("summary", {})
+    return [category for category, _ in summary.get("categories", [])]
 
 
 def retrieve_models_split(models_split, api, query_string=FIELDS_QS,
@@ -383,54 +524,25 @@ def retrieve_models_split(models_split, api, query_string=FIELDS_QS,
     return complete_models, models_order
 
 
-def aggregate_multivote(multivote, options, labels, models_per_label, ordered,
-                        models_order, label_separator=None):
-    """Aggregate the model's predictions for multi-label fields in a
-       concatenated format into a final prediction
+def labels_votes_columns(labels, models_per_label, ordered, models_order,
+                         models_total):
+    """Columns of the votes of the models that predict each label of a
+       multi-labeled field, one label after the other. The order of the
+       labels is resolved once for all the rows.
 
     """
-
-    if label_separator is None:
-        label_separator = ","
-    predictions = multivote.predictions
-
     if ordered and models_per_label == 1:
         # as multi-labeled models are created from end to start votes
         # must be reversed to match
-        predictions.reverse()
+        columns = list(range(models_total))[::-1]
     else:
-        predictions = [prediction for (_, prediction)
-                       in sorted(zip(models_order, predictions),
-                                 key=lambda x: x[0])]
-
+        columns = sorted(range(len(models_order)),
+                         key=lambda column: models_order[column])
     if (labels is None or
-            len(labels) * models_per_label != len(predictions)):
+            len(labels) * models_per_label != len(columns)):
         sys.exit("Failed to make a multi-label prediction. No"
                  " valid label info is found.")
-    prediction_list = []
-    confidence_list = []
-    # In the following case, we must vote each label using the models
-    # in the ensemble and the chosen method
-
-    if models_per_label > 1:
-        label_predictions = [predictions[i: i + models_per_label] for
-                             i in range(0, len(predictions),
-                                        models_per_label)]
-        predictions = []
-        for label_prediction in label_predictions:
-            label_multivote = MultiVote(label_prediction)
-            prediction_info = label_multivote.combine(
-                method=AGGREGATION, full=True, options=options)
-            predictions.append({'prediction': prediction_info["prediction"],
-                                'confidence': prediction_info["confidence"]})
-    for vote_index, vote_prediction in enumerate(predictions):
-        if ast.literal_eval(vote_prediction['prediction']):
-            prediction_list.append(labels[vote_index])
-            confidence = str(vote_prediction['confidence'])
-            confidence_list.append(confidence)
-    prediction = [label_separator.join(prediction_list),
-                  label_separator.join(confidence_list)]
-    return prediction
+    return columns
 
 
 def combine_multivote(multivote, other_label=OTHER):
@@ -461,13 +573,78 @@ def combine_multivote(multivote, other_label=OTHER):
         prediction = [None, None]
     return prediction
 
+def build_batch_ensemble(models, api=None):
+    """Builds the BatchEnsemble that holds the trees of all the models in a
+       classification ensemble. The models are retrieved and flattened one
+       at a time. Returns None if some of the models cannot be compacted.
+
+    """
+    def local_models():
+        for model in models:
+            complete_models, _ = retrieve_models_split(
+                [model], api, query_string=ALL_FIELDS_QS)
+            yield Model(complete_models[0], api=api)
+    try:
+        return BatchEnsemble(local_models())
+    except ValueError:
+        return None
+
+
+def batch_ensemble_predict(batch_ensemble, test_reader, output, args,
+                           method=PLURALITY_CODE, options=None, exclude=None,
+                           output_path=None, session_file=None,
+                           other_label=OTHER, early_exit=False):
+    """Predicts the test rows in chunks using all the models in the
+       BatchEnsemble at once and combines their votes. With `early_exit`,
+       the models stop being evaluated when the vote cannot change.
+
+    """
+    message = u.dated("Combining predictions.\n")
+    u.log_message(message, log_file=session_file, console=args.verbosity)
+    early_exit = method if early_exit and method in EARLY_EXIT_METHODS \
+        else None
+    rows = 0
+    evaluated_models = 0
+    for raw_input_data_list in chunks(test_reader, args.chunk_size):
+        input_data_list = [dict(list(zip(test_reader.raw_headers,
+                                         input_data)))
+                           for input_data in raw_input_data_list]
+        votes_matrix = None
+        if method == COMBINATION:
+            # used in --max-categories flag: each model votes for one of its
+            # subset of categories and the most confident vote wins
+            predictions = batch_ensemble.combine_categories(input_data_list,
+                                                            other_label)
+        else:
+            votes_matrix, evaluated = batch_ensemble.votes(
+                input_data_list,
+                path=(output_path if args.memmap_votes else None),
+                early_exit=early_exit)
+            evaluated_models += int(evaluated.sum())
+            predictions = votes_matrix.combine(method=method,
+                                               options=options)
+        for prediction, input_data in zip(predictions, raw_input_data_list):
+            write_prediction(prediction, output, args.prediction_info,
+                             input_data, exclude)
+        if votes_matrix is not None:
+            votes_matrix.close()
+        rows += len(raw_input_data_list)
+        if args.verbosity:
+            console_log("Predicted %s rows" % localize(rows), reset=True)
+    if early_exit is not None and rows:
+        message = u.dated("%.2f models out of %s evaluated per row.\n" % (
+            evaluated_models / float(rows), len(batch_ensemble.roots)))
+        u.log_message(message, log_file=session_file,
+                      console=args.verbosity)
+
+
 #pylint: disable=locally-disabled,consider-using-with
 def local_batch_predict(models, test_reader, prediction_file, api, args,
                         resume=False, output_path=None, output=None,
                         method=PLURALITY_CODE, options=None,
                         session_file=None, labels=None, ordered=True,
                         exclude=None, models_per_label=1, other_label=OTHER,
-                        multi_label_data=None):
+                        multi_label_data=None, early_exit=False):
 
     """Get local predictions form partial Multimodel, combine and save to file
 
@@ -481,6 +658,22 @@ def local_batch_predict(models, test_reader, prediction_file, api, args,
         console_log("Predicted on %s out of %s models [%s%%]" % (
             localize(current), localize(total), pct), reset=True)
 
+    def write_votes(local_model, votes, append=False):
+        """Writes the votes of each model in the slot to its predictions
+           file.
+
+        """
+        for order, model in enumerate(local_model.models):
+            pred_file = get_predictions_file_name(model.resource_id,
+                                                  output_path)
+            with open(pred_file, "a" if append else "w", encoding="utf-8",
+                      newline="") as model_output:
+                writer = csv.writer(model_output)
+                for vote in votes:
+                    writer.writerow(cast_prediction(
+                        vote.predictions[order], to="list", confidence=True,
+                        distribution=True, count=True))
+
     max_models = args.max_batch_models
     if labels is None:
         labels = []
@@ -492,96 +685,208 @@ def local_batch_predict(models, test_reader, prediction_file, api, args,
         except IOError:
             raise IOError("Failed to write in %s" % prediction_file)
     models_total = len(models)
+    if args.fast and models_total > 1 and \
+            (method in COMBINATION_METHODS or method == COMBINATION) \
+            and args.missing_strategy == LAST_PREDICTION:
+        # the trees of classification ensembles are compacted in node
+        # tables, so that all the models are used at once
+        batch_ensemble = cached_local(
+            build_batch_ensemble, models, api=api,
+            cache_dir=getattr(args, "local_cache", None),
+            max_size=getattr(args, "local_cache_size", DEFAULT_CACHE_SIZE))
+        if batch_ensemble is not None:
+            batch_ensemble_predict(batch_ensemble, test_reader, output, args,
+                                   method=method, options=options,
+                                   exclude=exclude, output_path=output_path,
+                                   session_file=session_file,
+                                   other_label=other_label,
+                                   early_exit=early_exit)
+            return
     models_splits = [models[index:(index + max_models)] for index
                      in range(0, models_total, max_models)]
-    # Input data is stored as a list and predictions are made for all rows
-    # with each model
-    raw_input_data_list = []
-    for input_data in test_reader:
-        raw_input_data_list.append(input_data)
-    total_votes = []
+    streaming = getattr(args, "streaming", False)
+    if streaming:
+        # Input data is read in chunks and all the models are used to
+        # predict each chunk before reading the next one
+        input_chunks = chunks(test_reader, args.chunk_size)
+    else:
+        # Input data is stored as a list and predictions are made for all
+        # rows with each model
+        input_chunks = [list(test_reader)]
     models_order = []
-    models_count = 0
     single_model = models_total == 1
     query_string = FIELDS_QS if single_model else ALL_FIELDS_QS
-    # processing the models in slots
-    for models_split in models_splits:
-        if resume:
-            for model in models_split:
-                pred_file = get_predictions_file_name(model,
-                                                      output_path)
-                c.checkpoint(c.are_predictions_created,
-                             pred_file,
-                             test_reader.number_of_tests(), debug=args.debug)
-        # retrieving the full models allowed by --max-batch-models to be used
-        # in a multimodel slot
-        complete_models, models_order = retrieve_models_split(
-            models_split, api, query_string=query_string, labels=labels,
-            multi_label_data=multi_label_data, ordered=ordered,
-            models_order=models_order)
-
-        # predicting with the multimodel slot
-        if complete_models:
-            local_model = MultiModel(complete_models, api=api)
-            # added to ensure garbage collection at each step of the loop
-            gc.collect()
-            try:
-                votes = local_model.batch_predict(
-                    raw_input_data_list, output_path,
-                    reuse=True, missing_strategy=args.missing_strategy,
-                    headers=test_reader.raw_headers, to_file=(not args.fast),
-                    use_median=args.median)
-            except ImportError:
-                sys.exit("Failed to find the numpy and scipy libraries needed"
-                         " to use proportional missing strategy for"
-                         " regressions. Please, install them manually")
-
-            # extending the votes for each input data with the new model-slot
-            # predictions
-            if not args.fast:
-                votes = local_model.batch_votes(output_path)
-            models_count += max_models
-            models_count = min(models_count, models_total)
-            if args.verbosity:
-                draw_progress_bar(models_count, models_total)
-
-            if total_votes:
-                for index, vote in enumerate(votes):
-                    predictions = total_votes[index]
-                    predictions.extend(vote.predictions)
+    # models retrieved for the first chunk are stored locally to be reused
+    # in the next ones
+    local_models = []
+    multi_model = None
+    columns_by_label = None
+    for chunk_index, raw_input_data_list in enumerate(input_chunks):
+        total_votes = []
+        votes_matrix = None
+        labels_matrix = None
+        if method == AGGREGATION and not single_model:
+            # multi-labeled fields: the votes of the models of every label
+            # are stored in arrays
+            labels_matrix = LabelsMatrix(len(raw_input_data_list),
+                                         models_total)
+        models_count = 0
+        # processing the models in slots
+        for split_index, models_split in enumerate(models_splits):
+            if chunk_index == 0:
+                if resume and not streaming:
+                    for model in models_split:
+                        pred_file = get_predictions_file_name(model,
+                                                              output_path)
+                        c.checkpoint(c.are_predictions_created,
+                                     pred_file,
+                                     test_reader.number_of_tests(),
+                                     debug=args.debug)
+                # retrieving the full models allowed by --max-batch-models
+                # to be used in a multimodel slot
+                complete_models, models_order = retrieve_models_split(
+                    models_split, api, query_string=query_string,
+                    labels=labels, multi_label_data=multi_label_data,
+                    ordered=ordered, models_order=models_order)
+                if streaming and len(models_splits) > 1:
+                    complete_models = store_models(complete_models,
+                                                   output_path)
+                local_models.append(complete_models)
+            complete_models = local_models[split_index]
+
+            # predicting with the multimodel slot
+            if complete_models:
+                if len(models_splits) == 1 and chunk_index > 0:
+                    local_model = multi_model
+                else:
+                    local_model = cached_local(
+                        MultiModel, complete_models, api=api,
+                        cache_dir=getattr(args, "local_cache", None),
+                        max_size=getattr(args, "local_cache_size",
+                                         DEFAULT_CACHE_SIZE))
+                    multi_model = local_model
+                    # added to ensure garbage collection at each step of the
+                    # loop
+                    gc.collect()
+                if votes_matrix is None and not single_model and \
+                        method in COMBINATION_METHODS and \
+                        not local_model.models[0].regression:
+                    # classification votes are stored in arrays and
+                    # combined for all the rows at once
+                    votes_matrix = VotesMatrix(
+                        len(raw_input_data_list), models_total,
+                        objective_categories(local_model.models[0]),
+                        path=(output_path if args.memmap_votes else None))
+                try:
+                    votes = local_model.batch_predict(
+                        raw_input_data_list, output_path,
+                        reuse=True, missing_strategy=args.missing_strategy,
+                        headers=test_reader.raw_headers,
+                        to_file=(not args.fast and not streaming),
+                        use_median=args.median)
+                except ImportError:
+                    sys.exit("Failed to find the numpy and scipy libraries"
+                             " needed to use proportional missing strategy"
+                             " for regressions. Please, install them"
+                             " manually")
+
+                # extending the votes for each input data with the new
+                # model-slot predictions
+                if not args.fast and streaming:
+                    write_votes(local_model, votes, append=chunk_index > 0)
+                elif not args.fast and votes_matrix is not None:
+                    votes_matrix.read_votes(
+                        [get_predictions_file_name(model.resource_id,
+                                                   output_path)
+                         for model in local_model.models],
+                        partial(to_prediction, local_model.models[0]))
+                elif not args.fast:
+                    votes = local_model.batch_votes(output_path)
+                models_count += max_models
+                models_count = min(models_count, models_total)
+                if args.verbosity and not streaming:
+                    draw_progress_bar(models_count, models_total)
+
+                if votes_matrix is not None:
+                    if args.fast or streaming:
+                        votes_matrix.add_votes(votes)
+                elif labels_matrix is not None:
+                    labels_matrix.add_votes(votes)
+                elif total_votes:
+                    for index, vote in enumerate(votes):
+                        predictions = total_votes[index]
+                        predictions.extend(vote.predictions)
+                else:
+                    total_votes = votes
+
+        if not single_model and chunk_index == 0:
+            message = u.dated("Combining predictions.\n")
+            u.log_message(message, log_file=session_file,
+                          console=args.verbosity)
+
+        if votes_matrix is not None:
+            for prediction, input_data in zip(
+                    votes_matrix.combine(method=method, options=options),
+                    raw_input_data_list):
+                write_prediction(prediction, output, args.prediction_info,
+                                 input_data, exclude)
+            votes_matrix.close()
+
+        if labels_matrix is not None:
+            if columns_by_label is None:
+                columns_by_label = labels_votes_columns(
+                    labels, models_per_label, ordered, models_order,
+                    labels_matrix.columns)
+            # multi-labeled fields: predictions are concatenated
+            for prediction, input_data in zip(
+                    labels_matrix.predictions(
+                        labels, columns_by_label,
+                        models_per_label=models_per_label,
+                        label_separator=args.label_separator),
+                    raw_input_data_list):
+                write_prediction(prediction, output, args.prediction_info,
+                                 input_data, exclude)
+
+        # combining the votes to issue the final prediction for each input
+        # data
+        for multivote, input_data in zip(total_votes, raw_input_data_list):
+            if single_model:
+                # single model predictions need no combination
+                prediction = [multivote.predictions[0]['prediction'],
+                              multivote.predictions[0]['confidence']]
+            elif method == COMBINATION:
+                # used in --max-categories flag: each model slot contains a
+                # subset of categories and the predictions for all of them
+                # are combined in a global distribution to obtain the final
+                # prediction
+                prediction = combine_multivote(multivote,
+                                               other_label=other_label)
             else:
-                total_votes = votes
+                prediction = multivote.combine(method=method,
+                                               options=options, full=True)
 
-    if not single_model:
-        message = u.dated("Combining predictions.\n")
-        u.log_message(message, log_file=session_file, console=args.verbosity)
+            write_prediction(prediction, output, args.prediction_info,
+                             input_data, exclude)
+        if streaming and args.verbosity:
+            console_log("Predicted %s rows" % localize(
+                chunk_index * args.chunk_size + len(raw_input_data_list)),
+                        reset=True)
 
-    # combining the votes to issue the final prediction for each input data
-    for index, multivote in enumerate(total_votes):
-        multivote = total_votes[index]
-        input_data = raw_input_data_list[index]
 
-        if single_model:
-            # single model predictions need no combination
-            prediction = [multivote.predictions[0]['prediction'],
-                          multivote.predictions[0]['confidence']]
-        elif method == AGGREGATION:
-            # multi-labeled fields: predictions are concatenated
-            prediction = aggregate_multivote(
-                multivote, options, labels, models_per_label, ordered,
-                models_order, label_separator=args.label_separator)
-        elif method == COMBINATION:
-            # used in --max-categories flag: each model slot contains a
-            # subset of categories and the predictions for all of them
-            # are combined in a global distribution to obtain the final
-            # prediction
-            prediction = combine_multivote(multivote, other_label=other_label)
-        else:
-            prediction = multivote.combine(method=method, options=options,
-                                           full=True)
+def early_exit_predictable(fields, args):
+    """Checks whether the ensemble can be predicted with early exit by
+       `batch_ensemble_predict`, as `local_batch_predict` would do
 
-        write_prediction(prediction, output, args.prediction_info, input_data,
-                         exclude)
+    """
+    if not args.fast or args.multi_label or args.max_categories > 0 or \
+            args.method not in EARLY_EXIT_METHODS or \
+            args.missing_strategy != LAST_PREDICTION:
+        return False
+    try:
+        return fields.fields[fields.field_id(fields.objective_field)][
+            "optype"] == "categorical"
+    except (AttributeError, KeyError, ValueError):
+        return False
 
 
 def predict(models, fields, args, api=None, log=None,
@@ -605,11 +910,42 @@ def predict(models, fields, args, api=None, log=None,
 
     prediction_file = output
     output_path = u.check_dir(output)
-    with UnicodeWriter(output) as output:
+    remote_individual = args.remote and args.no_batch and not args.multi_label
+    early_exit = getattr(args, "early_exit", False) and len(models) > 1
+    if early_exit and not early_exit_predictable(fields, args):
+        early_exit = False
+        message = u.dated("WARNING: the --early-exit option is only"
+                          " available for classification ensembles"
+                          " predicted with --fast, the last prediction"
+                          " missing strategy and plurality or confidence"
+                          " weighted combinations. Ignoring it.\n")
+        u.log_message(message, log_file=session_file,
+                      console=args.verbosity)
+    # ensembles predicted with early exit are compacted as in
+    # local_batch_predict
+    local_models = (len(models) <= args.max_batch_models and args.fast
+                    and not args.multi_label and args.max_categories == 0
+                    and args.method != COMBINATION and not early_exit)
+    local_individual = local_models or args.boosting
+    # the output files that are written row by row keep a journal of the
+    # committed rows, so that they can be resumed after an interruption
+    journal = (args.ensemble is not None or len(models) == 1) if \
+        remote_individual else local_individual
+    with output_writer(output, args, journal=journal,
+                       resume=resume) as output:
+        # test rows whose predictions were written in a previous run
+        output_rows = output.resumed_lines
+        if output_rows and args.prediction_header:
+            output_rows -= 1
         # columns to exclude if input_data is added to the prediction field
         exclude = use_prediction_headers(
-            args.prediction_header, output, test_reader, fields, args,
-            objective_field)
+            args.prediction_header and not output.resumed_lines, output,
+            test_reader, fields, args, objective_field)
+        if output_rows:
+            message = u.dated("Resuming predictions from row %s.\n" %
+                              (output_rows + 1))
+            u.log_message(message, log_file=session_file,
+                          console=args.verbosity)
 
         # Remote predictions: predictions are computed in bigml.com and stored
         # in a file named after the model in the following syntax:
@@ -617,8 +953,9 @@ def predict(models, fields, args, api=None, log=None,
         # For instance,
         #     model_50c0de043b563519830001c2_predictions.csv
         # Predictions are computed individually only if no_batch flag is set
-        if args.remote and args.no_batch and not args.multi_label:
+        if remote_individual:
             if args.ensemble is not None:
+                test_reader.skip(output_rows)
                 remote_predict_ensemble(args.ensemble, test_reader,
                                         prediction_file, api, args, resume,
                                         output_path, session_file, log,
@@ -626,7 +963,8 @@ def predict(models, fields, args, api=None, log=None,
             else:
                 remote_predict_models(models, test_reader, prediction_file,
                                       api, args, resume, output_path,
-                                      session_file, log, exclude, output)
+                                      session_file, log, exclude, output,
+                                      output_rows=output_rows)
             return
         # Local predictions: Predictions are computed locally using models'
         # rules with MultiModel's predict method
@@ -649,14 +987,14 @@ def predict(models, fields, args, api=None, log=None,
         # For a model we build a Model and for a small number of models,
         # we build a MultiModel using all of
         # the given models and issue a combined prediction
-        if (len(models) <= args.max_batch_models \
-                and args.fast and \
-                not args.multi_label and args.max_categories == 0 \
-                and args.method != COMBINATION):
-            local_predict(models, test_reader, output, args, options, exclude)
+        if local_individual:
+            test_reader.skip(output_rows)
+        if local_models:
+            local_predict(models, test_reader, output, args, options, exclude,
+                          session_file=session_file)
         elif args.boosting:
             local_predict(args.ensemble, test_reader, output, args,
-                          options, exclude)
+                          options, exclude, session_file=session_file)
         # For large numbers of models, we split the list of models in chunks
         # and build a MultiModel for each chunk, issue and store predictions
         # for each model and combine all of them eventually.
@@ -689,7 +1027,8 @@ def predict(models, fields, args, api=None, log=None,
                                 ordered=ordered, exclude=exclude,
                                 models_per_label=models_per_label,
                                 other_label=other_label,
-                                multi_label_data=multi_label_data)
+                                multi_label_data=multi_label_data,
+                                early_exit=early_exit)
     test_reader.close()
 
 
@@ -727,7 +727,7 @@ def get_output_args(api, command_args, resume):
     try:
         # Parses timeseries/ids if provided.
         if command_args.time_series_set:
-            time_series_ids = u.read_resources(command_args.time_series)
+            time_series_ids = u.read_resources(command_args.time_series_set)
         command_args.time_series_ids_ = time_series_ids
     except AttributeError:
         pass
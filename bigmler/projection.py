@@ -24,12 +24,15 @@ import sys
 import bigml.api
 
 from bigml.pca import PCA
-from bigml.io import UnicodeWriter
 
 import bigmler.utils as u
 import bigmler.checkpoint as c
 
 from bigmler.tst_reader import TstReader as TestReader
+from bigmler.output_writer import output_writer, array_writer, project_row
+from bigmler.local_cache import local_predictor
+from bigmler.parallel import chunks
+from bigmler.batch_pca import BatchPCA
 from bigmler.resourcesapi.batch_projections import create_batch_projection
 
 
@@ -95,10 +98,7 @@ def write_projection(projection_value, output=sys.stdout,
     # input data is added if --projection-fields is used
     if input_data is None:
         input_data = []
-    row = input_data
-    if exclude and input_data:
-        for index in exclude:
-            del row[index]
+    row = project_row(input_data, exclude)
     row.extend(projection_value)
     try:
         output.writerow(row)
@@ -113,7 +113,7 @@ def _local_pca(pca, args):
     """Create the local PCA object
 
     """
-    local_pca = PCA(pca, api=args.retrieve_api_)
+    local_pca = local_predictor(PCA, pca, args)
     kwargs = {}
     if args.max_components:
         kwargs.update({"max_components": args.max_components})
@@ -127,15 +127,29 @@ def local_projection(local_pca, kwargs, test_reader, output, args,
     """Get local pca and issue projection
 
     """
-    for input_data in test_reader:
-        input_data_dict = test_reader.dict(input_data, filtering=False)
-        projection_info = local_pca.projection(
-            input_data_dict, **kwargs)
-        write_projection( \
-            projection_info,
-            output,
-            input_data if args.projection_fields is not None else None,
-            exclude)
+    # the input matrix is built and projected for chunks of rows at once
+    batch_pca = BatchPCA(local_pca, **kwargs)
+    for chunk in chunks(test_reader, args.chunk_size):
+        projections = batch_pca.projections(
+            [test_reader.dict(input_data, filtering=False)
+             for input_data in chunk])
+        for input_data, projection_info in zip(chunk, projections):
+            write_projection( \
+                projection_info,
+                output,
+                input_data if args.projection_fields is not None else None,
+                exclude)
+
+
+def array_projection(local_pca, kwargs, test_reader, output, args):
+    """Get local pca and write the projections as a binary array
+
+    """
+    batch_pca = BatchPCA(local_pca, **kwargs)
+    for chunk in chunks(test_reader, args.chunk_size):
+        output.writerows(batch_pca.projections(
+            [test_reader.dict(input_data, filtering=False)
+             for input_data in chunk]))
 
 
 def projection(pca, fields, args, session_file=None):
@@ -148,7 +162,20 @@ def projection(pca, fields, args, session_file=None):
     output = args.projections
     test_reader = TestReader(test_set, test_set_header, fields, None,
                              test_separator=args.test_separator)
-    with UnicodeWriter(output, lineterminator="\n") as output:
+    projections_format = getattr(args, "projections_format", "csv")
+    if projections_format != "csv":
+        # only the components are stored in binary arrays
+        local_pca, kwargs = _local_pca(pca, args)
+        columns = len(local_pca.projection({}, **kwargs))
+        with array_writer(output, args, columns,
+                          projections_format) as output:
+            message = u.dated("Creating local projections.\n")
+            u.log_message(message, log_file=session_file,
+                          console=args.verbosity)
+            array_projection(local_pca, kwargs, test_reader, output, args)
+        test_reader.close()
+        return
+    with output_writer(output, args, lineterminator="\n") as output:
         local_pca, kwargs = _local_pca(pca, args)
         pca_headers = ["PC%s" % (i + 1) for i in \
             range(0, len(local_pca.projection({})))]
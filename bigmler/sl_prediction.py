@@ -21,17 +21,24 @@
 
 import sys
 
+from functools import partial
+
 import bigml.api
 
 from bigml.supervised import SupervisedModel
 from bigml.fusion import Fusion
-from bigml.io import UnicodeWriter
 
 import bigmler.utils as u
 import bigmler.checkpoint as c
 
 from bigmler.processing.args import has_value
 from bigmler.tst_reader import TstReader as TestReader
+from bigmler.output_writer import output_writer, project_row
+from bigmler.local_cache import local_predictor, cached_local, \
+    DEFAULT_CACHE_SIZE
+from bigmler.memoize import build_memo, memoized_map, memoized_pairs
+from bigmler.parallel import pool_predict, chunks
+from bigmler.batch_fusion import BatchFusion, batch_fusion_predictable
 from bigmler.resourcesapi.common import NORMAL_FORMAT, FULL_FORMAT
 from bigmler.resourcesapi.batch_predictions import create_batch_prediction
 from bigmler.prediction import use_prediction_headers
@@ -55,10 +62,7 @@ def write_prediction(prediction_dict, output=sys.stdout,
     if prediction_info != NORMAL_FORMAT:
         if input_data is None:
             input_data = []
-        row = input_data
-        if exclude:
-            for index in exclude:
-                del row[index]
+        row = project_row(input_data, exclude)
     row.append(prediction_dict.get('prediction'))
     if 'probability' in prediction_dict and \
             prediction_info in [NORMAL_FORMAT, FULL_FORMAT]:
@@ -72,27 +76,76 @@ def write_prediction(prediction_dict, output=sys.stdout,
             raise AttributeError("You should provide a writeable object")
 
 
+def build_batch_fusion(fusion, api=None, cache_dir=None,
+                       max_size=DEFAULT_CACHE_SIZE):
+    """BatchFusion for the local Fusion, loaded from the local cache if
+       available
+
+    """
+    return BatchFusion(cached_local(Fusion, fusion, api=api,
+                                    cache_dir=cache_dir, max_size=max_size),
+                       cache_dir=cache_dir, max_size=max_size)
+
+
+def batch_fusion_predict(batch_fusion, rows, adapter=None):
+    """Predicts the test rows with the BatchFusion
+
+    """
+    return batch_fusion.predict([adapter(input_data) for input_data in rows])
+
+
 def local_prediction(models, test_reader, output, args,
-                     exclude=None):
+                     exclude=None, session_file=None):
     """Get local model and issue prediction
 
     """
     # Only one model at present
     try:
         bigml.api.get_fusion_id(models[0])
-        local_model = Fusion(models[0], api=args.retrieve_api_)
+        local_model = local_predictor(Fusion, models[0], args)
     except ValueError:
-        local_model = SupervisedModel(models[0],
-                                      api=args.retrieve_api_)
+        local_model = local_predictor(SupervisedModel, models[0], args)
     kwargs = {"full": True}
     if has_value(args, "operating_point_"):
         kwargs.update({"operating_point": args.operating_point_})
-    for input_data in test_reader:
-        input_data_dict = test_reader.dict(input_data, filtering=False)
-        prediction_info = local_model.predict(
-            input_data_dict, **kwargs)
-        write_prediction(prediction_info, output,
+
+    memo = build_memo(args)
+    if batch_fusion_predictable(local_model,
+                                operating_point=kwargs.get("operating_point")):
+        # the components of the fusion are built once and evaluate chunks
+        # of rows
+        model_builder = partial(build_batch_fusion, models[0],
+                                api=args.retrieve_api_,
+                                cache_dir=getattr(args, "local_cache", None),
+                                max_size=getattr(args, "local_cache_size",
+                                                 DEFAULT_CACHE_SIZE))
+        predict_fn = partial(batch_fusion_predict,
+                             adapter=test_reader.adapter(filtering=False))
+        if args.jobs > 1:
+            predict_pairs = partial(pool_predict, model_builder, predict_fn,
+                                    jobs=args.jobs,
+                                    chunk_size=args.chunk_size)
+        else:
+            batch_fusion = BatchFusion(
+                local_model, cache_dir=getattr(args, "local_cache", None),
+                max_size=getattr(args, "local_cache_size",
+                                 DEFAULT_CACHE_SIZE))
+
+            def predict_pairs(rows):
+                for chunk in chunks(rows, args.chunk_size):
+                    yield from zip(chunk, predict_fn(batch_fusion, chunk))
+        infos = memoized_pairs(predict_pairs, test_reader, memo)
+    else:
+        def prediction_info(input_data):
+            input_data_dict = test_reader.dict(input_data, filtering=False)
+            return local_model.predict(input_data_dict, **kwargs)
+
+        infos = memoized_map(prediction_info, test_reader, memo)
+    for input_data, info in infos:
+        write_prediction(info, output,
                          args.prediction_info, input_data, exclude)
+    if memo is not None:
+        memo.log(session_file=session_file, console=args.verbosity)
 
 
 def prediction(models, fields, args, session_file=None):
@@ -106,7 +159,7 @@ def prediction(models, fields, args, session_file=None):
     test_reader = TestReader(test_set, test_set_header, fields,
                              None,
                              test_separator=args.test_separator)
-    with UnicodeWriter(output, lineterminator="\n") as output:
+    with output_writer(output, args, lineterminator="\n") as output:
         # columns to exclude if input_data is added to the prediction field
         exclude = use_prediction_headers(
             args.prediction_header, output, test_reader, fields, args,
@@ -116,7 +169,8 @@ def prediction(models, fields, args, session_file=None):
         message = u.dated("Creating local predictions.\n")
         u.log_message(message, log_file=session_file, console=args.verbosity)
         local_prediction(models, test_reader,
-                         output, args, exclude=exclude)
+                         output, args, exclude=exclude,
+                         session_file=session_file)
     test_reader.close()
 
 
@@ -17,13 +17,14 @@
 
 
 import os
+import csv
 import json
 
 from bigml.api import check_resource
 
 from bigmler.utils import storage_file_name
 from bigmler.tests.common_steps import shell_execute, check_rows_equal
-from bigmler.tests.world import world, res_filename, ok_, eq_
+from bigmler.tests.world import world, res_filename, ok_, eq_, approx_
 
 
 def i_create_all_anomaly_resources_without_test_split(
@@ -142,6 +143,20 @@ def i_create_anomaly_resources_from_anomaly_detector(
     shell_execute(command, output, test=test)
 
 
+def i_create_anomaly_scores_with_options(
+    step, test=None, output=None, options=''):
+    """Step: I create BigML resources using anomaly detector to find anomaly
+    scores for <test> with options <options> and log predictions in <output>
+    """
+    ok_(test is not None and output is not None)
+    test = res_filename(test)
+    command = ("bigmler anomaly --anomaly " + world.anomaly['resource'] +
+               " --test " + test +
+               " --store --prediction-header --output " + output + " " +
+               options.replace("'", "\""))
+    shell_execute(command, output, test=test, options=options)
+
+
 def i_create_anomaly_resources_from_anomaly_file(
     step, anomaly_file=None, test=None, output=None):
     """Step: I create BigML resources using anomaly detector in file
@@ -201,6 +216,29 @@ def i_check_anomaly_scores(step, check_file):
     ok_(message is None, msg=message)
 
 
+def i_check_top_anomaly_scores(step, test=None, check_file=None,
+                               top_scores=None):
+    """Step: the local anomaly scores file has the <top_scores> rows of
+    <test> with the highest scores in <check_file>, from highest to lowest
+    """
+    ok_(test is not None and check_file is not None and
+        top_scores is not None)
+    with open(res_filename(test)) as test_handler:
+        test_rows = list(csv.reader(test_handler))[1:]
+    with open(res_filename(check_file)) as check_handler:
+        scores = [float(row[0]) for row in
+                  list(csv.reader(check_handler))[1:]]
+    # the sort is stable, so rows with equal scores keep the file order
+    expected = sorted(zip(test_rows, scores),
+                      key=lambda pair: pair[1], reverse=True)[:top_scores]
+    with open(world.output) as output_handler:
+        output_rows = list(csv.reader(output_handler))[1:]
+    eq_(len(output_rows), len(expected))
+    for output_row, (test_row, score) in zip(output_rows, expected):
+        eq_(output_row[:-1], test_row)
+        approx_(float(output_row[-1]), score)
+
+
 def i_check_anomaly_has_id_fields(step, id_fields=None):
     """Checking that the anomaly detector has the correct id fields"""
     ok_(id_fields is not None)
@@ -18,12 +18,16 @@
 
 
 import os
+import csv
+import json
 
 
 from bigml.api import check_resource
+from bigml.association import Association, DEFAULT_K
+from bigml.util import cast
 
 from bigmler.tests.common_steps import shell_execute
-from bigmler.tests.world import world, res_filename, ok_
+from bigmler.tests.world import world, res_filename, ok_, eq_
 
 def i_create_association(step, data=None, output_dir=None):
     """Step: I create BigML association uploading train <data> file and log
@@ -69,3 +73,40 @@ def i_create_association_from_source(step, output_dir=None):
                world.source['resource'] +
                " --store --output-dir " + output_dir)
     shell_execute(command, os.path.join(output_dir, "x.tmp"))
+
+
+def i_create_association_sets_from_dataset(step, test=None, output=None,
+                                           options=''):
+    """Step: I create BigML association using dataset to test <test> with
+    options <options> and log association sets in <output>
+    """
+    ok_(test is not None and output is not None)
+    test = res_filename(test)
+    command = ("bigmler association --dataset " +
+               world.dataset['resource'] + " --test " + test +
+               " --store --output " + output + " " +
+               options.replace("'", "\""))
+    shell_execute(command, output, test=test, options=options)
+
+
+def i_check_association_sets(step, test=None, k=None, score_by=None):
+    """Step: the local association sets file is like the association sets
+    of the local Association for <test> with <k> items scored by
+    <score_by>
+    """
+    ok_(test is not None)
+    local_association = Association(world.association)
+    with open(res_filename(test)) as test_handler:
+        rows = list(csv.DictReader(test_handler))
+    with open(world.output) as sets_handler:
+        association_sets = [row[0] for row in csv.reader(sets_handler)]
+    eq_(len(association_sets), len(rows))
+    for index, input_data in enumerate(rows):
+        norm_input_data = local_association.filter_input_data(input_data)
+        cast(norm_input_data, local_association.fields)
+        expected = local_association.association_set(
+            norm_input_data, k=(DEFAULT_K if k is None else int(k)),
+            score_by=score_by)
+        eq_(json.loads(association_sets[index]),
+            json.loads(json.dumps(expected)),
+            msg="Row %s doesn't match" % index)
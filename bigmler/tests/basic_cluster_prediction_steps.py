@@ -141,6 +141,20 @@ def i_create_cluster_resources_from_cluster(step, test=None, output=None):
     shell_execute(command, output, test=test)
 
 
+def i_create_cluster_resources_from_cluster_with_options(
+    step, test=None, output=None, options=''):
+    """Step: I create BigML resources using cluster to find centroids for
+    <test> and log predictions in <output> with options <options>
+    """
+    ok_(test is not None and output is not None)
+    test = res_filename(test)
+    command = ("bigmler cluster --cluster " +
+               world.cluster['resource'] + " --test " + test + " --k 8" +
+               " --store --output " + output + " " +
+               options.replace("'", "\""))
+    shell_execute(command, output, test=test, options=options)
+
+
 def i_create_cluster_resources_from_clusters_file(
     step, clusters_file=None, test=None, output=None):
     """Step: I create BigML resources using clusters in file <cluster_file> to
@@ -101,6 +101,20 @@ def i_create_dn_resources_from_model(step, test=None, output=None):
     shell_execute(command, output, test=test)
 
 
+def i_create_dn_resources_from_model_with_options(step, test=None,
+                                                  output=None, options=''):
+    """Step: I create BigML resources using model to test <test> and log
+    predictions in <output> with prediction options <options>
+    """
+    ok_(test is not None and output is not None)
+    test = res_filename(test)
+    command = ("bigmler deepnet --deepnet " +
+               world.deepnet['resource'] + " --test " +
+               test + " --store --output " + output + " " +
+               options.replace("'", "\""))
+    shell_execute(command, output, test=test, options=options)
+
+
 def i_create_dn_resources_from_model_remote(step, test=None, output=None):
     """Step: I create BigML resources using model to test <test> as batch
     prediction and log predictions in <output>
@@ -43,6 +43,22 @@ def i_create_fs_resources_from_model(step, test=None, output=None):
     shell_execute(command, output, test=test)
 
 
+def i_create_fs_resources_from_model_with_options(step, test=None,
+                                                  output=None, options=''):
+    """Step: I create BigML resources using model to test <test> and log
+    predictions in <output> with prediction options <options>
+    """
+    ok_(test is not None and output is not None)
+    test = res_filename(test)
+
+    models = [world.model["resource"], world.deepnet["resource"]]
+    command = ("bigmler fusion --fusion-models " +
+               ",".join(models) + " --test \"" +
+               test + "\" --store --output " +
+               output + " " + options.replace("'", "\""))
+    shell_execute(command, output, test=test, options=options)
+
+
 def i_create_fs_resources_from_model_remote(step, test=None, output=None):
     """Step: I create BigML resources using model to test <test> as batch
     prediction and log predictions in <output>
@@ -106,6 +122,20 @@ def i_check_create_fusion(step):
     ok_(message is None, msg=message)
 
 
+def i_check_cached_components(step, cache_dir=None):
+    """Step: I check that the fusion components are stored in the local
+    cache <cache_dir>
+    """
+    ok_(cache_dir is not None)
+    components = world.fusion["object"]["models"]
+    cached_files = [name for name in os.listdir(cache_dir)
+                    if name.startswith("supervisedmodel_") and
+                    name.endswith(".pkl")]
+    ok_(len(cached_files) >= len(components),
+        msg="%s cached components found for %s models" %
+        (len(cached_files), len(components)))
+
+
 def setup_for_fusion(step, train=None, output_dir=None):
     """Creating models needed for a fusion"""
     train = res_filename(train)
@@ -17,11 +17,14 @@
 
 
 import os
+import csv
+
+import numpy as np
 
 from bigml.api import check_resource
 
 from bigmler.tests.common_steps import shell_execute
-from bigmler.tests.world import world, res_filename, ok_
+from bigmler.tests.world import world, res_filename, ok_, eq_, approx_
 
 
 def i_create_all_pca_resources_with_no_headers(step, data=None, test=None, output=None):
@@ -87,6 +90,41 @@ def i_create_pca_resources_from_model(step, test=None, output=None):
     shell_execute(command, output, test=test)
 
 
+def i_create_pca_resources_from_model_with_options(step, test=None,
+                                                   output=None, options=''):
+    """Step: I create BigML resources using model to test <test> and log
+    projections in <output> with options <options>
+    """
+    ok_(test is not None and output is not None)
+    test = res_filename(test)
+    command = ("bigmler pca --pca " +
+               world.pca['resource'] + " --test " +
+               test + " --store --output " + output + " " +
+               options.replace("'", "\""))
+    shell_execute(command, output, test=test, options=options)
+
+
+def i_check_binary_projections(step, check_file, projections_format):
+    """Step: the local projections array in <projections_format> format is
+    like <check_file>
+    """
+    with open(res_filename(check_file)) as check_handler:
+        expected = [[float(value) for value in row] for row in
+                    csv.reader(check_handler)]
+    base_name = os.path.splitext(world.output)[0]
+    if projections_format == "npy":
+        projections = np.load("%s.npy" % base_name)
+    else:
+        projections = np.fromfile("%s.f32" % base_name, dtype="<f4").reshape(
+            -1, len(expected[0]))
+    eq_(projections.shape, (len(expected), len(expected[0])))
+    for index, row in enumerate(projections.tolist()):
+        for value, expected_value in zip(row, expected[index]):
+            approx_(value, expected_value,
+                    msg="Row %s doesn't match. Found %s, %s expected" % (
+                        index, value, expected_value))
+
+
 def i_create_pca_resources_from_model_remote(step, test=None, output=None):
     """Step: I create BigML PCA resources using model to test <test> as batch
     prediction and log predictions in <output>
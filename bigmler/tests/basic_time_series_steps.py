@@ -60,6 +60,35 @@ def i_create_all_ts_resources_to_evaluate(step, data=None, output=None):
     shell_execute(command, output)
 
 
+def i_create_ts_forecasts_from_time_series_set(step, directory=None,
+                                               output=None, options=''):
+    """Step: I create a new time series from the dataset in <directory> and
+    forecast the time series set with options <options> and log forecasts
+    in <output>
+    """
+    ok_(directory is not None and output is not None)
+    with open(os.path.join(directory, "dataset")) as handler:
+        dataset_id = handler.readline().strip()
+    with open(os.path.join(directory, "time_series")) as handler:
+        time_series_ids = [handler.readline().strip()]
+    ts_ = world.api.create_time_series(dataset_id)
+    ts_ = check_resource(ts_['resource'], world.api.get_time_series)
+    world.time_series_set.append(ts_['resource'])
+    world.time_series = ts_
+    time_series_ids.append(ts_['resource'])
+    output_dir = os.path.dirname(output)
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    world.time_series_ids = time_series_ids
+    time_series_file = os.path.join(output_dir, "time_series_set")
+    with open(time_series_file, "w") as handler:
+        handler.write("\n".join(time_series_ids))
+    command = ("bigmler time-series --time-series-set " + time_series_file +
+               " --store --output " + output + " " +
+               options.replace("'", "\""))
+    shell_execute(command, output, options=options)
+
+
 def i_check_create_time_series(step):
     """Step: I check that the time series has been created"""
     ts_file = os.path.join(world.directory, "time_series")
@@ -91,3 +120,24 @@ def i_check_forecasts(step, check_file):
         shutil.copyfile(forecasts_file_path, "%s.new" % check_file_path)
         message = traceback.format_exc()
     ok_(message is None, msg=message)
+
+
+def i_check_bulk_forecasts(step, check_file):
+    """Step: the local forecasts file of each time series is like
+    <check_file>
+    """
+    check_file_path = res_filename(check_file)
+    message = None
+    #pylint: disable=locally-disabled,import-outside-toplevel
+    for time_series_id in world.time_series_ids:
+        forecasts_file_path = "%s_%s_%s.csv" % \
+            (world.output, time_series_id.replace("/", "_"),
+             world.time_series["object"]["objective_field"])
+        try:
+            message = check_rows_equal(forecasts_file_path,
+                check_file_path)
+        except Exception:
+            import traceback
+            shutil.copyfile(forecasts_file_path, "%s.new" % check_file_path)
+            message = traceback.format_exc()
+        ok_(message is None, msg=message)
@@ -17,6 +17,7 @@
 
 
 import os
+import csv
 import time
 import json
 import shutil
@@ -27,7 +28,7 @@ from subprocess import check_call, CalledProcessError
 from bigml.api import check_resource
 
 from bigmler.processing.models import MONTECARLO_FACTOR
-from bigmler.checkpoint import file_number_of_lines
+from bigmler.checkpoint import file_number_of_lines, write_journal
 from bigmler.utils import storage_file_name, open_mode
 from bigmler.tests.world import world, res_filename, ok_, eq_
 from bigmler.tests.ml_tst_prediction_steps import \
@@ -530,6 +531,42 @@ def i_create_resources_from_model(step, test=None, output=None):
     shell_execute(command, output, test=test)
 
 
+def i_create_resources_from_model_with_options(step, test=None, output=None,
+                                               options=''):
+    """Step: I create BigML resources using model to test <test> and
+    log predictions in <output> with prediction options <options>
+    """
+    ok_(test is not None and output is not None)
+    test = res_filename(test)
+    command = ("bigmler --model " + world.model['resource'] + " --test " +
+               test + " --store --output " + output + " " +
+               options.replace("'", "\""))
+    shell_execute(command, output, test=test, options=options)
+
+
+def i_interrupt_predictions(step, lines=None):
+    """Step: I keep the first <lines> predictions committed in the journal
+    and a partial row after them
+    """
+    ok_(lines is not None)
+    with open(world.output, "rb") as handler:
+        rows = handler.readlines()
+    committed = b"".join(rows[:int(lines)])
+    next_row = rows[int(lines)]
+    # the interrupted run could have written part of the next row
+    with open(world.output, "wb") as handler:
+        handler.write(committed)
+        handler.write(next_row[:len(next_row) // 2])
+    write_journal(world.output, int(lines), len(committed))
+
+
+def i_resume_predictions(step, test=None):
+    """Step: I resume the last command to test <test>"""
+    ok_(test is not None)
+    shell_execute("bigmler --resume", world.output, test=res_filename(test),
+                  project=False)
+
+
 def i_create_resources_from_model_with_op(step, operating_point=None,
                                           test=None, output=None):
     """Step: I create BigML resources using model with operating point
@@ -638,6 +675,23 @@ def i_create_resources_from_local_ensemble(step, number_of_models=None,
     ok_(message is None, msg=message)
 
 
+def i_create_resources_from_ensemble_with_options(step, directory=None,
+                                                  test=None, output=None,
+                                                  options=''):
+    """Step: I create BigML resources using the ensemble in <directory> to
+    test <test> and log predictions in <output> with prediction options
+    <options>
+    """
+    ok_(directory is not None and test is not None and output is not None)
+    with open(os.path.join(directory, "ensembles")) as ensemble_file:
+        ensemble_id = ensemble_file.read().strip()
+    test = res_filename(test)
+    command = ("bigmler --ensemble " + ensemble_id + " --test " + test +
+               " --store --output " + output + " " +
+               options.replace("'", "\""))
+    shell_execute(command, output, test=test, options=options)
+
+
 def i_create_resources_from_local_ensemble_with_op(
         step, number_of_models=None,
         directory=None, test=None,
@@ -711,6 +765,22 @@ def i_create_resources_from_boosted_ensemble(
     shell_execute(command, output, test=test)
 
 
+def i_create_resources_from_boosted_ensemble_with_options(
+    step, iterations=None, test=None, output=None, options=''):
+    """Step: I create BigML resources using boosted ensemble in
+    <iterations> iterations to test <test> and log predictions in <output>
+    with prediction options <options>
+    """
+    ok_(iterations is not None and test is not None and
+        output is not None)
+    test = res_filename(test)
+    command = ("bigmler --dataset " + world.dataset['resource'] +
+               " --test " + test + " --boosting-iterations " +
+               str(iterations) + " --tag my_ensemble --store" +
+               " --output " + output + " " + options.replace("'", "\""))
+    shell_execute(command, output, test=test, options=options)
+
+
 def i_create_resources_remotely_from_boosted_ensemble(
     step, iterations=None, test=None, output=None):
     """Step: I create BigML resources using boosted ensemble in <iterations>
@@ -1367,6 +1437,18 @@ def i_check_predictions(step, check_file, headers=False):
     ok_(message is None, msg=message)
 
 
+def i_check_predicted_classes(step, check_file):
+    """Step: the predicted classes in the local prediction file are like
+    <check_file>
+    """
+    check_file_path = res_filename(check_file)
+    with open(world.output) as predictions_handler:
+        predictions = [row[0] for row in csv.reader(predictions_handler)]
+    with open(check_file_path) as check_handler:
+        expected = [row[0] for row in csv.reader(check_handler)]
+    eq_(predictions, expected)
+
+
 def i_check_projections(step, check_file):
     """Checking that projections have been created"""
     i_check_predictions(step, check_file)
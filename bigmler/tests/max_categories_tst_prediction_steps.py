@@ -96,6 +96,20 @@ def i_create_all_mc_resources_from_models(
     shell_execute(command, output, test=test)
 
 
+def i_create_all_mc_resources_from_models_with_options(
+    step, models_file=None, test=None, output=None, options=''):
+    """Step: I create BigML resources using models in file <models_file> to
+    test <test> and log predictions with combine method in <output> with
+    prediction options <options>
+    """
+    ok_(models_file is not None and test is not None and output is not None)
+    test = res_filename(test)
+    command = ("bigmler --models " + models_file +
+               " --method combined --test " + test + " --store --output "
+               + output + " " + options.replace("'", "\""))
+    shell_execute(command, output, test=test, options=options)
+
+
 def i_check_create_max_categories_datasets(step):
     """Step: I check that the max_categories datasets have been created"""
     dataset_file = os.path.join(world.directory, "dataset_parts")
@@ -80,6 +80,20 @@ def i_predict_ml_from_model_tag(step, tag=None, test=None, output=None):
     shell_execute(command, output, test=test)
 
 
+def i_predict_ml_from_models_file_with_options(
+    step, models_file=None, test=None, output=None, options=''):
+    """Step: I create BigML multi-label resources using models in file
+    <models_file> to test <test> and log predictions in <output> with
+    prediction options <options>
+    """
+    ok_(models_file is not None and test is not None and output is not None)
+    test = res_filename(test)
+    command = ("bigmler --multi-label --models " + models_file +
+               " --test " + test + " --store --output " + output + " " +
+               options.replace("'", "\""))
+    shell_execute(command, output, test=test, options=options)
+
+
 def i_predict_ml_from_model_tag_with_labels_with_objective(
     step, labels=None, objective=None, tag=None, test=None, output=None):
     """Step: I create BigML multi-label resources with labels <labels>
@@ -960,3 +960,298 @@ class TestPrediction:
             test_pred.i_check_create_model(self)
             test_pred.i_check_first_node_children(
                 self, example["children"], example["objective"])
+
+    def test_scenario29(self):
+        """
+        Scenario: Successfully building test predictions from start using several processes:
+            Given I create BigML resources uploading train "<data>" file to test "<test>" and log predictions in "<output>" with prediction options "<options>"
+            And I check that the source has been created
+            And I check that the dataset has been created
+            And I check that the model has been created
+            And I check that the predictions are ready
+            Then the local prediction file is like "<predictions_file>"
+        """
+        headers = ["data", "test", "output", "options", "predictions_file"]
+        examples = [
+            ['data/iris.csv', 'data/test_iris.csv',
+             'scenario29/predictions.csv', '--jobs 2 --chunk-size 7',
+             'check_files/predictions_iris.csv']]
+        show_doc(self.test_scenario29, examples)
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            test_pred.i_create_all_resources_with_options(
+                self, data=example["data"], test=example["test"],
+                output=example["output"], options=example["options"])
+            test_pred.i_check_create_source(self)
+            test_pred.i_check_create_dataset(self, suffix=None)
+            test_pred.i_check_create_model(self)
+            test_pred.i_check_create_predictions(self)
+            test_pred.i_check_predictions(self, example["predictions_file"])
+
+    def test_scenario30(self):
+        """
+        Scenario: Successfully building test predictions from model in chunks of rows
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            And I create BigML resources using model to test "<test>" and log predictions in "<output>" with prediction options "<options>"
+            And I check that the predictions are ready
+            Then the local prediction file is like "<predictions_file>"
+        """
+        headers = ["scenario", "kwargs", "test", "output", "options",
+                   "predictions_file"]
+        examples = [
+            ['scenario1', '{"data": "data/iris.csv",' +
+             ' "output": "scenario1/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}', 'data/test_iris.csv',
+             'scenario30/predictions.csv', '--chunk-size 7',
+             'check_files/predictions_iris.csv'],
+            ['scenario1_r', '{"data": "data/grades.csv",' +
+             ' "output": "scenario1_r/predictions.csv",' +
+             ' "test": "data/test_grades.csv"}', 'data/test_grades.csv',
+             'scenario30_r/predictions.csv', '--chunk-size 7',
+             'check_files/predictions_grades.csv']]
+        show_doc(self.test_scenario30, examples)
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario"], example["kwargs"])
+            test_pred.i_create_resources_from_model_with_options(
+                self, test=example["test"], output=example["output"],
+                options=example["options"])
+            test_pred.i_check_create_predictions(self)
+            test_pred.i_check_predictions(self, example["predictions_file"])
+
+    def test_scenario31(self):
+        """
+        Scenario: Successfully building streamed test predictions from ensemble
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            Given I have previously executed "<scenario2>" or reproduce it with arguments <kwargs2>
+            And I create BigML resources using the ensemble in "<scenario2>" to test "<test>" and log predictions in "<output>" with prediction options "<options>"
+            And I check that the predictions are ready
+            Then the local prediction file is like "<predictions_file>"
+        """
+        headers = ["scenario", "kwargs", "scenario2", "kwargs2", "test",
+                   "output", "options", "predictions_file"]
+        examples = [
+            ['scenario1', '{"data": "data/iris.csv",' +
+             ' "output": "scenario1/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}',
+             'scenario5', '{"number_of_models": 10,' +
+             ' "output": "scenario5/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}', 'data/test_iris.csv',
+             'scenario31/predictions.csv',
+             '--no-fast --streaming --chunk-size 7 --max-batch-models 4',
+             'check_files/predictions_iris.csv']]
+        show_doc(self.test_scenario31, examples)
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario"], example["kwargs"])
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario2"], example["kwargs2"])
+            test_pred.i_create_resources_from_ensemble_with_options(
+                self, directory=example["scenario2"], test=example["test"],
+                output=example["output"], options=example["options"])
+            test_pred.i_check_create_predictions(self)
+            test_pred.i_check_predictions(self, example["predictions_file"])
+
+    def test_scenario32(self):
+        """
+        Scenario: Successfully building test predictions from ensemble combining the votes in arrays
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            Given I have previously executed "<scenario2>" or reproduce it with arguments <kwargs2>
+            And I create BigML resources using the ensemble in "<scenario2>" to test "<test>" and log predictions in "<output>" with prediction options "<options>"
+            And I check that the predictions are ready
+            Then the local prediction file is like "<predictions_file>"
+        """
+        headers = ["scenario", "kwargs", "scenario2", "kwargs2", "test",
+                   "output", "options", "predictions_file"]
+        examples = [
+            ['scenario1', '{"data": "data/iris.csv",' +
+             ' "output": "scenario1/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}',
+             'scenario5', '{"number_of_models": 10,' +
+             ' "output": "scenario5/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}', 'data/test_iris.csv',
+             'scenario32/predictions.csv', '--no-fast --max-batch-models 4',
+             'check_files/predictions_iris.csv'],
+            ['scenario1', '{"data": "data/iris.csv",' +
+             ' "output": "scenario1/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}',
+             'scenario5', '{"number_of_models": 10,' +
+             ' "output": "scenario5/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}', 'data/test_iris.csv',
+             'scenario32_m/predictions.csv',
+             '--no-fast --max-batch-models 4 --memmap-votes',
+             'check_files/predictions_iris.csv']]
+        show_doc(self.test_scenario32, examples)
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario"], example["kwargs"])
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario2"], example["kwargs2"])
+            test_pred.i_create_resources_from_ensemble_with_options(
+                self, directory=example["scenario2"], test=example["test"],
+                output=example["output"], options=example["options"])
+            test_pred.i_check_create_predictions(self)
+            test_pred.i_check_predictions(self, example["predictions_file"])
+
+    def test_scenario33(self):
+        """
+        Scenario: Successfully building test predictions from compacted ensemble
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            Given I have previously executed "<scenario2>" or reproduce it with arguments <kwargs2>
+            And I create BigML resources using the ensemble in "<scenario2>" to test "<test>" and log predictions in "<output>" with prediction options "<options>"
+            And I check that the predictions are ready
+            Then the local prediction file is like "<predictions_file>"
+        """
+        headers = ["scenario", "kwargs", "scenario2", "kwargs2", "test",
+                   "output", "options", "predictions_file"]
+        examples = [
+            ['scenario1', '{"data": "data/iris.csv",' +
+             ' "output": "scenario1/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}',
+             'scenario5', '{"number_of_models": 10,' +
+             ' "output": "scenario5/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}', 'data/test_iris.csv',
+             'scenario33/predictions.csv',
+             '--chunk-size 7 --max-batch-models 4',
+             'check_files/predictions_iris.csv'],
+            ['scenario1', '{"data": "data/iris.csv",' +
+             ' "output": "scenario1/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}',
+             'scenario5', '{"number_of_models": 10,' +
+             ' "output": "scenario5/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}', 'data/test_iris.csv',
+             'scenario33_m/predictions.csv',
+             '--chunk-size 7 --max-batch-models 4 --memmap-votes',
+             'check_files/predictions_iris.csv']]
+        show_doc(self.test_scenario33, examples)
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario"], example["kwargs"])
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario2"], example["kwargs2"])
+            test_pred.i_create_resources_from_ensemble_with_options(
+                self, directory=example["scenario2"], test=example["test"],
+                output=example["output"], options=example["options"])
+            test_pred.i_check_create_predictions(self)
+            test_pred.i_check_predictions(self, example["predictions_file"])
+
+    def test_scenario34(self):
+        """
+        Scenario: Successfully building test predictions from ensemble with early exit
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            Given I have previously executed "<scenario2>" or reproduce it with arguments <kwargs2>
+            And I create BigML resources using the ensemble in "<scenario2>" to test "<test>" and log predictions in "<output>" with prediction options "<options>"
+            And I check that the predictions are ready
+            Then the predicted classes in the local prediction file are like "<predictions_file>"
+        """
+        headers = ["scenario", "kwargs", "scenario2", "kwargs2", "test",
+                   "output", "options", "predictions_file"]
+        examples = [
+            ['scenario1', '{"data": "data/iris.csv",' +
+             ' "output": "scenario1/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}',
+             'scenario5', '{"number_of_models": 10,' +
+             ' "output": "scenario5/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}', 'data/test_iris.csv',
+             'scenario34/predictions.csv', '--early-exit',
+             'check_files/predictions_iris.csv'],
+            ['scenario1', '{"data": "data/iris.csv",' +
+             ' "output": "scenario1/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}',
+             'scenario5', '{"number_of_models": 10,' +
+             ' "output": "scenario5/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}', 'data/test_iris.csv',
+             'scenario34_c/predictions.csv', '--early-exit --chunk-size 7',
+             'check_files/predictions_iris.csv']]
+        show_doc(self.test_scenario34, examples)
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario"], example["kwargs"])
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario2"], example["kwargs2"])
+            test_pred.i_create_resources_from_ensemble_with_options(
+                self, directory=example["scenario2"], test=example["test"],
+                output=example["output"], options=example["options"])
+            test_pred.i_check_create_predictions(self)
+            test_pred.i_check_predicted_classes(
+                self, example["predictions_file"])
+
+    def test_scenario35(self):
+        """
+        Scenario: Successfully building test predictions from boosted ensemble in chunks of rows
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            And I create BigML resources using boosted ensemble in <iterations> iterations to test "<test>" and log predictions in "<output>" with prediction options "<options>"
+            And I check that the ensemble has been created
+            And I check that the predictions are ready
+            Then the local prediction file is like "<predictions_file>"
+        """
+        headers = ["scenario", "kwargs", "iterations", "test", "output",
+                   "options", "predictions_file"]
+        examples = [
+            ['scenario1', '{"data": "data/iris.csv",' +
+             ' "output": "scenario1/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}', '10', 'data/test_iris.csv',
+             'scenario35/predictions.csv', '--chunk-size 7',
+             'check_files/predictions_iris_boost.csv']]
+        show_doc(self.test_scenario35, examples)
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario"], example["kwargs"])
+            test_pred.i_create_resources_from_boosted_ensemble_with_options(
+                self, iterations=example["iterations"], test=example["test"],
+                output=example["output"], options=example["options"])
+            test_pred.i_check_create_ensemble(self)
+            test_pred.i_check_create_predictions(self)
+            test_pred.i_check_predictions(self, example["predictions_file"])
+
+    def test_scenario36(self):
+        """
+        Scenario: Successfully resuming interrupted test predictions from model
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            And I create BigML resources using model to test "<test>" and log predictions in "<output>" with prediction options "<options>"
+            And I check that the predictions are ready
+            And I keep the first <lines> predictions committed in the journal and a partial row after them
+            And I resume the last command to test "<test>"
+            And I check that the predictions are ready
+            Then the local prediction file is like "<predictions_file>"
+        """
+        headers = ["scenario", "kwargs", "test", "output", "options",
+                   "lines", "predictions_file"]
+        examples = [
+            ['scenario1', '{"data": "data/iris.csv",' +
+             ' "output": "scenario1/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}', 'data/test_iris.csv',
+             'scenario36/predictions.csv', '', '10',
+             'check_files/predictions_iris.csv'],
+            ['scenario1', '{"data": "data/iris.csv",' +
+             ' "output": "scenario1/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}', 'data/test_iris.csv',
+             'scenario36_c/predictions.csv', '--chunk-size 7', '15',
+             'check_files/predictions_iris.csv']]
+        show_doc(self.test_scenario36, examples)
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario"], example["kwargs"])
+            test_pred.i_create_resources_from_model_with_options(
+                self, test=example["test"], output=example["output"],
+                options=example["options"])
+            test_pred.i_check_create_predictions(self)
+            test_pred.i_interrupt_predictions(self, lines=example["lines"])
+            test_pred.i_resume_predictions(self, test=example["test"])
+            test_pred.i_check_create_predictions(self)
+            test_pred.i_check_predictions(self, example["predictions_file"])
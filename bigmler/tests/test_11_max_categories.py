@@ -231,3 +231,39 @@ class TestMaxCategories:
             test_pred.i_check_create_models(self)
             test_pred.i_check_create_predictions(self)
             test_pred.i_check_predictions(self, example["predictions_file"])
+
+    def test_scenario6(self):
+        """
+        Scenario: Successfully building ensembles test predictions from models file with max categories and prediction options
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            And I create BigML resources using models in file "<models_file>" to test "<test>" and log predictions with combine method in "<output>" with prediction options "<options>"
+            And I check that the predictions are ready
+            Then the local prediction file is like "<predictions_file>"
+        """
+        print(self.test_scenario6.__doc__)
+        headers = ["scenario", "kwargs", "models_file", "test", "output",
+                   "options", "predictions_file"]
+        examples = [
+            ['scenario_mc_1', '{"data": "data/iris.csv",' +
+             ' "max_categories": "1", "objective": "species",' +
+             ' "output": "scenario_mc_1/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}', 'scenario_mc_1/models',
+             'data/test_iris.csv', 'scenario_mc_6/predictions.csv',
+             '--chunk-size 7', 'check_files/predictions_mc.csv'],
+            ['scenario_mc_1', '{"data": "data/iris.csv",' +
+             ' "max_categories": "1", "objective": "species",' +
+             ' "output": "scenario_mc_1/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}', 'scenario_mc_1/models',
+             'data/test_iris.csv', 'scenario_mc_6n/predictions.csv',
+             '--no-fast --max-batch-models 1',
+             'check_files/predictions_mc.csv']]
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario"], example["kwargs"])
+            max_cat.i_create_all_mc_resources_from_models_with_options(
+                self, models_file=example["models_file"], test=example["test"],
+                output=example["output"], options=example["options"])
+            test_pred.i_check_create_predictions(self)
+            test_pred.i_check_predictions(self, example["predictions_file"])
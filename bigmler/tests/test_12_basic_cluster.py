@@ -299,3 +299,37 @@ class TestCluster:
             test_pred.i_check_create_cluster(self)
             test_cluster.i_check_cluster_has_summary_fields(
                 self, example["summary_fields"])
+
+    def test_scenario10(self):
+        """
+        Scenario: Successfully building test predictions from cluster in chunks of rows
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            And I create BigML resources using cluster to find centroids for "<test>" and log predictions in "<output>" with options "<options>"
+            And I check that the centroids are ready
+            Then the local centroids file is like "<predictions_file>"
+        """
+        print(self.test_scenario10.__doc__)
+        headers = ["scenario", "kwargs", "test", "output", "options",
+                   "predictions_file"]
+        examples = [
+            ['scenario_c_1', '{"data": "data/diabetes.csv",' +
+             ' "output": "scenario_c_1/centroids.csv",' +
+             ' "test": "data/diabetes.csv"}', 'data/diabetes.csv',
+             'scenario_c_10/centroids.csv', '--chunk-size 7',
+             'check_files/centroids_diabetes.csv'],
+            ['scenario_c_1', '{"data": "data/diabetes.csv",' +
+             ' "output": "scenario_c_1/centroids.csv",' +
+             ' "test": "data/diabetes.csv"}', 'data/diabetes.csv',
+             'scenario_c_10i/centroids.csv',
+             '--chunk-size 7 --centroid-index 1',
+             'check_files/centroids_diabetes.csv']]
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario"], example["kwargs"])
+            test_cluster.i_create_cluster_resources_from_cluster_with_options(
+                self, test=example["test"], output=example["output"],
+                options=example["options"])
+            test_cluster.i_check_create_centroids(self)
+            test_pred.i_check_predictions(self, example["predictions_file"])
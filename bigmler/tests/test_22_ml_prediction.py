@@ -252,3 +252,42 @@ class TestML:
                 test=example["test"], output=example["output"])
             test_pred.i_check_create_predictions(self)
             test_pred.i_check_predictions(self, example["predictions_file"])
+
+    def test_scenario7(self):
+        """
+        Scenario: Successfully building test predictions from models file in several slots
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            And I create BigML multi-label resources using models in file "<models_file>" to test "<test>" and log predictions in "<output>" with prediction options "<options>"
+            And I check that the predictions are ready
+            Then the local prediction file is like "<predictions_file>"
+        """
+        print(self.test_scenario7.__doc__)
+        headers = ["scenario", "kwargs", "models_file", "test", "output",
+                   "options", "predictions_file"]
+        examples = [
+            ['scenario_ml_1', '{"tag": "my_multilabel_1",' +
+             ' "data": "data/multilabel.csv", "label_separator": ":",' +
+             ' "number_of_labels": 7, "training_separator": ",",' +
+             ' "output": "scenario_ml_1/predictions.csv",' +
+             ' "test": "data/test_multilabel.csv"}', 'scenario_ml_1/models',
+             'data/test_multilabel.csv', 'scenario_ml_8/predictions.csv',
+             '--max-batch-models 3', 'check_files/predictions_ml_comma.csv'],
+            ['scenario_ml_1', '{"tag": "my_multilabel_1",' +
+             ' "data": "data/multilabel.csv", "label_separator": ":",' +
+             ' "number_of_labels": 7, "training_separator": ",",' +
+             ' "output": "scenario_ml_1/predictions.csv",' +
+             ' "test": "data/test_multilabel.csv"}', 'scenario_ml_1/models',
+             'data/test_multilabel.csv', 'scenario_ml_8s/predictions.csv',
+             '--max-batch-models 3 --streaming --chunk-size 7',
+             'check_files/predictions_ml_comma.csv']]
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario"], example["kwargs"])
+            ml_pred.i_predict_ml_from_models_file_with_options(
+                self, models_file=example["models_file"],
+                test=example["test"], output=example["output"],
+                options=example["options"])
+            test_pred.i_check_create_predictions(self)
+            test_pred.i_check_predictions(self, example["predictions_file"])
@@ -292,3 +292,41 @@ class TestAnomaly:
             test_anomaly.i_check_create_anomaly(self)
             test_anomaly.i_check_anomaly_has_id_fields(
                 self, example["id_fields"])
+
+    def test_scenario9(self):
+        """
+        Scenario: Successfully building the top anomaly scores from anomaly detector
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            And I create BigML resources using anomaly detector to find anomaly scores for "<test>" with options "<options>" and log predictions in "<output>"
+            And I check that the anomaly detector has been created
+            Then the local anomaly scores file has the <top_scores> rows of "<test>" with the highest scores in "<predictions_file>", from highest to lowest
+        """
+        print(self.test_scenario9.__doc__)
+        headers = ["scenario", "kwargs", "test", "output", "options",
+                   "top_scores", "predictions_file"]
+        examples = [
+            ['scenario_an_1', '{"data": "data/tiny_kdd.csv",' +
+             ' "output": "scenario_an_1/anomaly_scores.csv",' +
+             ' "test": "data/test_kdd.csv"}', 'data/test_kdd.csv',
+             'scenario_an_9/anomaly_scores.csv',
+             '--top-scores 5 --prediction-info full', 5,
+             'check_files/anomaly_scores_kdd.csv'],
+            ['scenario_an_1', '{"data": "data/tiny_kdd.csv",' +
+             ' "output": "scenario_an_1/anomaly_scores.csv",' +
+             ' "test": "data/test_kdd.csv"}', 'data/test_kdd.csv',
+             'scenario_an_9c/anomaly_scores.csv',
+             '--top-scores 10 --prediction-info full --chunk-size 7', 10,
+             'check_files/anomaly_scores_kdd.csv']]
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario"], example["kwargs"])
+            test_anomaly.i_create_anomaly_scores_with_options(
+                self, test=example["test"], output=example["output"],
+                options=example["options"])
+            test_anomaly.i_check_create_anomaly(self)
+            test_anomaly.i_check_top_anomaly_scores(
+                self, test=example["test"],
+                check_file=example["predictions_file"],
+                top_scores=example["top_scores"])
@@ -81,7 +81,7 @@ class TestAssociation:
                 self, data=example["data"], output_dir=example["output_dir"])
             test_pred.i_check_create_source(self)
             test_pred.i_check_create_dataset(self, suffix=None)
-            test_pred.i_check_create_association(self)
+            test_association.i_check_create_association(self)
 
     def test_scenario2(self):
         """
@@ -105,7 +105,7 @@ class TestAssociation:
             test_association.i_create_association_from_source(
                 self, output_dir=example["output_dir"])
             test_pred.i_check_create_dataset(self, suffix=None)
-            test_pred.i_check_create_association(self)
+            test_association.i_check_create_association(self)
 
     def test_scenario3(self):
         """
@@ -127,4 +127,40 @@ class TestAssociation:
                 self, example["scenario"], example["kwargs"])
             test_association.i_create_association_from_dataset(
                 self, output_dir=example["output_dir"])
-            test_pred.i_check_create_association(self)
+            test_association.i_check_create_association(self)
+
+    def test_scenario4(self):
+        """
+        Scenario: Successfully building association sets from dataset
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            And I create BigML association using dataset to test "<test>" with options "<options>" and log association sets in "<output>"
+            And I check that the association has been created
+            And I check that the association sets are ready
+            Then the local association sets file is like the association sets of the local Association for "<test>" with <k> items scored by "<score_by>"
+        """
+        print(self.test_scenario4.__doc__)
+        headers = ["scenario", "kwargs", "test", "output", "options", "k",
+                   "score_by"]
+        examples = [
+            ['scenario_ass_1',
+             '{"data": "data/iris.csv", "output_dir": "scenario_ass_1"}',
+             'data/test_iris.csv', 'scenario_ass_4/association_sets.csv',
+             '', None, None],
+            ['scenario_ass_1',
+             '{"data": "data/iris.csv", "output_dir": "scenario_ass_1"}',
+             'data/test_iris.csv', 'scenario_ass_4c/association_sets.csv',
+             '--association-set-k 5 --score-by confidence --chunk-size 7' +
+             ' --jobs 2', '5', 'confidence']]
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario"], example["kwargs"])
+            test_association.i_create_association_sets_from_dataset(
+                self, test=example["test"], output=example["output"],
+                options=example["options"])
+            test_association.i_check_create_association(self)
+            test_pred.i_check_create_predictions(self)
+            test_association.i_check_association_sets(
+                self, test=example["test"], k=example["k"],
+                score_by=example["score_by"])
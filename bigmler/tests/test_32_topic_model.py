@@ -202,3 +202,32 @@ class TestTopicModel:
             # the check between local and remote predictions is removed till we
             # add new options in the local side to match the remote ones
             # topic_pred.i_check_topic_distributions(self, example[3])
+
+    def test_scenario06(self):
+        """
+        Scenario: Successfully building test predictions from topic model using several processes
+            Given I created the dataset in setup_scenario02
+            And I create topic model from dataset
+            And I create BigML topic model resources from model to test "<test>" with options "<options>" and log predictions in "<output>"
+            And I check that the topic distributions are ready
+            Then the local topic distribution file is like "<topic_distribution_file>"
+        """
+        print(self.test_scenario06.__doc__)
+        headers = ["data", "options", "output", "topic_distribution_file"]
+        examples = [
+            ['data/spam.csv',
+             '--test-separator="\t" --prediction-header --jobs 2' +
+             ' --chunk-size 7',
+             'scenario6_td/topic_distributions.csv',
+             'check_files/topic_distributions_spam.csv']]
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            topic_pred.i_create_topic_model_from_dataset(
+                self, example["output"])
+            topic_pred.i_check_create_topic_model(self)
+            topic_pred.i_create_all_td_resources_from_model(
+                self, example["data"], example["options"], example["output"])
+            topic_pred.i_check_create_topic_distributions(self)
+            topic_pred.i_check_topic_distributions(
+                self, example["topic_distribution_file"])
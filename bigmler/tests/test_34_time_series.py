@@ -115,3 +115,25 @@ class TestPrediction:
             test_pred.i_check_create_dataset(self, suffix=None)
             ts_pred.i_check_create_time_series(self)
             ts_pred.i_check_forecasts(self, example["forecasts_file"])
+
+    def test_scenario03(self):
+        """
+        Scenario: Successfully building forecasts for a set of time series:
+            Given I create a new time series from the dataset in "<directory>" and forecast the time series set with options "<options>" and log forecasts in "<output>"
+            Then the local forecasts file of each time series is like "<forecasts_file>"
+        """
+        print(self.test_scenario03.__doc__)
+        headers = ["directory", "output", "options", "forecasts_file"]
+        examples = [
+            ['scenario1_ts', 'scenario3_ts/forecasts', '--horizon 10',
+             'check_files/forecasts_grades_final.csv'],
+            ['scenario1_ts', 'scenario3_ts_j/forecasts',
+             '--horizon 10 --jobs 2',
+             'check_files/forecasts_grades_final.csv']]
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            ts_pred.i_create_ts_forecasts_from_time_series_set(
+                self, directory=example["directory"],
+                output=example["output"], options=example["options"])
+            ts_pred.i_check_bulk_forecasts(self, example["forecasts_file"])
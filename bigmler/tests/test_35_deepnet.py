@@ -294,3 +294,60 @@ class TestPrediction:
             dn_pred.i_check_create_dn_model(self)
             test_pred.i_check_create_predictions(self)
             test_pred.i_check_predictions(self, example["predictions_file"])
+
+    def test_scenario09(self):
+        """
+        Scenario: Successfully building test predictions from model in chunks of rows
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            And I create BigML deepnet resources using model to test "<test>" and log predictions in "<output>" with prediction options "<options>"
+            And I check that the predictions are ready
+            Then the local prediction file is like "<predictions_file>"
+        """
+        print(self.test_scenario09.__doc__)
+        headers = ["scenario", "kwargs", "test", "output", "options",
+                   "predictions_file"]
+        examples = [
+            ['scenario1_dn', '{"data": "data/iris.csv",' +
+             ' "output": "scenario1_dn/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}', 'data/test_iris.csv',
+             'scenario9_dn/predictions.csv', '--chunk-size 7',
+             'check_files/predictions_iris_dn_nh.csv']]
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario"], example["kwargs"])
+            dn_pred.i_create_dn_resources_from_model_with_options(
+                self, test=example["test"], output=example["output"],
+                options=example["options"])
+            test_pred.i_check_create_predictions(self)
+            test_pred.i_check_predictions(self, example["predictions_file"])
+
+    def test_scenario10(self):
+        """
+        Scenario: Successfully building test predictions from model using single precision floats
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            And I create BigML deepnet resources using model to test "<test>" and log predictions in "<output>" with prediction options "<options>"
+            And I check that the predictions are ready
+            Then the predicted classes in the local prediction file are like "<predictions_file>"
+        """
+        print(self.test_scenario10.__doc__)
+        headers = ["scenario", "kwargs", "test", "output", "options",
+                   "predictions_file"]
+        examples = [
+            ['scenario1_dn', '{"data": "data/iris.csv",' +
+             ' "output": "scenario1_dn/predictions.csv",' +
+             ' "test": "data/test_iris.csv"}', 'data/test_iris.csv',
+             'scenario10_dn/predictions.csv', '--chunk-size 7 --deepnet-float32',
+             'check_files/predictions_iris_dn_nh.csv']]
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario"], example["kwargs"])
+            dn_pred.i_create_dn_resources_from_model_with_options(
+                self, test=example["test"], output=example["output"],
+                options=example["options"])
+            test_pred.i_check_create_predictions(self)
+            test_pred.i_check_predicted_classes(
+                self, example["predictions_file"])
@@ -233,3 +233,32 @@ class TestPrediction:
             batch_pred.i_check_create_batch_prediction(self)
             test_pred.i_check_create_predictions(self)
             test_pred.i_check_predictions(self, example["predictions_file"])
+
+    def test_scenario07(self):
+        """
+        Scenario: Successfully building test predictions from model in chunks of rows
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            And I create BigML linear regression resources using model to test "<test>" and log predictions in "<output>" with prediction options "<options>"
+            And I check that the predictions are ready
+            Then the local prediction file is like "<predictions_file>"
+        """
+        print(self.test_scenario07.__doc__)
+        headers = ["scenario", "kwargs", "test", "output", "options",
+                   "predictions_file"]
+        examples = [
+            ['scenario1_lrr', '{"data": "data/grades.csv",' +
+             ' "output": "scenario1_lrr/predictions.csv",' +
+             ' "test": "data/test_grades_no_missings.csv"}',
+             'data/test_grades_no_missings.csv',
+             'scenario7_lrr/predictions.csv', '--chunk-size 7',
+             'check_files/predictions_grades_lrr.csv']]
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario"], example["kwargs"])
+            lr_pred.i_create_lr_resources_from_model_with_options(
+                self, test=example["test"], output=example["output"],
+                options=example["options"])
+            test_pred.i_check_create_predictions(self)
+            test_pred.i_check_predictions(self, example["predictions_file"])
@@ -233,3 +233,40 @@ class TestProjection:
             batch_pred.i_check_create_batch_projection(self)
             test_pred.i_check_create_projections(self)
             test_pred.i_check_projections(self, example["projections_file"])
+
+    def test_scenario07(self):
+        """
+        Scenario: Successfully building test projections from model as binary arrays
+            Given I have previously executed "<scenario>" or reproduce it with arguments <kwargs>
+            And I create BigML PCA resources using model to test "<test>" and log projections in "<output>" with options "<options>"
+            Then the local projections array in "<projections_format>" format is like "<projections_file>"
+        """
+        print(self.test_scenario07.__doc__)
+        headers = ["scenario", "kwargs", "test", "output", "options",
+                   "projections_format", "projections_file"]
+        examples = [
+            ['scenario1_pca', '{"data": "data/grades.csv",' +
+             ' "output": "scenario1_pca/projections.csv",' +
+             ' "test": "data/test_grades_no_missings.csv"}',
+             'data/test_grades_no_missings.csv',
+             'scenario7_pca/projections.csv',
+             '--projections-format npy --chunk-size 7', 'npy',
+             'check_files/projections_grades_pca.csv'],
+            ['scenario1_pca', '{"data": "data/grades.csv",' +
+             ' "output": "scenario1_pca/projections.csv",' +
+             ' "test": "data/test_grades_no_missings.csv"}',
+             'data/test_grades_no_missings.csv',
+             'scenario7_pca_f32/projections.csv',
+             '--projections-format float32-raw', 'float32-raw',
+             'check_files/projections_grades_pca.csv']]
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            test_pred.i_have_previous_scenario_or_reproduce_it(
+                self, example["scenario"], example["kwargs"])
+            pca_proj.i_create_pca_resources_from_model_with_options(
+                self, test=example["test"], output=example["output"],
+                options=example["options"])
+            pca_proj.i_check_binary_projections(
+                self, example["projections_file"],
+                example["projections_format"])
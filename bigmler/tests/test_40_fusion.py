@@ -173,3 +173,36 @@ class TestPrediction:
             test_pred.i_check_create_evaluation(self)
             evaluation.then_the_evaluation_file_is_like(
                 self, example["json_evaluation_file"])
+
+    def test_scenario05(self):
+        """
+        Scenario: Successfully building test predictions from model in chunks of rows
+            And I create BigML fusion resources using preset models to test "<test>" and log predictions in "<output>" with prediction options "<options>"
+            And I check that the predictions are ready
+            And I check that the fusion components are stored in the local cache "<cache_dir>"
+            Then the local prediction file is like "<predictions_file>"
+
+        """
+        print(self.test_scenario05.__doc__)
+        headers = ["test", "output", "options", "cache_dir",
+                   "predictions_file"]
+        examples = [
+            ['data/test_iris.csv', 'scenario5_fs/predictions.csv',
+             '--chunk-size 7 --local-cache scenario5_fs/cache',
+             'scenario5_fs/cache', 'check_files/predictions_iris_fs.csv'],
+            ['data/test_iris.csv', 'scenario5_fs_c/predictions.csv',
+             '--chunk-size 7 --local-cache scenario5_fs/cache',
+             'scenario5_fs/cache', 'check_files/predictions_iris_fs.csv'],
+            ['data/test_iris.csv', 'scenario5_fs_j/predictions.csv',
+             '--chunk-size 7 --jobs 2 --local-cache scenario5_fs_j/cache',
+             'scenario5_fs_j/cache', 'check_files/predictions_iris_fs.csv']]
+        for example in examples:
+            example = dict(zip(headers, example))
+            show_method(self, self.bigml["method"], example)
+            fs_pred.i_create_fs_resources_from_model_with_options(
+                self, test=example["test"], output=example["output"],
+                options=example["options"])
+            fs_pred.i_check_create_fusion(self)
+            test_pred.i_check_create_predictions(self)
+            fs_pred.i_check_cached_components(self, example["cache_dir"])
+            test_pred.i_check_predictions(self, example["predictions_file"])
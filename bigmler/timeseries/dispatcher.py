@@ -33,7 +33,7 @@ import bigmler.processing.datasets as pd
 
 from bigmler.resourcesapi.forecasts import set_forecast_args
 from bigmler.defaults import DEFAULTS_FILE
-from bigmler.forecast import forecast, remote_forecast
+from bigmler.forecast import forecast, bulk_forecast, remote_forecast
 from bigmler.reports import clear_reports, upload_reports
 from bigmler.command import get_context
 from bigmler.tsevaluation import evaluate
@@ -195,6 +195,10 @@ def compute_output(api, args):
                 api, resume, \
                 session_file=session_file, path=path, log=log)
 
+        elif len(time_series_set) > 1:
+            # bulk forecasts: each time series is forecast locally and
+            # stored in its own files
+            bulk_forecast(time_series_set, args, session_file=session_file)
         else:
             forecast(time_series, args,
                      session_file=session_file)
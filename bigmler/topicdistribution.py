@@ -21,21 +21,27 @@
 
 import sys
 
+from functools import partial, lru_cache
+
 import bigml.api
 
 from bigml.topicmodel import TopicModel
-from bigml.io import UnicodeWriter
 
 import bigmler.utils as u
 import bigmler.checkpoint as c
 
 from bigmler.tst_reader import TstReader as TestReader
+from bigmler.output_writer import output_writer, project_row
+from bigmler.local_cache import cached_local, DEFAULT_CACHE_SIZE
+from bigmler.parallel import pool_predict, chunks
 from bigmler.resourcesapi.common import NORMAL_FORMAT, FULL_FORMAT
 from bigmler.resourcesapi.batch_topic_distributions import \
     create_batch_topic_distribution
 
 # symbol used in failing topic distribution
 NO_DISTRIBUTION = "-"
+# maximum number of stems memoized by each local topic model
+STEMS_CACHE_SIZE = 100000
 
 
 def use_prediction_headers(test_reader, fields, args):
@@ -93,10 +99,7 @@ def write_topic_distribution(topic_distribution_resource, output=sys.stdout,
     if prediction_info != NORMAL_FORMAT:
         if input_data is None:
             input_data = []
-        row = input_data
-        if exclude:
-            for index in exclude:
-                del row[index]
+        row = project_row(input_data, exclude)
     topic_probabilities = [topic['probability'] \
         for topic in topic_distribution_resource]
     row.extend(topic_probabilities)
@@ -116,23 +119,73 @@ def topic_distribution_to_row(topic_distribution_resource):
     return [topic_distribution_resource['object']['topic_distribution']]
 
 
+def memoize_stems(local_topic_model, max_size=STEMS_CACHE_SIZE):
+    """Keeps the last stems computed by the local topic model in a bounded
+       cache, so that the stemmer runs once per distinct token
+
+    """
+    local_topic_model.stem = lru_cache(maxsize=max_size)(
+        local_topic_model.stem)
+    return local_topic_model
+
+
+def build_topic_model(topic_models, api=None, cache_dir=None,
+                      max_size=DEFAULT_CACHE_SIZE):
+    """Local TopicModel, loaded from the local cache if available, that
+       memoizes the stems of the tokens
+
+    """
+    # Only one topic model at present
+    return memoize_stems(cached_local(TopicModel, topic_models[0], api=api,
+                                      cache_dir=cache_dir,
+                                      max_size=max_size))
+
+
+def local_topic_distributions(local_topic_model, rows, adapter=None):
+    """Topic distributions for the test rows. The rows whose distribution
+       fails get an empty one.
+
+    """
+    distributions = []
+    for input_data in rows:
+        #pylint: disable=locally-disabled,broad-except
+        try:
+            distributions.append(local_topic_model.distribution(
+                adapter(input_data)))
+        except Exception:
+            distributions.append([])
+    return distributions
+
+
 def local_topic_distribution(topic_models, test_reader, output, args,
                              exclude=None, headers=None):
     """Get local topic model and issue topic distribution prediction
 
     """
-    # Only one topic model at present
-    local_topic_model = TopicModel(topic_models[0], api=args.retrieve_api_)
+    model_builder = partial(build_topic_model, topic_models,
+                            api=args.retrieve_api_,
+                            cache_dir=getattr(args, "local_cache", None),
+                            max_size=getattr(args, "local_cache_size",
+                                             DEFAULT_CACHE_SIZE))
+    predict_fn = partial(local_topic_distributions,
+                         adapter=test_reader.adapter(filtering=False))
+    local_topic_model = model_builder()
     if args.prediction_header:
         headers.extend([topic['name'] for topic in local_topic_model.topics])
         output.writerow(headers)
-    for input_data in test_reader:
-        input_data_dict = test_reader.dict(input_data, filtering=False)
-        try:
-            topic_distribution_info = local_topic_model.distribution(
-                input_data_dict)
-        except Exception:
-            topic_distribution_info = []
+    if args.jobs > 1:
+        # the documents are tokenized and sampled in chunks by a pool of
+        # processes that build their own copy of the topic model
+        distributions = pool_predict(model_builder, predict_fn, test_reader,
+                                     jobs=args.jobs,
+                                     chunk_size=args.chunk_size)
+    else:
+        distributions = (
+            distribution_pair for chunk in chunks(test_reader,
+                                                  args.chunk_size)
+            for distribution_pair in zip(chunk, predict_fn(
+                local_topic_model, chunk)))
+    for input_data, topic_distribution_info in distributions:
         write_topic_distribution(topic_distribution_info,
                                  output,
                                  args.prediction_info, input_data, exclude)
@@ -148,7 +201,7 @@ def topic_distribution(topic_models, fields, args, session_file=None):
     test_reader = TestReader(test_set, test_set_header, fields,
                              None,
                              test_separator=args.test_separator)
-    with UnicodeWriter(output, lineterminator="\n") as output:
+    with output_writer(output, args, lineterminator="\n") as output:
         # columns to exclude if input_data is added to the prediction field
         exclude, headers = use_prediction_headers(
             test_reader, fields, args)
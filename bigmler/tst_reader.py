@@ -24,6 +24,8 @@
 import sys
 import os
 
+from itertools import islice
+
 from bigml.util import get_csv_delimiter, is_image
 from bigml.io import UnicodeReader
 
@@ -43,9 +45,42 @@ def is_folder(folder):
 
 def contains_csv(folder):
     """Checking whether a folder contains a CSV file"""
-    files = os.listdir(folder)
-    return any(os.path.splitext(filename)[1].replace(".", "").lower() == "csv"
-               for filename in files)
+    with os.scandir(folder) as entries:
+        return any(os.path.splitext(entry.name)[1].replace(".",
+                                                           "").lower() == "csv"
+                   for entry in entries)
+
+
+class InputAdapter():
+    """Builds the input data dict for a test row using the list of
+       (column, key) pairs computed once for the test file
+
+    """
+    def __init__(self, columns, missing_tokens=None):
+        """`columns`: list of (index in the row, key in the input data)
+                      pairs
+           `missing_tokens`: if set, the values found in this list are
+                             replaced by None
+        """
+        self.columns = columns
+        self.keys = [key for _, key in columns]
+        self.indexes = [index for index, _ in columns]
+        # rows that are used as they are need no index lookups
+        self.identity = self.indexes == list(range(len(columns)))
+        self.missing_tokens = None if missing_tokens is None else \
+            set(missing_tokens)
+
+    def __call__(self, row):
+        """Returns the input data dict for the row
+
+        """
+        values = row if self.identity else \
+            [row[index] for index in self.indexes]
+        if self.missing_tokens is None:
+            return dict(zip(self.keys, values))
+        missing_tokens = self.missing_tokens
+        return {key: None if value in missing_tokens else value
+                for key, value in zip(self.keys, values)}
 
 
 class TstReader():
@@ -120,6 +155,7 @@ class TstReader():
         self.headers = None
         self.raw_headers = None
         self.exclude = []
+        self.adapters = {}
 
         if test_set_header:
             self.headers = next(self.test_reader)
@@ -182,21 +218,65 @@ class TstReader():
                     row[index] = os.path.join(self.directory, row_item)
         return row
 
+    def skip(self, rows):
+        """Skips the next `rows` rows of the test file. Used when resuming
+           the predictions from the last committed row.
+
+        """
+        next(islice(self.test_reader, rows, rows), None)
+
+    def adapter(self, filtering=True):
+        """Returns the InputAdapter that builds the input data dicts for the
+           rows in the file. It is compiled only once per filtering mode.
+
+        """
+        if filtering not in self.adapters:
+            if not filtering:
+                if self.test_set_header:
+                    keys = self.raw_headers
+                else:
+                    keys = [self.fields.fields_by_column_number[column] for
+                            column in self.fields.fields_columns]
+                self.adapters[filtering] = InputAdapter(
+                    list(enumerate(keys)))
+            else:
+                self.adapters[filtering] = self._filtering_adapter()
+        return self.adapters[filtering]
+
+    def _filtering_adapter(self):
+        """Compiles the adapter that pairs the values of the fields in the
+           model with their headers, as `Fields.pair` does for the row
+           where the excluded columns have been removed.
+
+        """
+        fields = self.fields
+        objective_field = self.objective_field
+        if objective_field is None:
+            objective_field = fields.objective_field \
+                if fields.objective_field is not None else \
+                fields.fields_columns[-1]
+        if isinstance(objective_field, str):
+            objective_field = fields.field_column_number(objective_field)
+        objective_field_present = fields.field_name(objective_field) in \
+            self.headers
+        if objective_field != fields.objective_field or \
+                objective_field_present != fields.objective_field_present or \
+                self.headers != fields.headers:
+            fields.update_objective_field(objective_field,
+                                          objective_field_present,
+                                          self.headers)
+        excluded = set(self.exclude)
+        kept_columns = [index for index in range(
+            len(self.headers) + len(self.exclude)) if index not in excluded]
+        return InputAdapter([(kept_columns[index], self.headers[index])
+                             for index in fields.filtered_indexes],
+                            missing_tokens=fields.missing_tokens)
+
     def dict(self, row, filtering=True):
         """Returns the row in a dict format according to the given headers
 
         """
-        new_row = row[:]
-        if not filtering:
-            if self.test_set_header:
-                headers = self.raw_headers
-            else:
-                headers = [self.fields.fields_by_column_number[column] for
-                           column in self.fields.fields_columns]
-            return dict(list(zip(headers, new_row)))
-        for index in self.exclude:
-            del new_row[index]
-        return self.fields.pair(new_row, self.headers, self.objective_field)
+        return self.adapter(filtering)(row)
 
     def number_of_tests(self):
         """Returns the number of tests in the test file
@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Columnar storage of the votes of an ensemble of classification models
+
+   The predicted class, confidence and instances count of each model for
+   each input row are stored in arrays with one row per input data and one
+   column per model. The distributions of the votes are kept as lists of
+   items and only expanded to arrays for the probability weighted
+   combination. The plurality, confidence weighted, probability weighted
+   and threshold combinations are computed for all rows at once, following
+   the same rules as `MultiVote.combine`.
+
+"""
+
+
+import os
+import ast
+
+from array import array
+
+import numpy as np
+
+from bigml.io import UnicodeReader
+from bigml.multivote import MultiVote, ws_confidence, PLURALITY_CODE, \
+    CONFIDENCE_CODE, PROBABILITY_CODE, THRESHOLD_CODE
+from bigml.util import PRECISION
+
+
+COMBINATION_METHODS = [PLURALITY_CODE, CONFIDENCE_CODE, PROBABILITY_CODE,
+                       THRESHOLD_CODE]
+VOTES_ARRAYS = ["classes", "confidences", "counts", "distributions",
+                "positions"]
+# typecodes of the buffers where the distribution items of the votes are
+# kept until a combination needs them
+ITEMS_TYPECODES = {"rows": "q", "columns": "q", "codes": "i",
+                   "instances": "d", "positions": "i"}
+ITEMS_DTYPES = {"rows": np.int64, "columns": np.int64, "codes": np.int32,
+                "instances": np.float64, "positions": np.int32}
+NOT_ENOUGH_DATA = ("Not enough data to use the selected prediction method."
+                   " Try creating your model anew.")
+
+
+class VotesMatrix():
+    """Votes of the models of an ensemble for a list of input data
+
+    """
+
+    def __init__(self, rows, models, categories, path=None):
+        """`rows`: number of input data rows
+           `models`: maximum number of models voting
+           `categories`: list of classes of the objective field
+           `path`: if set, the arrays are memory-mapped to files in this
+                   directory
+
+        """
+        self.rows = rows
+        self.models = models
+        self.path = path
+        self.categories = []
+        self.category_codes = {}
+        self.columns = 0
+        self.files = []
+        self.classes = self._array("classes", (rows, models), np.int32, -1)
+        self.confidences = self._array("confidences", (rows, models),
+                                       np.float64, np.nan)
+        self.counts = self._array("counts", (rows, models), np.int64, 0)
+        # the distributions of the votes are only stored as dense arrays
+        # when the probability weighted combination needs them
+        self.distributions = None
+        self.positions = None
+        self.items = {name: array(typecode) for name, typecode in
+                      ITEMS_TYPECODES.items()}
+        for category in categories:
+            self._code(category)
+
+    def _array(self, name, shape, dtype, fill):
+        """Creates an array filled with the `fill` value, memory-mapped if
+           a path has been set
+
+        """
+        if self.path is None:
+            return np.full(shape, fill, dtype=dtype)
+        filename = os.path.join(self.path, "votes_%s_%s.npy" % (
+            name, len(self.files)))
+        self.files.append(filename)
+        array = np.lib.format.open_memmap(filename, mode="w+", dtype=dtype,
+                                          shape=shape)
+        array[:] = fill
+        return array
+
+    def _code(self, category):
+        """Code of the category. New categories are added when found.
+
+        """
+        if category not in self.category_codes:
+            self.category_codes[category] = len(self.categories)
+            self.categories.append(category)
+        return self.category_codes[category]
+
+    def _add_items(self, rows, columns, codes, instances, positions):
+        """Stores the distribution items of a group of votes
+
+        """
+        for name, values in [("rows", rows), ("columns", columns),
+                             ("codes", codes), ("instances", instances),
+                             ("positions", positions)]:
+            self.items[name].frombytes(np.ascontiguousarray(
+                values, dtype=ITEMS_DTYPES[name]).tobytes())
+
+    def _allocate_distributions(self):
+        """Builds the (rows x models x categories) arrays of instances and
+           positions in the distribution of each vote from the stored
+           items. The category axis is sized once, with all the categories
+           found in the votes.
+
+        """
+        if self.distributions is not None:
+            return
+        shape = (self.rows, self.models, len(self.categories))
+        self.distributions = self._array("distributions", shape,
+                                         np.float64, 0)
+        self.positions = self._array("positions", shape, np.int32, -1)
+        items = {name: np.frombuffer(self.items[name],
+                                     dtype=ITEMS_DTYPES[name])
+                 for name in ITEMS_TYPECODES}
+        index = (items["rows"], items["columns"], items["codes"])
+        self.distributions[index] = items["instances"]
+        self.positions[index] = items["positions"]
+
+    def _set_vote(self, row, column, prediction, confidence, distribution,
+                  count):
+        """Stores the vote of the model in `column` for the input `row`
+
+        """
+        self.classes[row, column] = self._code(prediction)
+        self.confidences[row, column] = np.nan if confidence is None else \
+            confidence
+        self.counts[row, column] = count
+        items = self.items
+        for position, (category, instances) in enumerate(distribution):
+            items["rows"].append(row)
+            items["columns"].append(column)
+            items["codes"].append(self._code(category))
+            items["instances"].append(instances)
+            items["positions"].append(position)
+
+    def add_votes(self, votes):
+        """Adds the predictions in a list of MultiVote objects, one per row,
+           as new model columns.
+
+        """
+        first_column = self.columns
+        for row, multivote in enumerate(votes):
+            for index, prediction in enumerate(multivote.predictions):
+                if any(key not in prediction for key in
+                       ["confidence", "distribution", "count"]):
+                    raise ValueError(NOT_ENOUGH_DATA)
+                self._set_vote(row, first_column + index,
+                               prediction["prediction"],
+                               prediction["confidence"],
+                               prediction["distribution"],
+                               prediction["count"])
+                self.columns = max(self.columns, first_column + index + 1)
+
+    def add_coded_votes(self, classes, confidences, counts, distributions):
+        """Adds a block of model columns whose votes are already coded
+           with the categories of the matrix. `classes`, `confidences` and
+           `counts` are arrays with one row per input data and one column
+           per model. `distributions` is a tuple of arrays (rows, columns,
+           codes, instances, positions) with an item per category in the
+           distribution of each vote.
+
+        """
+        first_column = self.columns
+        block = slice(first_column, first_column + classes.shape[1])
+        self.classes[:, block] = classes
+        self.confidences[:, block] = confidences
+        self.counts[:, block] = counts
+        rows, columns, codes, instances, positions = distributions
+        self._add_items(rows, first_column + columns, codes, instances,
+                        positions)
+        self.columns = first_column + classes.shape[1]
+
+    def read_votes(self, votes_files, to_prediction_fn, data_locale=None):
+        """Adds the votes found in the models' predictions files as new
+           model columns, as `read_votes` would do.
+
+        """
+        for votes_file in votes_files:
+            column = self.columns
+            with UnicodeReader(votes_file) as rdr:
+                for row, vote in enumerate(rdr):
+                    prediction = to_prediction_fn(vote[0],
+                                                  data_locale=data_locale)
+                    if len(vote) <= 2:
+                        raise ValueError(NOT_ENOUGH_DATA)
+                    try:
+                        confidence = float(vote[1])
+                    except ValueError:
+                        confidence = 0.0
+                    self._set_vote(row, column, prediction, confidence,
+                                   ast.literal_eval(vote[2]), int(vote[3]))
+            self.columns += 1
+
+    def _winner(self, scores, seen, first_orders):
+        """Class with the highest score for each row. Ties are broken by the
+           order of the first vote for the class and then by the class name.
+           The order of a vote is the column of the model that issued it.
+
+        """
+        categories_rank = np.argsort(np.argsort(
+            np.array(self.categories, dtype=object)))
+        scores = np.where(seen, scores, -np.inf)
+        candidates = seen & (scores == scores.max(axis=1)[:, np.newaxis])
+        first_orders = np.where(candidates, first_orders,
+                                np.iinfo(np.int64).max)
+        candidates &= first_orders == first_orders.min(axis=1)[:, np.newaxis]
+        return np.where(candidates, categories_rank, -1).argmax(axis=1)
+
+    def _vote(self, weights, selected=None):
+        """Combines the votes of the selected models adding their weights.
+           Returns the winning class code and the combined confidence, that
+           is the average confidence of its votes weighted by `weights`.
+
+        """
+        rows = np.arange(self.rows)
+        categories = len(self.categories)
+        scores = np.zeros((self.rows, categories))
+        seen = np.zeros((self.rows, categories), dtype=bool)
+        first_orders = np.zeros((self.rows, categories), dtype=np.int64)
+        for column in range(self.columns):
+            classes = self.classes[:, column]
+            valid = classes >= 0
+            if selected is not None:
+                valid &= selected[:, column]
+            new = valid & ~seen[rows, classes]
+            first_orders[rows[new], classes[new]] = column
+            seen[rows[valid], classes[valid]] = True
+            scores[rows[valid], classes[valid]] += weights[valid, column]
+        winners = self._winner(scores, seen, first_orders)
+        confidence = np.zeros(self.rows)
+        total_weight = np.zeros(self.rows)
+        for column in range(self.columns):
+            matches = self.classes[:, column] == winners
+            if selected is not None:
+                matches &= selected[:, column]
+            confidence[matches] += weights[matches, column] * \
+                self.confidences[matches, column]
+            total_weight[matches] += weights[matches, column]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            confidence = np.where(total_weight > 0,
+                                  confidence / total_weight, np.nan)
+        return winners, confidence
+
+    def _probability_vote(self):
+        """Combines the votes weighting each class in the distribution of the
+           predicting node by its probability. The confidence is the Wilson
+           score of the combined distribution.
+
+        """
+        columns = self.columns
+        distributions = self.distributions[:, :columns, :]
+        present = self.positions[:, :columns, :] >= 0
+        counts = self.counts[:, :columns]
+        if (counts < 1).any():
+            raise Exception("Probability weighting is not available "
+                            "because distribution seems to have %s "
+                            "as number of instances in a node" %
+                            counts[counts < 1][0])
+        # probabilities are rounded as in MultiVote.probability_weight
+        instances = distributions[present]
+        totals = np.broadcast_to(counts[:, :, np.newaxis],
+                                 distributions.shape)[present]
+        pairs, inverse = np.unique(np.stack([instances, totals], axis=1),
+                                   axis=0, return_inverse=True)
+        rounded = np.array([round(float(pair_instances) / int(total),
+                                  PRECISION)
+                            for pair_instances, total in pairs])
+        probabilities = np.zeros(distributions.shape)
+        probabilities[present] = rounded[inverse.ravel()]
+        scores = np.zeros((self.rows, len(self.categories)))
+        seen = np.zeros(scores.shape, dtype=bool)
+        first_orders = np.zeros(scores.shape, dtype=np.int64)
+        total_instances = np.zeros(self.rows)
+        for column in range(columns):
+            new = present[:, column, :] & ~seen
+            first_orders[new] = column
+            seen |= present[:, column, :]
+            scores += probabilities[:, column, :]
+            total_instances += distributions[:, column, :].sum(axis=1)
+        winners = self._winner(scores, seen, first_orders)
+        confidence = []
+        for row, winner in enumerate(winners):
+            # the combined distribution keeps the order in which classes
+            # appear in the votes
+            codes = np.flatnonzero(seen[row])
+            codes = sorted(codes, key=lambda code, row=row: (
+                first_orders[row, code],
+                self.positions[row, first_orders[row, code], code]))
+            distribution = {self.categories[code]: scores[row, code]
+                            for code in codes}
+            confidence.append(ws_confidence(
+                self.categories[winner], distribution,
+                ws_n=total_instances[row]))
+        return winners, np.array(confidence)
+
+    def combine(self, method=PLURALITY_CODE, options=None):
+        """Returns the combined [prediction, confidence] for each row
+
+        """
+        if self.columns == 0:
+            raise Exception("No predictions to be combined.")
+        classes = self.classes[:, :self.columns]
+        if method == CONFIDENCE_CODE:
+            if np.isnan(self.confidences[:, :self.columns]).any():
+                raise ValueError(NOT_ENOUGH_DATA)
+            winners, confidence = self._vote(
+                self.confidences[:, :self.columns])
+        elif method == PROBABILITY_CODE:
+            self._allocate_distributions()
+            if (self.distributions != np.floor(self.distributions)).any():
+                raise ValueError("Probability weighting needs integer"
+                                 " instances in the distributions.")
+            winners, confidence = self._probability_vote()
+        else:
+            selected = None
+            if method == THRESHOLD_CODE:
+                # checking the options as single_out_category does
+                MultiVote([{"prediction": None, "order": order} for order
+                           in range(self.columns)]).single_out_category(
+                               options)
+                code = self.category_codes.get(options["category"], -2)
+                category_votes = classes == code
+                reached = category_votes.sum(axis=1) >= options["threshold"]
+                selected = np.where(reached[:, np.newaxis], category_votes,
+                                    ~category_votes)
+            winners, confidence = self._vote(np.ones(classes.shape),
+                                             selected=selected)
+        return [[self.categories[winner], round(float(row_confidence),
+                                                 PRECISION)]
+                for winner, row_confidence in zip(winners, confidence)]
+
+    def close(self):
+        """Removes the files used to memory-map the arrays, if any
+
+        """
+        for name in VOTES_ARRAYS:
+            setattr(self, name, None)
+        self.items = {name: array(typecode) for name, typecode in
+                      ITEMS_TYPECODES.items()}
+        for filename in self.files:
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+        self.files = []